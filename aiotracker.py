@@ -0,0 +1,174 @@
+"""
+Async facade over the tracker
+
+Coroutine versions of the tracker functions that read or write the
+database, for code running in an event loop (bots, the HTTP server):
+
+    position = await aiotracker.get_current_position()
+    await aiotracker.update_reading_position("John", 3, 16)
+
+Reads run on a pool of reader threads and may run at the same time. Writes
+run one at a time, in the order they were made, on a single writer thread.
+Every thread keeps its own database connection. Use the "fast" preset
+(write-ahead log) when reads and writes overlap, so readers never wait for
+the writer.
+
+Cancelling a read that has not started yet drops it; cancelling one that
+is running interrupts its query. A write that has not started yet is
+dropped too, but once running it always completes, so a transaction is
+never cut short.
+
+Functions that never touch the database (find_book, get_chapter_count,
+get_all_books, ...) are not wrapped; call them on tracker directly.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+import db
+import tracker
+
+# Reader threads used when configure() is not called
+DEFAULT_READERS = min(4, os.cpu_count() or 1)
+
+T = TypeVar("T")
+
+_readers = None
+_writer = None
+_reader_count = DEFAULT_READERS
+_pool_lock = threading.Lock()
+
+class _Call:
+    """A tracker call on a worker thread, which can be interrupted while it runs"""
+    
+    __slots__ = ("func", "args", "kwargs", "connection", "cancelled", "lock")
+    
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.connection = None
+        self.cancelled = False
+        # Keeps interrupt() off the connection once the thread has moved on
+        # to another call
+        self.lock = threading.Lock()
+    
+    def run(self):
+        with self.lock:
+            if self.cancelled:
+                raise asyncio.CancelledError()
+            self.connection = db.get_connection()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            with self.lock:
+                self.connection = None
+    
+    def interrupt(self):
+        """Stop the call: before it starts, or by aborting its running query"""
+        with self.lock:
+            self.cancelled = True
+            if self.connection is not None:
+                self.connection.interrupt()
+
+def configure(readers: int = DEFAULT_READERS):
+    """
+    Set the number of reader threads. Takes effect when the pools are next
+    started, so call it before the first call or after close().
+    """
+    global _reader_count
+    if readers < 1:
+        raise ValueError("At least one reader thread is needed")
+    _reader_count = readers
+
+def _pools():
+    """Start the reader and writer pools if they are not running"""
+    global _readers, _writer
+    with _pool_lock:
+        if _readers is None:
+            _readers = ThreadPoolExecutor(max_workers=_reader_count, thread_name_prefix="db-reader")
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        return _readers, _writer
+
+def close():
+    """Wait for queued calls to finish and stop the reader and writer threads"""
+    global _readers, _writer
+    with _pool_lock:
+        readers, writer = _readers, _writer
+        _readers = _writer = None
+    if readers is not None:
+        # Reader connections are closed as their threads exit
+        readers.shutdown(wait=True)
+        # The writer's connection is closed on its own thread
+        writer.submit(db.close_connection).result()
+        writer.shutdown(wait=True)
+
+async def run_read(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a function that only reads the database on a reader thread"""
+    call = _Call(func, args, kwargs)
+    readers, _ = _pools()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(readers, call.run)
+    except asyncio.CancelledError:
+        call.interrupt()
+        raise
+
+async def run_write(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a function that writes to the database on the writer thread, after earlier writes"""
+    call = _Call(func, args, kwargs)
+    _, writer = _pools()
+    return await asyncio.get_running_loop().run_in_executor(writer, call.run)
+
+def _async_read(func):
+    """Make a coroutine version of a tracker function that reads"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_read(func, *args, **kwargs)
+    wrapper.__module__ = __name__
+    return wrapper
+
+def _async_write(func):
+    """Make a coroutine version of a tracker function that writes"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_write(func, *args, **kwargs)
+    wrapper.__module__ = __name__
+    return wrapper
+
+# Reads
+get_profiles = _async_read(tracker.get_profiles)
+get_current_position = _async_read(tracker.get_current_position)
+get_current_reference = _async_read(tracker.get_current_reference)
+get_next_verse = _async_read(tracker.get_next_verse)
+get_next_reference = _async_read(tracker.get_next_reference)
+get_progress_percentages = _async_read(tracker.get_progress_percentages)
+get_coverage_percentages = _async_read(tracker.get_coverage_percentages)
+get_unread_verses = _async_read(tracker.get_unread_verses)
+get_first_unread = _async_read(tracker.get_first_unread)
+get_completion_estimates = _async_read(tracker.get_completion_estimates)
+get_verse_content = _async_read(tracker.get_verse_content)
+get_chapter_content = _async_read(tracker.get_chapter_content)
+get_book_chapters = _async_read(tracker.get_book_chapters)
+get_completed_books = _async_read(tracker.get_completed_books)
+get_reading_statistics = _async_read(tracker.get_reading_statistics)
+get_dashboard_snapshot = _async_read(tracker.get_dashboard_snapshot)
+search_verses = _async_read(tracker.search_verses)
+count_search_results = _async_read(tracker.count_search_results)
+export_bible = _async_read(tracker.export_bible)
+export_bible_by_book = _async_read(tracker.export_bible_by_book)
+
+# Writes
+create_profile = _async_write(tracker.create_profile)
+delete_profile = _async_write(tracker.delete_profile)
+update_reading_position = _async_write(tracker.update_reading_position)
+mark_chapter_complete = _async_write(tracker.mark_chapter_complete)
+mark_chapters_read = _async_write(tracker.mark_chapters_read)
+mark_book_read = _async_write(tracker.mark_book_read)
+reset_progress = _async_write(tracker.reset_progress)
+import_reading_history = _async_write(tracker.import_reading_history)
+rebuild_completion_data = _async_write(tracker.rebuild_completion_data)
+rebuild_search_index = _async_write(tracker.rebuild_search_index)
+build_corpus_pack = _async_write(tracker.build_corpus_pack)
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the Bible tracker
+
+Builds deterministic synthetic databases and times the tracker, database,
+search, export and dashboard code paths against them. Run from the
+repository root:
+
+    python -m benchmarks.run --rows 10000 100000 --output results.json
+"""
@@ -0,0 +1,192 @@
+"""
+Concurrency benchmark for the async facade
+
+Runs many coroutines at once, each calling aiotracker reads (and, with
+--write-ratio, writes) back to back for a fixed time, and reports calls
+per second and latency percentiles for every reader pool size and number
+of concurrent callers. A baseline calling the tracker directly from one
+thread is timed first:
+
+    python -m benchmarks.concurrency --readers 1 2 4 8 --concurrency 1 16 64 256
+    python -m benchmarks.concurrency --write-ratio 0.05 --preset fast
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List
+import aiotracker
+import db
+import tracker
+from benchmarks import synthetic
+from benchmarks.loadtest import _summarize
+from benchmarks.run import _git_revision
+
+# Bump when the layout of the results file changes
+RESULTS_FORMAT = 1
+
+DEFAULT_READERS = (1, 2, 4, 8)
+DEFAULT_CONCURRENCY = (1, 16, 64, 256)
+DEFAULT_DURATION = 5.0
+DEFAULT_ROWS = 100000
+
+# Read calls and how often each is made relative to the others
+READ_MIX = (
+    ("get_current_position", 4),
+    ("get_dashboard_snapshot", 3),
+    ("get_next_reference", 2),
+    ("get_progress_percentages", 2),
+    ("get_book_chapters", 1),
+)
+
+# Arguments of the calls that need them
+READ_ARGS = {"get_book_chapters": ("Psalms",)}
+
+def _baseline(duration: float, seed: int) -> dict:
+    """Call the tracker directly from this thread until the duration is up"""
+    rng = random.Random(seed)
+    names = [name for name, _ in READ_MIX]
+    weights = [weight for _, weight in READ_MIX]
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        call_start = time.perf_counter()
+        getattr(tracker, name)(*READ_ARGS.get(name, ()))
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return dict(_summarize(latencies), readers=0, concurrency=1, seconds=round(elapsed, 3),
+                calls_per_second=round(len(latencies) / elapsed, 1))
+
+async def _caller(deadline: float, write_ratio: float, position, seed: int, latencies: List[float]):
+    """Make calls one after another until the deadline"""
+    rng = random.Random(seed)
+    names = [name for name, _ in READ_MIX]
+    weights = [weight for _, weight in READ_MIX]
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            # Records the current position again, so the data stays the same shape
+            await aiotracker.update_reading_position(*position)
+        else:
+            name = rng.choices(names, weights)[0]
+            await getattr(aiotracker, name)(*READ_ARGS.get(name, ()))
+        latencies.append(time.perf_counter() - start)
+
+async def _load(concurrency: int, duration: float, write_ratio: float, seed: int) -> dict:
+    """Run one concurrency level and summarize it"""
+    position = await aiotracker.get_current_position()
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _caller(deadline, write_ratio, position, seed + number, latencies)
+        for number in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    return dict(_summarize(latencies), concurrency=concurrency, seconds=round(elapsed, 3),
+                calls_per_second=round(len(latencies) / elapsed, 1))
+
+def run_concurrency(path: str, readers: List[int], concurrency: List[int], duration: float,
+                    write_ratio: float, preset: str, seed: int) -> List[dict]:
+    """Time the baseline and every reader count and concurrency level against the database at path"""
+    db.close_connection()
+    db.DB_PATH = path
+    db.set_preset(preset)
+    # Upgrades databases built by older versions
+    db.init_db()
+    
+    results = []
+    result = _baseline(duration, seed)
+    result.update(preset=preset, write_ratio=0.0, name="baseline")
+    results.append(result)
+    print(f"  {'direct calls':<28} {result['calls_per_second']:>9.1f} calls/s  "
+          f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms", file=sys.stderr)
+    db.close_connection()
+    
+    for reader_count in readers:
+        aiotracker.configure(readers=reader_count)
+        for callers in concurrency:
+            result = asyncio.run(_load(callers, duration, write_ratio, seed))
+            result.update(readers=reader_count, preset=preset, write_ratio=write_ratio, name="aiotracker")
+            results.append(result)
+            print(f"  readers={reader_count:<3} concurrency={callers:<5} {result['calls_per_second']:>9.1f} calls/s  "
+                  f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms", file=sys.stderr)
+        aiotracker.close()
+    return results
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.concurrency",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, nargs="+", default=list(DEFAULT_READERS),
+                        help="Reader thread counts to benchmark (default: 1 2 4 8)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY),
+                        help="Concurrent callers, one run per value (default: 1 16 64 256)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help="Seconds each run lasts (default: 5)")
+    parser.add_argument("--write-ratio", type=float, default=0.0,
+                        help="Share of calls that update the position (default: 0)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help="reading_history rows of the synthetic database (default: 100000)")
+    parser.add_argument("--years", type=float, default=3, help="Span of the synthetic history (default: 3)")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED, help="Random seed for the synthetic data")
+    parser.add_argument("--preset", nargs="+", choices=sorted(db.PERFORMANCE_PRESETS),
+                        default=[db.PERFORMANCE_PRESET], help="SQLite presets to benchmark")
+    parser.add_argument("--workdir", help="Directory for the synthetic databases (default: a temporary one)")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file, or - for stdout")
+    return parser
+
+def main(argv=None) -> int:
+    """Build the database, run each level and report; returns the exit code"""
+    args = build_parser().parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bible-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    
+    results = []
+    try:
+        template = synthetic.cached_database(workdir, args.rows, args.years, args.seed)
+        for preset in args.preset:
+            path = os.path.join(workdir, f"run-concurrency-{args.rows}-{preset}.db")
+            shutil.copyfile(template, path)
+            
+            print(f"rows={args.rows} preset={preset} write_ratio={args.write_ratio}", file=sys.stderr)
+            results.extend(run_concurrency(path, args.readers, args.concurrency, args.duration,
+                                           args.write_ratio, preset, args.seed))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rows": args.rows,
+        "duration": args.duration,
+        "results": results,
+    }
+    
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Load test for the HTTP API
+
+Starts `main.py serve` on a copy of a synthetic database (or uses a server
+already running at --url), keeps a number of keep-alive connections busy
+with a mix of dashboard, position, chapter, statistics and search requests
+for a fixed time, and reports requests per second and latency percentiles:
+
+    python -m benchmarks.loadtest --connections 1 8 32 --duration 10
+    python -m benchmarks.loadtest --cache-ttl 0 --write-ratio 0.05
+
+The clients run in this process, so on a machine with few cores the
+numbers include their own overhead.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import quote, urlsplit
+from benchmarks import synthetic
+from benchmarks.run import REPO_ROOT, _git_revision
+
+# Bump when the layout of the results file changes
+RESULTS_FORMAT = 1
+
+DEFAULT_CONNECTIONS = (1, 8, 32)
+DEFAULT_DURATION = 10.0
+DEFAULT_ROWS = 100000
+
+# Read requests and how often each is made relative to the others
+READ_MIX = (
+    ("/position", 4),
+    ("/dashboard", 3),
+    ("/next", 2),
+    ("/percentages", 2),
+    ("/chapter?book=Psalms&chapter=119", 1),
+    ("/chapters?book=Psalms", 1),
+    ("/stats", 1),
+    ("/search?q=" + quote("the lord") + "&limit=10", 1),
+)
+
+# Seconds to wait for a started server to print its address
+STARTUP_TIMEOUT = 30
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def _summarize(latencies: List[float]) -> dict:
+    """Latency percentiles in milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p90_ms": round(_percentile(ordered, 0.90) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+def _request(method: str, path: str, host: str, body: bytes = b"") -> bytes:
+    """Encode a keep-alive request"""
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+    if body:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    return (head + "\r\n").encode("latin-1") + body
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    """Read one response as (status, headers, body)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+async def _exchange(reader, writer, request: bytes):
+    """Send a request and read its response"""
+    writer.write(request)
+    await writer.drain()
+    return await _read_response(reader)
+
+async def _client(host: str, port: int, deadline: float, write_ratio: float, profile: str,
+                  seed: int, stats: dict):
+    """Send requests on one connection until the deadline"""
+    rng = random.Random(seed)
+    suffix = f"&profile={quote(profile)}" if profile else ""
+    reads = [
+        (path, _request("GET", path + (suffix if "?" in path else suffix.replace("&", "?", 1)), host))
+        for path, _ in READ_MIX
+    ]
+    weights = [weight for _, weight in READ_MIX]
+    
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        # Writes record the current position again, so the data stays the same shape
+        _, _, body = await _exchange(reader, writer, reads[0][1])
+        position = json.loads(body)
+        fields = {"book": position["book"], "chapter": position["chapter"], "verse": position["verse"]}
+        if profile:
+            fields["profile"] = profile
+        write = ("POST /position", _request("POST", "/position", host, json.dumps(fields).encode("utf-8")))
+        
+        while time.perf_counter() < deadline:
+            name, request = write if rng.random() < write_ratio else rng.choices(reads, weights)[0]
+            start = time.perf_counter()
+            status, headers, _ = await _exchange(reader, writer, request)
+            stats["latencies"].setdefault(name, []).append(time.perf_counter() - start)
+            if status != 200:
+                stats["errors"] += 1
+            if headers.get("x-cache") == "hit":
+                stats["cache_hits"] += 1
+    finally:
+        writer.close()
+
+async def _load(host: str, port: int, connections: int, duration: float, write_ratio: float,
+                profile: str, seed: int) -> dict:
+    """Run one load level and summarize it"""
+    stats = {"latencies": {}, "errors": 0, "cache_hits": 0}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, deadline, write_ratio, profile, seed + number, stats)
+        for number in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    
+    latencies = [latency for values in stats["latencies"].values() for latency in values]
+    result = dict(_summarize(latencies), connections=connections, seconds=round(elapsed, 3),
+                  requests_per_second=round(len(latencies) / elapsed, 1), errors=stats["errors"],
+                  cache_hit_rate=round(stats["cache_hits"] / len(latencies), 3) if latencies else 0.0)
+    result["endpoints"] = {name: _summarize(values) for name, values in sorted(stats["latencies"].items())}
+    return result
+
+def _start_server(rundir: str, workers: int, cache_ttl: float) -> Tuple[subprocess.Popen, str, int]:
+    """Start main.py serve on a free port in rundir; returns the process and its address"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "main.py"), "serve", "--port", "0",
+         "--workers", str(workers), "--cache-ttl", str(cache_ttl)],
+        cwd=rundir, stdout=subprocess.PIPE, text=True
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if not line:
+            break
+        if "http://" in line:
+            address = urlsplit(line[line.index("http://"):].split()[0])
+            return process, address.hostname, address.port
+    process.kill()
+    raise RuntimeError("The server did not start")
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Test a server that is already running instead of starting one")
+    parser.add_argument("--connections", type=int, nargs="+", default=list(DEFAULT_CONNECTIONS),
+                        help="Concurrent keep-alive connections, one run per value (default: 1 8 32)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help="Seconds each run lasts (default: 10)")
+    parser.add_argument("--write-ratio", type=float, default=0.0,
+                        help="Share of requests that update the position (default: 0)")
+    parser.add_argument("--profile", help="Profile the requests use")
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads of the started server (default: 4)")
+    parser.add_argument("--cache-ttl", type=float, default=1.0,
+                        help="Response cache lifetime of the started server; 0 disables it (default: 1)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help="reading_history rows of the synthetic database (default: 100000)")
+    parser.add_argument("--years", type=float, default=3, help="Span of the synthetic history (default: 3)")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED, help="Random seed for the synthetic data")
+    parser.add_argument("--workdir", help="Directory for the synthetic databases (default: a temporary one)")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file, or - for stdout")
+    return parser
+
+def main(argv=None) -> int:
+    """Start a server if needed, run each load level and report; returns the exit code"""
+    args = build_parser().parse_args(argv)
+    workdir = None
+    process = None
+    results = []
+    try:
+        if args.url:
+            address = urlsplit(args.url)
+            host, port = address.hostname, address.port or 80
+        else:
+            workdir = args.workdir or tempfile.mkdtemp(prefix="bible-bench-")
+            os.makedirs(workdir, exist_ok=True)
+            template = synthetic.cached_database(workdir, args.rows, args.years, args.seed)
+            
+            rundir = os.path.join(workdir, f"run-{args.rows}-serve")
+            shutil.rmtree(rundir, ignore_errors=True)
+            os.makedirs(rundir)
+            shutil.copyfile(template, os.path.join(rundir, "bible_tracker.db"))
+            process, host, port = _start_server(rundir, args.workers, args.cache_ttl)
+        
+        for connections in args.connections:
+            result = asyncio.run(_load(host, port, connections, args.duration, args.write_ratio,
+                                       args.profile, args.seed))
+            results.append(result)
+            print(f"connections={connections:<4} {result['requests_per_second']:>9.1f} req/s  "
+                  f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms  "
+                  f"errors {result['errors']}  cache hits {result['cache_hit_rate']:.0%}", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if workdir and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "duration": args.duration,
+        "write_ratio": args.write_ratio,
+        "workers": None if args.url else args.workers,
+        "cache_ttl": None if args.url else args.cache_ttl,
+        "results": results,
+    }
+    
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Per-profile benchmark
+
+Builds one synthetic database per profile count, every profile with its
+own reading history, and times a single profile's dashboard and writes as
+the number of profiles (and so the total history) grows. With indexes
+leading on user_id the times should stay flat:
+
+    python -m benchmarks.profiles --users 1 10 100 500 --rows-per-user 5000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+from typing import List
+import db
+import tracker
+from benchmarks import synthetic
+from benchmarks.run import Case, DEFAULT_REPEAT, _clear_text_caches, _git_revision, _time_case
+
+# Bump when the layout of the results file changes
+RESULTS_FORMAT = 1
+
+DEFAULT_USERS = (1, 10, 100, 500)
+DEFAULT_ROWS_PER_USER = 5000
+
+def _profile_name(user_id: int) -> str:
+    """Get the name synthetic.add_history gives a profile"""
+    return db.DEFAULT_PROFILE if user_id == db.DEFAULT_USER_ID else synthetic.READER_NAME.format(user_id)
+
+def _cold_start():
+    """Forget the connection, profile ids and cached text, as on a fresh start"""
+    db.close_connection()
+    tracker._profile_ids.clear()
+    _clear_text_caches()
+
+def _cases(users: int) -> List[Case]:
+    """Cases timed against one profile count"""
+    first = _profile_name(db.DEFAULT_USER_ID)
+    middle = _profile_name(db.DEFAULT_USER_ID + users // 2)
+    last = _profile_name(db.DEFAULT_USER_ID + users - 1)
+    last_id = db.get_user_id(last)
+    book, chapter, verse = tracker.get_current_position(last)
+    
+    return [
+        Case("tracker.get_dashboard_snapshot[first]", lambda: tracker.get_dashboard_snapshot(first)),
+        Case("tracker.get_dashboard_snapshot[middle]", lambda: tracker.get_dashboard_snapshot(middle)),
+        Case("tracker.get_dashboard_snapshot[last]", lambda: tracker.get_dashboard_snapshot(last)),
+        Case("tracker.get_dashboard_snapshot[cold]", lambda: tracker.get_dashboard_snapshot(last),
+             setup=_cold_start),
+        Case("db.get_dashboard_data[last]", lambda: db.get_dashboard_data(user_id=last_id)),
+        Case("db.get_user_id", lambda: db.get_user_id(last)),
+        Case("tracker.get_profiles", tracker.get_profiles),
+        Case("tracker.get_reading_statistics[last]", lambda: tracker.get_reading_statistics(last)),
+        Case("tracker.update_reading_position[last]",
+             lambda: tracker.update_reading_position(book, chapter, verse, profile=last)),
+        Case("tracker.mark_chapters_read[last]", lambda: tracker.mark_chapters_read("Isaiah", 1, 66, last),
+             repeat=3),
+    ]
+
+def run_profiles(path: str, users: int, rows_per_user: int, preset: str, repeat: int) -> List[dict]:
+    """Time every case against the database at path"""
+    db.close_connection()
+    db.DB_PATH = path
+    db.set_preset(preset)
+    _cold_start()
+    
+    results = []
+    for case in _cases(users):
+        result = _time_case(case, repeat)
+        result.update(users=users, rows_per_user=rows_per_user, total_rows=users * rows_per_user, preset=preset)
+        results.append(result)
+        print(f"  {case.name:<44} {result['median_ms']:>10.3f} ms", file=sys.stderr)
+    
+    db.close_connection()
+    return results
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.profiles",
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=list(DEFAULT_USERS),
+                        help="Profile counts to benchmark (default: 1 10 100 500)")
+    parser.add_argument("--rows-per-user", type=int, default=DEFAULT_ROWS_PER_USER,
+                        help="reading_history rows of each profile (default: 5000)")
+    parser.add_argument("--years", type=float, default=3, help="Span of the synthetic histories (default: 3)")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED, help="Random seed for the synthetic data")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per case (default: 5)")
+    parser.add_argument("--preset", nargs="+", choices=sorted(db.PERFORMANCE_PRESETS),
+                        default=[db.PERFORMANCE_PRESET], help="SQLite presets to benchmark")
+    parser.add_argument("--workdir", help="Directory for the synthetic databases (default: a temporary one)")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file, or - for stdout")
+    return parser
+
+def main(argv=None) -> int:
+    """Build the databases, run the cases and report; returns the exit code"""
+    args = build_parser().parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bible-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    
+    results = []
+    try:
+        for users in args.users:
+            template = synthetic.cached_database(workdir, args.rows_per_user, args.years, args.seed, users)
+            
+            for preset in args.preset:
+                path = os.path.join(workdir, f"run-profiles-{users}-{preset}.db")
+                shutil.copyfile(template, path)
+                
+                print(f"users={users} rows={users * args.rows_per_user} preset={preset}", file=sys.stderr)
+                results.extend(run_profiles(path, users, args.rows_per_user, preset, args.repeat))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "years": args.years,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
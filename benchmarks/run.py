@@ -0,0 +1,597 @@
+"""
+Benchmark suite runner
+
+Builds a synthetic database for each history size, then times every
+public function of tracker and db, search with both engines, exports,
+a full dashboard render and application startup against it. Results are
+written as JSON so runs can be compared:
+
+    python -m benchmarks.run --rows 10000 1000000 --output new.json
+    python -m benchmarks.run --rows 10000 1000000 --compare old.json
+
+Each size and preset runs against a fresh copy of the database, so writes
+made by one run never affect another.
+"""
+
+import argparse
+import datetime
+import inspect
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import db
+import migrations
+import search
+import tracker
+from benchmarks import synthetic
+from reference import passage_ordinals
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows
+
+# Bump when the layout of the results file changes
+RESULTS_FORMAT = 1
+
+DEFAULT_ROWS = (10000, 100000)
+DEFAULT_REPEAT = 5
+
+# A case is a regression when its median grows by more than this factor
+DEFAULT_THRESHOLD = 1.25
+
+# Longest median, in milliseconds, each startup case may take at any
+# history size; slower runs fail
+STARTUP_BUDGETS_MS = {
+    "startup.import": 150,
+    "startup.first_paint": 500,
+    "startup.cli_status": 300,
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Public functions that are configuration rather than work worth timing
+NOT_TIMED = {"db.set_preset"}
+
+class Case(NamedTuple):
+    """A timed operation"""
+    name: str
+    func: Callable[[], object]
+    setup: Optional[Callable[[], object]] = None
+    repeat: Optional[int] = None
+    memory: bool = False
+
+def _peak_rss_kb() -> Optional[float]:
+    """Peak resident set size of this process so far, in KiB, or None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 if sys.platform == "darwin" else float(peak)
+
+def _time_case(case: Case, repeat: int) -> dict:
+    """Run a case and summarize its timings in milliseconds"""
+    rss_before = _peak_rss_kb() if case.memory else None
+    timings = []
+    for _ in range(case.repeat or repeat):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.func()
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    result = {
+        "name": case.name,
+        "runs": len(timings),
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.mean(timings), 4),
+        "max_ms": round(max(timings), 4),
+    }
+    
+    if case.memory:
+        # Process memory, including SQLite's page cache and mmap, which
+        # tracemalloc does not see. The peak only moves when a case uses
+        # more than anything before it, so the growth is a lower bound.
+        rss_after = _peak_rss_kb()
+        if rss_after is not None:
+            result["peak_rss_kb"] = round(rss_after, 1)
+            result["rss_growth_kb"] = round(rss_after - rss_before, 1)
+        
+        # Python allocations, measured in a separate run since tracing
+        # slows everything down
+        if case.setup:
+            case.setup()
+        tracemalloc.start()
+        try:
+            case.func()
+            result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+def _clear_text_caches():
+    """Empty the tracker's verse and chapter caches"""
+    tracker._chapter_cache.clear()
+    tracker._verse_cache.clear()
+
+def _with_engine(engine, func):
+    """Wrap a call so it runs with a specific search engine"""
+    def call():
+        previous = search.ENGINE
+        search.ENGINE = engine
+        try:
+            return func()
+        finally:
+            search.ENGINE = previous
+    return call
+
+def _empty_transaction():
+    """Open and commit a transaction with nothing in it"""
+    with db.transaction():
+        pass
+
+def _export_materialized(output_file: str, format_type: str):
+    """
+    Export the way db.export_to_json did before the streaming exporter:
+    the whole result is built as lists and dicts (nested: one query per
+    chapter), then written by a single json.dump. Kept as a baseline for
+    the export cases' time and memory.
+    """
+    cursor = db.get_connection().cursor()
+    cursor.row_factory = sqlite3.Row
+    
+    if format_type == "nested":
+        cursor.execute("SELECT id, name FROM books ORDER BY book_order")
+        bible_data = []
+        for book in [dict(row) for row in cursor.fetchall()]:
+            book_data = {"book": book["name"], "chapters": []}
+            cursor.execute(
+                "SELECT chapter_number FROM chapters WHERE book_id = ? ORDER BY chapter_number",
+                (book["id"],)
+            )
+            for chapter in [dict(row) for row in cursor.fetchall()]:
+                cursor.execute(
+                    "SELECT verse_number, verse_text FROM verses WHERE book_id = ? AND chapter_number = ? "
+                    "ORDER BY verse_number",
+                    (book["id"], chapter["chapter_number"])
+                )
+                book_data["chapters"].append({
+                    "chapter": chapter["chapter_number"],
+                    "verses": [{"verse": row["verse_number"], "text": row["verse_text"]} for row in cursor.fetchall()],
+                })
+            bible_data.append(book_data)
+    else:
+        cursor.execute("""
+            SELECT b.name as book, v.chapter_number as chapter, v.verse_number as verse, v.verse_text as text
+            FROM verses v
+            JOIN books b ON v.book_id = b.id
+            ORDER BY b.book_order, v.chapter_number, v.verse_number
+        """)
+        bible_data = [dict(row) for row in cursor.fetchall()]
+    
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(bible_data, f, indent=2, ensure_ascii=False)
+
+def _queries(seed: int) -> dict:
+    """Search queries built from the synthetic vocabulary and text"""
+    words = synthetic.vocabulary(seed)
+    phrase = " ".join(search.tokenize(db.get_verse_text(19, 119, 105))[:3])
+    return {
+        "common": words[13],
+        "uncommon": words[400],
+        "rare": words[6000],
+        "phrase": f'"{phrase}"',
+        "prefix": words[300][:3] + "*",
+        "boolean": f"{words[26]} OR {words[13]} NOT {words[36]}",
+    }
+
+def _startup_cases(path: str, preset: str) -> List[Case]:
+    """Time importing the app, the status command and reaching the first dashboard paint in a new process"""
+    env = dict(os.environ, BIBLE_TRACKER_DB_PRESET=preset, TERM="dumb", COLUMNS="120")
+    workdir = os.path.dirname(path)
+    main = os.path.join(REPO_ROOT, "main.py")
+    
+    def run(args, stdin=None):
+        subprocess.run([sys.executable, *args], cwd=workdir, env=env, input=stdin,
+                       stdout=subprocess.DEVNULL, check=True, text=True)
+    
+    return [
+        Case("startup.import", lambda: run(["-c", f"import sys; sys.path.insert(0, {REPO_ROOT!r}); import main"])),
+        Case("startup.first_paint", lambda: run([main], stdin="q\n")),
+        # The status command on its own, against the bare interpreter it runs on
+        Case("startup.interpreter", lambda: run(["-c", "pass"])),
+        Case("startup.cli_status", lambda: run([main, "status"])),
+        Case("startup.cli_status_json", lambda: run([main, "status", "--json"])),
+    ]
+
+def _capture_console():
+    """Send the UI's output to memory, as a 120-column color terminal"""
+    import ui  # Deferred so the suite can list its cases without rich
+    from rich.console import Console
+    
+    ui.console = Console(file=io.StringIO(), width=120, force_terminal=True, color_system="truecolor")
+
+def _read_cases(seed: int) -> List[Case]:
+    """Cases that leave the database unchanged"""
+    import ui  # Deferred so the suite can list its cases without rich
+    
+    queries = _queries(seed)
+    book, chapter, verse = db.get_current_progress()
+    book_id = db.get_book_id(book)
+    devnull = os.devnull
+    engines = ["fts", "index"] if migrations.has_verse_search(db.get_connection().cursor()) else ["index"]
+    
+    cases = [
+        # Connections and transactions
+        Case("db.get_connection", db.get_connection),
+        Case("db.close_connection", lambda: (db.close_connection(), db.get_connection())),
+        Case("db.transaction", _empty_transaction),
+        Case("db.init_db", db.init_db),
+        Case("db.get_connection_count", db.get_connection_count),
+        Case("db.get_connection_pragmas", db.get_connection_pragmas),
+        Case("tracker.get_connection_count", tracker.get_connection_count),
+        Case("db.get_data_version", db.get_data_version),
+        Case("tracker.get_data_version", tracker.get_data_version),
+        Case("db.get_corpus_state", db.get_corpus_state),
+        Case("db.get_pack_path", db.get_pack_path),
+        Case("db.get_pack", db.get_pack),
+        
+        # Position and progress
+        Case("db.get_current_progress", db.get_current_progress),
+        Case("db.get_next_verse", db.get_next_verse),
+        Case("tracker.get_current_position", tracker.get_current_position),
+        Case("tracker.get_current_reference", tracker.get_current_reference),
+        Case("tracker.get_next_verse", tracker.get_next_verse),
+        Case("tracker.get_next_reference", tracker.get_next_reference),
+        Case("db.calculate_percentages", db.calculate_percentages),
+        Case("tracker.get_progress_percentages", tracker.get_progress_percentages),
+        Case("tracker.get_coverage_percentages", tracker.get_coverage_percentages),
+        Case("tracker.get_coverage_percentages[chapter]", lambda: tracker.get_coverage_percentages("Psalms", 119)),
+        Case("db.get_coverage", db.get_coverage),
+        Case("tracker.get_unread_verses", lambda: tracker.get_unread_verses("Psalms")),
+        Case("tracker.get_first_unread", tracker.get_first_unread),
+        Case("db.get_reading_rate", db.get_reading_rate),
+        Case("db.estimate_completion_times", db.estimate_completion_times),
+        Case("tracker.get_completion_estimates", tracker.get_completion_estimates),
+        Case("db.get_reading_stats", db.get_reading_stats),
+        Case("tracker.get_reading_statistics", tracker.get_reading_statistics),
+        Case("db.get_books_read", db.get_books_read),
+        Case("tracker.get_completed_books", tracker.get_completed_books),
+        Case("db.get_completed_chapters", lambda: db.get_completed_chapters("Psalms")),
+        Case("tracker.get_book_chapters", lambda: tracker.get_book_chapters("Psalms")),
+        Case("db.get_dashboard_data", db.get_dashboard_data),
+        Case("tracker.get_dashboard_snapshot", tracker.get_dashboard_snapshot),
+        Case("ui.display_dashboard", ui.display_dashboard,
+             setup=lambda: (_capture_console(), ui.reset_dashboard_cache())),
+        # A redraw after a screen that wrote nothing
+        Case("ui.display_dashboard[unchanged]", ui.display_dashboard, setup=_capture_console),
+        
+        # Profiles
+        Case("db.get_profiles", db.get_profiles),
+        Case("db.get_user_id", lambda: db.get_user_id(db.DEFAULT_PROFILE)),
+        Case("tracker.get_profiles", tracker.get_profiles),
+        Case("tracker.get_current_profile", tracker.get_current_profile),
+        Case("tracker.profile_selected", tracker.profile_selected),
+        Case("tracker.use_profile", lambda: tracker.use_profile(db.DEFAULT_PROFILE)),
+        
+        # Canon lookups
+        Case("db.get_all_books", db.get_all_books),
+        Case("tracker.get_all_books", tracker.get_all_books),
+        Case("db.get_book_id", lambda: db.get_book_id("Psalms")),
+        Case("db.get_book_name", lambda: db.get_book_name(19)),
+        Case("db.get_total_verses", lambda: db.get_total_verses(19, 119)),
+        Case("tracker.find_book", lambda: tracker.find_book("1 cor")),
+        Case("tracker.get_chapter_count", lambda: tracker.get_chapter_count("Psalms")),
+        Case("tracker.get_verse_count", lambda: tracker.get_verse_count("Psalms", 119)),
+        
+        # Verse text, from the database and through the tracker caches
+        Case("db.get_verse_text", lambda: db.get_verse_text(book_id, chapter, verse)),
+        Case("db.get_chapter_verses", lambda: db.get_chapter_verses(19, 119)),
+        Case("tracker.get_verse_content[cold]", lambda: tracker.get_verse_content(book, chapter, verse),
+             setup=_clear_text_caches),
+        Case("tracker.get_verse_content[warm]", lambda: tracker.get_verse_content(book, chapter, verse)),
+        Case("tracker.get_chapter_content[cold]", lambda: tracker.get_chapter_content("Psalms", 119),
+             setup=_clear_text_caches),
+        Case("tracker.get_chapter_content[warm]", lambda: tracker.get_chapter_content("Psalms", 119)),
+        Case("tracker.prefetch_adjacent_chapters", lambda: tracker.prefetch_adjacent_chapters("Psalms", 100),
+             setup=_clear_text_caches),
+        Case("tracker.get_text_cache_stats", tracker.get_text_cache_stats),
+        
+        # Search
+        Case("tracker.get_search_engine", tracker.get_search_engine),
+        *(Case(f"tracker.search_verses[{engine}:{label}]",
+               _with_engine(engine, lambda q=query: tracker.search_verses(q)))
+          for engine in engines for label, query in queries.items()),
+        *(Case(f"tracker.count_search_results[{engine}:{label}]",
+               _with_engine(engine, lambda q=query: tracker.count_search_results(q)))
+          for engine in engines for label, query in queries.items()),
+        *(Case(f"tracker.search_verses[{engine}:book]",
+               _with_engine(engine, lambda: tracker.search_verses(queries["common"], book="Psalms")))
+          for engine in engines),
+        
+        # Export
+        Case("tracker.export_filename", lambda: tracker.export_filename("bible", "ndjson", True)),
+        Case("db.export_to_json", lambda: db.export_to_json(devnull, "nested"), repeat=3, memory=True),
+        Case("tracker.export_bible[nested]", lambda: tracker.export_bible(devnull, "nested"), repeat=3, memory=True),
+        Case("tracker.export_bible[ndjson]", lambda: tracker.export_bible(devnull, "ndjson"), repeat=3, memory=True),
+        Case("tracker.export_bible[csv:book]", lambda: tracker.export_bible(devnull, "csv", "Psalms")),
+        Case("tracker.export_bible_by_book",
+             lambda: tracker.export_bible_by_book(os.path.join(os.path.dirname(db.DB_PATH), "split"), "ndjson"),
+             repeat=2),
+        # The export before streaming, for comparison; last, since the peak
+        # RSS it reaches would hide the streaming cases' own
+        Case("baseline.export_materialized[nested]", lambda: _export_materialized(devnull, "nested"),
+             repeat=3, memory=True),
+        Case("baseline.export_materialized[flat]", lambda: _export_materialized(devnull, "flat"),
+             repeat=3, memory=True),
+    ]
+    return cases
+
+def _write_cases() -> List[Case]:
+    """Cases that add reading history"""
+    import ui  # Deferred so the suite can list its cases without rich
+    
+    book, chapter, verse = db.get_current_progress()
+    
+    def record_position():
+        _capture_console()
+        ui.display_dashboard()
+        tracker.update_reading_position(book, chapter, verse)
+    
+    # A chapter a day for a month, as a reading log would hold it
+    import_file = os.path.join(os.path.dirname(db.DB_PATH), "import.csv")
+    with open(import_file, "w", encoding="utf-8") as f:
+        f.write("passage,date\n")
+        for day in range(1, 31):
+            f.write(f"Proverbs {day},2020-01-{day:02d}\n")
+    readings = [(*passage_ordinals(f"Proverbs {day}"), f"2020-01-{day:02d}T00:00:00") for day in range(1, 31)]
+    
+    return [
+        Case("db.update_progress", lambda: db.update_progress(book, chapter, verse)),
+        Case("tracker.update_reading_position", lambda: tracker.update_reading_position(book, chapter, verse)),
+        # A redraw after recording a verse: the data is read again, but
+        # sections showing the same values are not drawn again
+        Case("ui.display_dashboard[after write]", ui.display_dashboard, setup=record_position),
+        Case("tracker.mark_chapter_complete", lambda: tracker.mark_chapter_complete("Psalms", 119)),
+        Case("db.mark_chapters_read", lambda: db.mark_chapters_read("Isaiah", 1, 66), repeat=3),
+        Case("tracker.mark_chapters_read", lambda: tracker.mark_chapters_read("Isaiah", 1, 66), repeat=3),
+        Case("tracker.mark_book_read", lambda: tracker.mark_book_read("Psalms"), repeat=3),
+        Case("db.import_readings", lambda: db.import_readings(readings), repeat=3),
+        Case("tracker.import_reading_history", lambda: tracker.import_reading_history(import_file), repeat=3),
+    ]
+
+def _profile_cases() -> List[Case]:
+    """Cases that add and delete profiles"""
+    numbers = itertools.count()
+    created = []
+    
+    def create_db_profile():
+        created.append(db.create_profile(f"bench-{next(numbers)}"))
+    
+    return [
+        Case("db.create_profile", lambda: db.create_profile(f"bench-{next(numbers)}")),
+        Case("tracker.create_profile", lambda: tracker.create_profile(f"bench-{next(numbers)}")),
+        Case("db.delete_profile", lambda: db.delete_profile(created.pop()), setup=create_db_profile),
+        Case("tracker.delete_profile", lambda: tracker.delete_profile("bench-delete"),
+             setup=lambda: tracker.create_profile("bench-delete")),
+    ]
+
+def _rebuild_cases() -> List[Case]:
+    """Cases that recompute derived data, then read through the corpus pack"""
+    return [
+        Case("db.rebuild_chapter_completion", db.rebuild_chapter_completion, repeat=2),
+        Case("tracker.rebuild_completion_data", tracker.rebuild_completion_data, repeat=2),
+        Case("tracker.rebuild_search_index", tracker.rebuild_search_index, repeat=2),
+        Case("db.build_pack", db.build_pack, repeat=2),
+        Case("tracker.build_corpus_pack", tracker.build_corpus_pack, repeat=2),
+        Case("db.get_pack[packed]", db.get_pack),
+        Case("db.get_verse_text[packed]", lambda: db.get_verse_text(19, 119, 105)),
+        Case("db.get_chapter_verses[packed]", lambda: db.get_chapter_verses(19, 119)),
+        Case("tracker.get_chapter_content[packed:cold]", lambda: tracker.get_chapter_content("Psalms", 119),
+             setup=_clear_text_caches),
+    ]
+
+def _reset_cases() -> List[Case]:
+    """Cases that delete the reading history, run last"""
+    return [
+        Case("db.reset_reading_progress", db.reset_reading_progress, repeat=1),
+        Case("tracker.reset_progress", tracker.reset_progress, repeat=1),
+    ]
+
+def uncovered(names) -> List[str]:
+    """List public tracker and db functions that no case times"""
+    timed = {name.split("[")[0] for name in names} | NOT_TIMED
+    missing = []
+    for module in (db, tracker):
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            qualified = f"{module.__name__}.{name}"
+            if func.__module__ == module.__name__ and not name.startswith("_") and qualified not in timed:
+                missing.append(qualified)
+    return missing
+
+def run_suite(path: str, rows: int, preset: str, seed: int, repeat: int,
+              name_filter: Optional[str] = None) -> Tuple[List[dict], List[str]]:
+    """
+    Time every case against the database at path.
+    
+    Returns:
+        The results, and the names of every case whether it ran or not
+    """
+    db.close_connection()
+    db.DB_PATH = path
+    db.set_preset(preset)
+    _clear_text_caches()
+    
+    # Templates cached by an older revision are upgraded before timing
+    db.init_db()
+    
+    # Build the pure-Python search index up front so its cases time queries only
+    _with_engine("index", lambda: search.rebuild_index())()
+    
+    phases = [
+        _startup_cases(path, preset),
+        _read_cases(seed),
+        _write_cases(),
+        _profile_cases(),
+        _rebuild_cases(),
+        _reset_cases(),
+    ]
+    
+    results = []
+    names = []
+    for build in phases:
+        for case in build:
+            names.append(case.name)
+            if name_filter and name_filter not in case.name:
+                continue
+            result = _time_case(case, repeat)
+            result.update(rows=rows, preset=preset)
+            results.append(result)
+            print(f"  {case.name:<48} {result['median_ms']:>10.3f} ms", file=sys.stderr)
+    
+    db.close_connection()
+    return results, names
+
+def _git_revision() -> Optional[str]:
+    """Get the current commit, if the repository is a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> int:
+    """
+    Print each case's median against a baseline run.
+    
+    Returns:
+        Number of cases slower than the baseline by more than threshold
+    """
+    before = {(r["name"], r["rows"], r["preset"]): r["median_ms"] for r in baseline}
+    regressions = 0
+    print(f"{'case':<48} {'rows':>9} {'preset':>6} {'before':>10} {'after':>10} {'ratio':>7}")
+    for result in results:
+        key = (result["name"], result["rows"], result["preset"])
+        if key not in before:
+            continue
+        ratio = result["median_ms"] / before[key] if before[key] else 1.0
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  slower"
+        print(f"{result['name']:<48} {result['rows']:>9} {result['preset']:>6} "
+              f"{before[key]:>10.3f} {result['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+def over_budget(results: List[dict]) -> int:
+    """
+    Print the startup cases slower than their budget in STARTUP_BUDGETS_MS.
+    
+    Returns:
+        Number of cases over budget
+    """
+    exceeded = 0
+    for result in results:
+        budget = STARTUP_BUDGETS_MS.get(result["name"])
+        if budget is not None and result["median_ms"] > budget:
+            exceeded += 1
+            print(f"Over budget: {result['name']} took {result['median_ms']:.1f} ms with {result['rows']} rows "
+                  f"({result['preset']}), the budget is {budget} ms", file=sys.stderr)
+    return exceeded
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS),
+                        help="reading_history sizes to benchmark (default: 10000 100000)")
+    parser.add_argument("--years", type=float, default=3, help="Span of the synthetic history (default: 3)")
+    parser.add_argument("--seed", type=int, default=synthetic.DEFAULT_SEED, help="Random seed for the synthetic data")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per case (default: 5)")
+    parser.add_argument("--preset", nargs="+", choices=sorted(db.PERFORMANCE_PRESETS),
+                        default=[db.PERFORMANCE_PRESET], help="SQLite presets to benchmark")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--workdir", help="Directory for the synthetic databases (default: a temporary one)")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file, or - for stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a results file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown factor counted as a regression (default: 1.25)")
+    parser.add_argument("--no-budgets", action="store_true",
+                        help="Do not fail when a startup case is over its budget")
+    return parser
+
+def main(argv=None) -> int:
+    """Build the databases, run the suite and report; returns the exit code"""
+    args = build_parser().parse_args(argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bible-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    
+    results = []
+    names = []
+    try:
+        for rows in args.rows:
+            template = synthetic.cached_database(workdir, rows, args.years, args.seed)
+            
+            for preset in args.preset:
+                # Startup cases run main.py, which opens bible_tracker.db in its directory
+                rundir = os.path.join(workdir, f"run-{rows}-{preset}")
+                shutil.rmtree(rundir, ignore_errors=True)
+                os.makedirs(rundir)
+                path = os.path.join(rundir, "bible_tracker.db")
+                shutil.copyfile(template, path)
+                
+                print(f"rows={rows} preset={preset}", file=sys.stderr)
+                suite_results, names = run_suite(path, rows, preset, args.seed, args.repeat, args.filter)
+                results.extend(suite_results)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    missing = uncovered(names)
+    if missing:
+        print("Not benchmarked: " + ", ".join(missing), file=sys.stderr)
+    
+    report = {
+        "format": RESULTS_FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "years": args.years,
+        "repeat": args.repeat,
+        "not_benchmarked": missing,
+        "results": results,
+    }
+    
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    
+    failed = False
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failed = compare(results, baseline, args.threshold) > 0
+    if not args.no_budgets and over_budget(results):
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Deterministic synthetic data for benchmarks
+
+The corpus has every chapter and verse of models.BIBLE_BOOKS, filled with
+made-up words drawn from a Zipf distribution at lengths close to real
+verses, so search and export see realistic term statistics. Reading
+histories simulate a reader working through the Bible over several years,
+wrapping around and occasionally jumping to another chapter.
+
+The same seed always produces the same text and the same history.
+"""
+
+import datetime
+import os
+import random
+import shutil
+import sys
+import time
+from itertools import accumulate
+from typing import Iterator, List, Tuple
+import canon
+import db
+import migrations
+
+DEFAULT_SEED = 1611
+
+# Words in the synthetic vocabulary
+VOCABULARY_SIZE = 12000
+
+# Zipf exponent for word frequencies; close to English prose
+ZIPF_EXPONENT = 1.07
+
+# Words per verse: mean and spread, clamped to the range below
+VERSE_WORDS_MEAN = 26
+VERSE_WORDS_SPREAD = 9
+VERSE_WORDS_RANGE = (4, 90)
+
+# Most frequent words, so queries built from real words behave as usual
+COMMON_WORDS = (
+    "the", "and", "of", "to", "that", "in", "he", "shall", "unto", "for",
+    "i", "his", "a", "lord", "they", "be", "is", "him", "not", "them",
+    "it", "with", "all", "thou", "thy", "was", "god", "which", "my", "me",
+    "said", "but", "ye", "their", "have", "will", "thee", "from", "as", "are",
+)
+
+_ONSETS = ("b", "c", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "t", "v", "z",
+           "br", "ch", "dr", "gl", "kr", "ph", "sh", "st", "th", "tr")
+_VOWELS = ("a", "e", "i", "o", "u", "ai", "ea", "io")
+_CODAS = ("", "", "", "n", "r", "s", "th", "l", "m", "k")
+
+# Fraction of days on which the simulated reader reads nothing
+SKIPPED_DAY_RATE = 0.2
+
+# Chance that a reading moves to the start of a random chapter
+JUMP_RATE = 0.01
+
+# Names of the profiles added after the default one, by profile id
+READER_NAME = "reader{}"
+
+def vocabulary(seed: int = DEFAULT_SEED) -> List[str]:
+    """Build the word list, most frequent word first"""
+    rng = random.Random(seed)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < VOCABULARY_SIZE:
+        word = "".join(
+            rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS)
+            for _ in range(rng.choice((1, 2, 2, 3)))
+        )
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def verse_rows(seed: int = DEFAULT_SEED) -> Iterator[Tuple[int, int, int, str]]:
+    """Generate (book_id, chapter, verse, text) for every verse of the canon"""
+    rng = random.Random(seed)
+    words = vocabulary(seed)
+    weights = list(accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, len(words) + 1)))
+    low, high = VERSE_WORDS_RANGE
+    
+    for ordinal in range(canon.TOTAL_VERSES):
+        book_id, chapter, verse = canon.position(ordinal)
+        length = min(high, max(low, round(rng.gauss(VERSE_WORDS_MEAN, VERSE_WORDS_SPREAD))))
+        verse_words = rng.choices(words, cum_weights=weights, k=length)
+        
+        # A clause break now and then, like real verse text
+        for i in range(6, length - 3, 9):
+            if rng.random() < 0.5:
+                verse_words[i] += ","
+        verse_words[0] = verse_words[0].capitalize()
+        yield book_id, chapter, verse, " ".join(verse_words) + "."
+
+def build_corpus(path: str, seed: int = DEFAULT_SEED) -> int:
+    """
+    Create a database at path with the full schema and synthetic verse text.
+    
+    Returns:
+        Number of verses written
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    
+    db.DB_PATH = path
+    db.init_db()
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO verses (book_id, chapter_number, verse_number, verse_text) VALUES (?, ?, ?, ?)",
+            verse_rows(seed)
+        )
+        cursor.execute("SELECT COUNT(*) FROM verses")
+        count = cursor.fetchone()[0]
+    db.close_connection()
+    return count
+
+def _daily_counts(rng: random.Random, rows: int, days: int) -> List[int]:
+    """Spread rows over days, leaving some days empty and varying the rest"""
+    weights = [0.0 if rng.random() < SKIPPED_DAY_RATE else rng.uniform(0.2, 1.8) for _ in range(days)]
+    weights[-1] = weights[-1] or 1.0  # Always read on the last day
+    total = sum(weights)
+    
+    counts = [int(weight / total * rows) for weight in weights]
+    remainder = rows - sum(counts)
+    reading_days = [day for day, weight in enumerate(weights) if weight]
+    for i in range(remainder):
+        counts[reading_days[i % len(reading_days)]] += 1
+    return counts
+
+def history_rows(rows: int, years: float = 3, seed: int = DEFAULT_SEED,
+                 end: datetime.date = None) -> Iterator[Tuple[int, int, int, str]]:
+    """
+    Generate reading_history rows as (book_id, chapter, verse, date_read).
+    
+    Args:
+        rows: Number of rows to generate
+        years: Length of the reading period
+        seed: Random seed
+        end: Last day of the period (default: yesterday, so streaks and
+            recent-reading statistics have something to find, while every
+            reading is older than positions recorded now)
+    """
+    rng = random.Random(seed)
+    end = end or datetime.date.today() - datetime.timedelta(days=1)
+    days = max(1, round(years * 365))
+    start = end - datetime.timedelta(days=days - 1)
+    
+    ordinal = 0
+    for day, count in enumerate(_daily_counts(rng, rows, days)):
+        if not count:
+            continue
+        
+        date = (start + datetime.timedelta(days=day)).isoformat()
+        # Readings spread from the first one of the day until 10 pm
+        seconds = rng.randrange(6 * 3600, 12 * 3600)
+        step = max(1, 2 * (22 * 3600 - seconds) // count)
+        for _ in range(count):
+            if rng.random() < JUMP_RATE:
+                ordinal = canon.CHAPTER_STARTS[rng.randrange(len(canon.CHAPTER_STARTS))]
+            book_id, chapter, verse = canon.position(ordinal)
+            
+            hours, rest = divmod(min(seconds, 86399), 3600)
+            yield (book_id, chapter, verse,
+                   f"{date}T{hours:02d}:{rest // 60:02d}:{rest % 60:02d}.{rng.randrange(1000000):06d}")
+            
+            ordinal = (ordinal + 1) % canon.TOTAL_VERSES
+            seconds += rng.randint(1, step)
+
+def add_history(path: str, rows: int, years: float = 3, seed: int = DEFAULT_SEED,
+                end: datetime.date = None, users: int = 1):
+    """
+    Replace the reading history of the database at path with a synthetic
+    one, then rebuild the derived tables and set the current position to
+    the verse after the last one read.
+    
+    Args:
+        users: Number of profiles: the default one plus READER_NAME
+            profiles, each with its own history of rows readings
+    """
+    db.DB_PATH = path
+    # Brings a corpus cached by an older version up to the current schema
+    db.init_db()
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM reading_history")
+        cursor.execute("DELETE FROM reading_progress")
+        cursor.execute("DELETE FROM users WHERE id != ?", (db.DEFAULT_USER_ID,))
+        cursor.executemany(
+            "INSERT INTO users (id, name, created_at) VALUES (?, ?, ?)",
+            ((user_id, READER_NAME.format(user_id), datetime.datetime.now().isoformat())
+             for user_id in range(db.DEFAULT_USER_ID + 1, db.DEFAULT_USER_ID + users))
+        )
+        
+        # Bulk loads are much faster with the indexes built afterwards
+        migrations.drop_history_indexes(cursor)
+        for user_id in range(db.DEFAULT_USER_ID, db.DEFAULT_USER_ID + users):
+            # The default profile gets the same history as before profiles existed
+            cursor.executemany(
+                "INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read) VALUES (?, ?, ?, ?, ?)",
+                ((user_id, *row) for row in history_rows(rows, years, seed + user_id - db.DEFAULT_USER_ID, end))
+            )
+        migrations.create_history_indexes(cursor)
+        
+        # The position recorded at the end of each reading day
+        cursor.execute("""
+            INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp)
+            SELECT user_id, book_id, chapter_number, verse_number, MAX(date_read)
+            FROM reading_history
+            GROUP BY user_id, substr(date_read, 1, 10)
+        """)
+        for user_id in range(db.DEFAULT_USER_ID, db.DEFAULT_USER_ID + users):
+            cursor.execute(
+                "SELECT book_id, chapter_number, verse_number, date_read FROM reading_history "
+                "WHERE user_id = ? ORDER BY date_read DESC LIMIT 1",
+                (user_id,)
+            )
+            last = cursor.fetchone()
+            if last is None:
+                cursor.execute(
+                    "INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp) VALUES (?, 1, 1, 1, ?)",
+                    (user_id, datetime.datetime.now().isoformat())
+                )
+            else:
+                next_position = canon.next_position(*last[:3])
+                cursor.execute(
+                    "INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, *next_position, (datetime.datetime.fromisoformat(last[3])
+                                               + datetime.timedelta(microseconds=1)).isoformat())
+                )
+        
+        migrations.rebuild_chapter_completion(cursor)
+        migrations.rebuild_coverage(cursor)
+    db.get_connection().execute("ANALYZE")
+    db.close_connection()
+
+def build_database(path: str, rows: int, years: float = 3, seed: int = DEFAULT_SEED,
+                   end: datetime.date = None, corpus_path: str = None, users: int = 1):
+    """
+    Build a complete synthetic database at path.
+    
+    Args:
+        corpus_path: A database from build_corpus to copy instead of
+            generating the verse text again
+        users: Number of profiles, each with rows readings
+    """
+    if corpus_path:
+        shutil.copyfile(corpus_path, path)
+    else:
+        build_corpus(path, seed)
+    add_history(path, rows, years, seed, end, users)
+
+def cached_database(workdir: str, rows: int, years: float = 3, seed: int = DEFAULT_SEED,
+                    users: int = 1) -> str:
+    """
+    Get the path of a synthetic database in workdir, generating it (and the
+    corpus it is copied from) the first time it is asked for.
+    """
+    corpus = os.path.join(workdir, f"corpus-{seed}.db")
+    if not os.path.exists(corpus):
+        print("Generating synthetic corpus...", file=sys.stderr)
+        build_corpus(corpus, seed)
+    
+    if users == 1:
+        path = os.path.join(workdir, f"history-{rows}-{years:g}y-{seed}.db")
+    else:
+        path = os.path.join(workdir, f"profiles-{users}x{rows}-{years:g}y-{seed}.db")
+    if not os.path.exists(path):
+        if users == 1:
+            print(f"Generating {rows} reading_history rows...", file=sys.stderr)
+        else:
+            print(f"Generating {users} profiles of {rows} reading_history rows...", file=sys.stderr)
+        start = time.perf_counter()
+        build_database(path, rows, years, seed, corpus_path=corpus, users=users)
+        print(f"  done in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return path
@@ -0,0 +1,178 @@
+"""
+In-memory index of the Bible canon
+
+Built once at import from the static data in models, so lookups by book
+name or ID and verse-count arithmetic never touch the database.
+"""
+
+from bisect import bisect_right
+from typing import Iterator, Optional, Tuple
+from models import BIBLE_BOOKS, CHAPTER_VERSES
+
+# Default verse count for an unknown chapter, matching db.get_total_verses
+DEFAULT_CHAPTER_VERSES = 30
+
+# Book lookups
+BOOKS_BY_ID = {book["id"]: book for book in BIBLE_BOOKS}
+BOOKS_BY_NAME = {book["name"]: book for book in BIBLE_BOOKS}
+BOOKS_BY_LOWER_NAME = {book["name"].lower(): book for book in BIBLE_BOOKS}
+BOOK_NAMES = [book["name"] for book in BIBLE_BOOKS]
+FIRST_BOOK_ID = BIBLE_BOOKS[0]["id"]
+LAST_BOOK_ID = BIBLE_BOOKS[-1]["id"]
+
+# Verse counts per chapter, VERSE_COUNTS[book_id][chapter] (index 0 unused)
+VERSE_COUNTS = {}
+
+# Verses before each chapter within its book, CHAPTER_OFFSETS[book_id][chapter];
+# the entry after the last chapter holds the book's total
+CHAPTER_OFFSETS = {}
+
+# Verses before each book in the whole Bible
+BOOK_OFFSETS = {}
+
+# Global verse ordinal at which each chapter starts, in canonical order,
+# with the matching (book_id, chapter) at the same index of CHAPTER_KEYS
+CHAPTER_STARTS = []
+CHAPTER_KEYS = []
+
+TOTAL_VERSES = 0
+
+for _book in BIBLE_BOOKS:
+    _counts = CHAPTER_VERSES[_book["id"]]
+    _offsets = [0, 0]
+    for _chapter, _count in enumerate(_counts, 1):
+        CHAPTER_STARTS.append(TOTAL_VERSES + _offsets[-1])
+        CHAPTER_KEYS.append((_book["id"], _chapter))
+        _offsets.append(_offsets[-1] + _count)
+    
+    VERSE_COUNTS[_book["id"]] = (0,) + tuple(_counts)
+    CHAPTER_OFFSETS[_book["id"]] = tuple(_offsets)
+    BOOK_OFFSETS[_book["id"]] = TOTAL_VERSES
+    TOTAL_VERSES += _offsets[-1]
+
+del _book, _counts, _offsets, _chapter, _count
+
+def get_book_id(book_name: str) -> Optional[int]:
+    """Get the ID of a book by exact name"""
+    book = BOOKS_BY_NAME.get(book_name)
+    return book["id"] if book else None
+
+def get_book_name(book_id: int) -> Optional[str]:
+    """Get the name of a book by ID"""
+    book = BOOKS_BY_ID.get(book_id)
+    return book["name"] if book else None
+
+def find_book(query: str) -> Optional[str]:
+    """
+    Find a book name from user input.
+    
+    Tries a case-insensitive exact match first, then the first book whose
+    name contains the query.
+    """
+    query = query.strip().lower()
+    if not query:
+        return None
+    
+    book = BOOKS_BY_LOWER_NAME.get(query)
+    if book:
+        return book["name"]
+    
+    for name in BOOK_NAMES:
+        if query in name.lower():
+            return name
+    return None
+
+def chapter_count(book_id: int) -> int:
+    """Get the number of chapters in a book"""
+    book = BOOKS_BY_ID.get(book_id)
+    return book["chapters"] if book else 0
+
+def verse_count(book_id: int, chapter: int) -> int:
+    """Get the number of verses in a chapter"""
+    counts = VERSE_COUNTS.get(book_id)
+    if counts and 1 <= chapter < len(counts):
+        return counts[chapter]
+    return DEFAULT_CHAPTER_VERSES
+
+def book_verse_count(book_id: int) -> int:
+    """Get the number of verses in a book"""
+    offsets = CHAPTER_OFFSETS.get(book_id)
+    return offsets[-1] if offsets else 0
+
+def verses_before_chapter(book_id: int, chapter: int) -> int:
+    """Get the number of verses in a book before the given chapter"""
+    offsets = CHAPTER_OFFSETS.get(book_id)
+    if not offsets:
+        return 0
+    return offsets[max(1, min(chapter, len(offsets) - 1))]
+
+def verses_after_book(book_id: int) -> int:
+    """Get the number of verses in all books after the given book"""
+    if book_id not in BOOK_OFFSETS:
+        return 0
+    return TOTAL_VERSES - BOOK_OFFSETS[book_id] - book_verse_count(book_id)
+
+def next_position(book_id: int, chapter: int, verse: int) -> Tuple[int, int, int]:
+    """
+    Get the position after a verse as (book_id, chapter, verse).
+    
+    Moves to the next chapter after a chapter's last verse and to the next
+    book after a book's last chapter. After the end of Revelation the book
+    stays the same and the chapter wraps to 1.
+    """
+    verse += 1
+    if verse > verse_count(book_id, chapter):
+        verse = 1
+        chapter += 1
+        if chapter > chapter_count(book_id):
+            chapter = 1
+            if book_id < LAST_BOOK_ID:
+                book_id += 1
+    return (book_id, chapter, verse)
+
+def ordinal(book_id: int, chapter: int, verse: int) -> int:
+    """
+    Get the global ordinal of a verse, counting from 0 at Genesis 1:1.
+    
+    Raises:
+        ValueError: If the book, chapter or verse does not exist
+    """
+    counts = VERSE_COUNTS.get(book_id)
+    if not counts or not 1 <= chapter < len(counts) or not 1 <= verse <= counts[chapter]:
+        raise ValueError(f"No such verse: book {book_id} {chapter}:{verse}")
+    return BOOK_OFFSETS[book_id] + CHAPTER_OFFSETS[book_id][chapter] + verse - 1
+
+def position(verse_ordinal: int) -> Tuple[int, int, int]:
+    """
+    Get the (book_id, chapter, verse) of a global verse ordinal.
+    
+    Raises:
+        ValueError: If the ordinal is outside the Bible
+    """
+    if not 0 <= verse_ordinal < TOTAL_VERSES:
+        raise ValueError(f"Verse ordinal out of range: {verse_ordinal}")
+    
+    index = bisect_right(CHAPTER_STARTS, verse_ordinal) - 1
+    book_id, chapter = CHAPTER_KEYS[index]
+    return (book_id, chapter, verse_ordinal - CHAPTER_STARTS[index] + 1)
+
+def positions(first: int, last: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    Iterate over the (book_id, chapter, verse) of every ordinal from first
+    to last, inclusive, a chapter at a time.
+    
+    Raises:
+        ValueError: If the range is outside the Bible
+    """
+    if not 0 <= first < TOTAL_VERSES or not 0 <= last < TOTAL_VERSES:
+        raise ValueError(f"Verse ordinals out of range: {first}-{last}")
+    
+    index = bisect_right(CHAPTER_STARTS, first) - 1
+    while first <= last:
+        book_id, chapter = CHAPTER_KEYS[index]
+        start = CHAPTER_STARTS[index]
+        end = min(last, start + VERSE_COUNTS[book_id][chapter] - 1)
+        for verse in range(first - start + 1, end - start + 2):
+            yield (book_id, chapter, verse)
+        first = end + 1
+        index += 1
@@ -0,0 +1,494 @@
+"""
+Command line interface for running tracker tasks without the menu
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional, Tuple
+import db
+import querytrace
+import tracker
+from reference import Reference
+
+# Skipped import entries listed before the rest are summarized
+IMPORT_ERRORS_SHOWN = 20
+
+def _print_json(data):
+    """Print a result as one line of JSON"""
+    print(json.dumps(data, ensure_ascii=False))
+
+def _emit(args, data, text: str):
+    """Print a command's result as JSON with --json, otherwise as text"""
+    if args.json:
+        _print_json(data)
+    else:
+        print(text)
+
+def _position(reference: Optional[Reference]) -> Optional[dict]:
+    """A position as a JSON object, or None past the end of the Bible"""
+    if reference is None:
+        return None
+    book, chapter, verse = reference.to_tuple()
+    return {"book": book, "chapter": chapter, "verse": verse, "reference": str(reference)}
+
+def _chapter_arg(book_query: str, chapter: int) -> Optional[Tuple[str, int]]:
+    """Resolve a book name and check the chapter exists, printing an error if not"""
+    book = tracker.find_book(book_query)
+    if not book:
+        print(f"Book '{book_query}' not found.", file=sys.stderr)
+        return None
+    if not 1 <= chapter <= tracker.get_chapter_count(book):
+        print(f"{book} has no chapter {chapter}.", file=sys.stderr)
+        return None
+    return book, chapter
+
+def cmd_status(args):
+    """Show the reading position and completion, without the dashboard"""
+    current = tracker.get_current_reference()
+    percentages = tracker.get_progress_percentages()
+    
+    data = {
+        "profile": tracker.get_current_profile(),
+        "position": _position(current),
+        "next": _position(current.next()),
+        "percentages": percentages,
+    }
+    _emit(args, data, f"{current}  chapter {percentages['chapter']:.0f}%  "
+                      f"book {percentages['book']:.0f}%  Bible {percentages['bible']:.1f}%")
+    return 0
+
+def cmd_next(args):
+    """Show the next verse to read"""
+    reference = tracker.get_next_reference()
+    if reference is None:
+        _emit(args, None, "You have reached the end of the Bible.")
+        return 0
+    
+    text = tracker.get_verse_content(reference)
+    _emit(args, dict(_position(reference), text=text), f"{reference}  {text}")
+    return 0
+
+def cmd_mark_chapter(args):
+    """Mark a chapter complete (the current one by default) and advance"""
+    if args.book:
+        if args.chapter is None:
+            print("mark-chapter needs a chapter number after the book.", file=sys.stderr)
+            return 2
+        resolved = _chapter_arg(args.book, args.chapter)
+        if resolved is None:
+            return 2
+        book, chapter = resolved
+    else:
+        # The stored position may name a chapter that does not exist
+        resolved = _chapter_arg(*tracker.get_current_position()[:2])
+        if resolved is None:
+            return 1
+        book, chapter = resolved
+    
+    if not tracker.mark_chapter_complete(book, chapter):
+        return 1
+    
+    current = tracker.get_current_reference()
+    _emit(args, {"completed": {"book": book, "chapter": chapter}, "position": _position(current)},
+          f"Marked {book} {chapter} complete. Now at {current}.")
+    return 0
+
+def cmd_mark_verse(args):
+    """Move the reading position to a verse, in the current chapter by default"""
+    if len(args.position) == 1:
+        resolved = _chapter_arg(*tracker.get_current_position()[:2])
+        if resolved is None:
+            return 1
+        book, chapter = resolved
+    elif len(args.position) == 3:
+        try:
+            resolved = _chapter_arg(args.position[0], int(args.position[1]))
+        except ValueError:
+            print(f"Invalid chapter: {args.position[1]}", file=sys.stderr)
+            return 2
+        if resolved is None:
+            return 2
+        book, chapter = resolved
+    else:
+        print("mark-verse takes VERSE or BOOK CHAPTER VERSE.", file=sys.stderr)
+        return 2
+    
+    try:
+        verse = int(args.position[-1])
+    except ValueError:
+        print(f"Invalid verse: {args.position[-1]}", file=sys.stderr)
+        return 2
+    if not 1 <= verse <= tracker.get_verse_count(book, chapter):
+        print(f"{book} {chapter} has no verse {verse}.", file=sys.stderr)
+        return 2
+    
+    if not tracker.update_reading_position(book, chapter, verse):
+        return 1
+    
+    current = tracker.get_current_reference()
+    _emit(args, {"position": _position(current)}, f"Position set to {current}.")
+    return 0
+
+def cmd_read(args):
+    """Print the text of a chapter"""
+    resolved = _chapter_arg(args.book, args.chapter)
+    if resolved is None:
+        return 2
+    book, chapter = resolved
+    
+    verses = tracker.get_chapter_content(book, chapter)
+    data = {"book": book, "chapter": chapter, "verses": [{"verse": verse, "text": text} for verse, text in verses]}
+    _emit(args, data, "\n".join([f"{book} {chapter}"] + [f"{verse} {text}" for verse, text in verses]))
+    return 0
+
+def cmd_stats(args):
+    """Show reading statistics and completion estimates"""
+    stats = tracker.get_reading_statistics()
+    estimates = tracker.get_completion_estimates()
+    
+    if args.json:
+        _print_json(dict(stats, estimates=estimates))
+        return 0
+    
+    lines = [
+        f"Verses read: {stats['total_verses']}",
+        f"Current streak: {stats['streak']} days",
+        f"Average per day: {stats['avg_per_day']:.1f} verses",
+    ]
+    day, count = stats["most_productive_day"]
+    # Without any history the day is a "No data" placeholder
+    if count:
+        lines.append(f"Most productive day: {day} ({count} verses)")
+    lines.append(f"Days to finish the book: {estimates['book']}")
+    lines.append(f"Days to finish the Bible: {estimates['bible']}")
+    print("\n".join(lines))
+    return 0
+
+def cmd_search(args):
+    """Search verse text"""
+    book = chapter = None
+    if args.book:
+        book = tracker.find_book(args.book)
+        if not book:
+            print(f"Book '{args.book}' not found.", file=sys.stderr)
+            return 2
+        if args.chapter is not None:
+            resolved = _chapter_arg(book, args.chapter)
+            if resolved is None:
+                return 2
+            chapter = resolved[1]
+    
+    query = " ".join(args.query)
+    results = tracker.search_verses(query, book, chapter, args.limit, args.offset)
+    if args.json:
+        _print_json({
+            "total": tracker.count_search_results(query, book, chapter),
+            "results": [result._asdict() for result in results],
+        })
+        return 0
+    
+    if not results and not args.offset:
+        print("No matches.")
+    for result in results:
+        print(f"{result.book} {result.chapter}:{result.verse}  {result.snippet}")
+    return 0
+
+def cmd_rebuild(args):
+    """Recompute derived progress data from reading history"""
+    if not tracker.rebuild_completion_data():
+        return 1
+    print("Chapter completion rebuilt from reading history.")
+    
+    engine = tracker.rebuild_search_index()
+    if not engine:
+        return 1
+    
+    if engine == "fts":
+        print("Search index rebuilt from verse text.")
+    else:
+        print("Search index rebuilt from verse text (pure-Python index; this SQLite build has no FTS5).")
+    return 0
+
+def cmd_pack(args):
+    """Pack the verse text into a memory-mapped file for fast reads"""
+    packed = tracker.build_corpus_pack()
+    if packed is None:
+        return 1
+    
+    print(f"Packed {packed} verses into {db.get_pack_path()}.")
+    return 0
+
+def cmd_export(args):
+    """Export Bible text to a file, a directory of per-book files, or stdout"""
+    import exporter  # Deferred to keep startup fast
+    
+    if args.format not in exporter.FORMATS:
+        print(f"Unknown export format: {args.format} (choose from {', '.join(sorted(exporter.FORMATS))})",
+              file=sys.stderr)
+        return 2
+    
+    if args.split:
+        if args.book:
+            print("--book cannot be combined with --split.", file=sys.stderr)
+            return 2
+        success = tracker.export_bible_by_book(args.split, args.format, args.gzip, args.workers)
+        return 0 if success else 1
+    
+    book = None
+    if args.book:
+        book = tracker.find_book(args.book)
+        if not book:
+            print(f"Book '{args.book}' not found.", file=sys.stderr)
+            return 2
+    
+    success = tracker.export_bible(args.output or exporter.STDOUT, args.format, book, compress=args.gzip or None)
+    return 0 if success else 1
+
+def cmd_import(args):
+    """Add readings from a file of passages and dates to the reading history"""
+    result = tracker.import_reading_history(args.file, args.format, args.strict)
+    if result is None:
+        return 1
+    
+    for error in result.errors[:IMPORT_ERRORS_SHOWN]:
+        print(f"Skipped {error}", file=sys.stderr)
+    if len(result.errors) > IMPORT_ERRORS_SHOWN:
+        print(f"... and {len(result.errors) - IMPORT_ERRORS_SHOWN} more skipped entries", file=sys.stderr)
+    
+    print(f"Imported {result.verses} verses from {result.passages} passages.")
+    return 0
+
+def cmd_profile(args):
+    """List, add or delete reading profiles"""
+    if args.action == "list":
+        current = tracker.get_current_profile()
+        for name in tracker.get_profiles():
+            print(f"{name} (current)" if name.lower() == current.lower() else name)
+        return 0
+    
+    if not args.name:
+        print(f"profile {args.action} needs a profile name.", file=sys.stderr)
+        return 2
+    
+    if args.action == "add":
+        if not tracker.create_profile(args.name):
+            return 1
+        print(f"Added profile {args.name}.")
+    else:
+        if not tracker.delete_profile(args.name):
+            return 1
+        print(f"Deleted profile {args.name} and its reading progress.")
+    return 0
+
+def cmd_serve(args):
+    """Serve the tracker as a local HTTP/JSON API"""
+    import asyncio
+    import server  # Deferred so other commands never load the server
+    
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.workers, args.cache_ttl, args.allow_origin))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error starting server: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def build_parser():
+    """Build the argument parser with all subcommands"""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Bible Study Tracker. Run without arguments for the interactive menu."
+    )
+    parser.add_argument(
+        "--db-preset", choices=sorted(db.PERFORMANCE_PRESETS),
+        help="SQLite performance preset (default: $BIBLE_TRACKER_DB_PRESET or safe)"
+    )
+    parser.add_argument(
+        "--trace", nargs="?", const=querytrace.TRACE_FILE, metavar="FILE",
+        help=f"Record every database query and write the trace as JSON on exit (default file: {querytrace.TRACE_FILE})"
+    )
+    parser.add_argument(
+        "--profile",
+        help="Reading profile to use (default: $BIBLE_TRACKER_PROFILE or default)"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    
+    # Shared by the commands that can print JSON instead of text
+    json_output = argparse.ArgumentParser(add_help=False)
+    json_output.add_argument("--json", action="store_true", help="Print the result as JSON")
+    
+    status = subparsers.add_parser(
+        "status", parents=[json_output],
+        help="Show the reading position and how much is complete"
+    )
+    status.set_defaults(func=cmd_status)
+    
+    next_ = subparsers.add_parser(
+        "next", parents=[json_output],
+        help="Show the next verse to read"
+    )
+    next_.set_defaults(func=cmd_next)
+    
+    mark_chapter = subparsers.add_parser(
+        "mark-chapter", parents=[json_output],
+        help="Mark a chapter complete (default: the current one) and advance"
+    )
+    mark_chapter.add_argument("book", nargs="?", help="Book of the chapter")
+    mark_chapter.add_argument("chapter", nargs="?", type=int, help="Chapter number")
+    mark_chapter.set_defaults(func=cmd_mark_chapter)
+    
+    mark_verse = subparsers.add_parser(
+        "mark-verse", parents=[json_output],
+        help="Move the reading position to a verse (default: in the current chapter)"
+    )
+    mark_verse.add_argument("position", nargs="+", metavar="[BOOK CHAPTER] VERSE")
+    mark_verse.set_defaults(func=cmd_mark_verse)
+    
+    read = subparsers.add_parser(
+        "read", parents=[json_output],
+        help="Print the text of a chapter"
+    )
+    read.add_argument("book")
+    read.add_argument("chapter", type=int)
+    read.set_defaults(func=cmd_read)
+    
+    stats = subparsers.add_parser(
+        "stats", parents=[json_output],
+        help="Show reading statistics and completion estimates"
+    )
+    stats.set_defaults(func=cmd_stats)
+    
+    search_ = subparsers.add_parser(
+        "search", parents=[json_output],
+        help="Search verse text"
+    )
+    search_.add_argument("query", nargs="+", help='Words, "phrases", prefix* terms and AND/OR/NOT')
+    search_.add_argument("-b", "--book", help="Only search this book")
+    search_.add_argument("-c", "--chapter", type=int, help="Only search this chapter of the book")
+    search_.add_argument(
+        "-n", "--limit", type=int,
+        help="Most results to show (default: 20)"
+    )
+    search_.add_argument("--offset", type=int, default=0, help="Best results to skip, for paging")
+    search_.set_defaults(func=cmd_search)
+    
+    rebuild = subparsers.add_parser(
+        "rebuild",
+        help="Recompute completed chapters and the search index"
+    )
+    rebuild.set_defaults(func=cmd_rebuild)
+    
+    pack = subparsers.add_parser(
+        "pack",
+        help="Pack the verse text into a memory-mapped file for fast reads"
+    )
+    pack.set_defaults(func=cmd_pack)
+    
+    export = subparsers.add_parser(
+        "export",
+        help="Export Bible text as JSON, NDJSON or CSV"
+    )
+    export.add_argument(
+        "-f", "--format", default="ndjson",
+        help="Output format: csv, flat, nested or ndjson (default: ndjson)"
+    )
+    export.add_argument("-b", "--book", help="Only export this book")
+    export.add_argument(
+        "-z", "--gzip", action="store_true",
+        help="Gzip the output (implied by an output file ending in .gz)"
+    )
+    destination = export.add_mutually_exclusive_group()
+    destination.add_argument(
+        "-o", "--output",
+        help="File to write, or - for stdout (default: -)"
+    )
+    destination.add_argument(
+        "--split", metavar="DIR",
+        help="Write one file per book into DIR, rendered in parallel"
+    )
+    export.add_argument(
+        "-j", "--workers", type=int,
+        help="Worker processes for --split (default: one per CPU)"
+    )
+    export.set_defaults(func=cmd_export)
+    
+    import_ = subparsers.add_parser(
+        "import",
+        help="Add readings from a CSV, JSON or NDJSON file of passages and dates"
+    )
+    import_.add_argument("file", help="File to read, or - for stdin")
+    import_.add_argument(
+        "-f", "--format", choices=("csv", "json", "ndjson"),
+        help="Input format (default: from the file extension)"
+    )
+    import_.add_argument(
+        "--strict", action="store_true",
+        help="Import nothing if any entry is invalid, instead of skipping it"
+    )
+    import_.set_defaults(func=cmd_import)
+    
+    profile = subparsers.add_parser(
+        "profile",
+        help="List, add or delete reading profiles"
+    )
+    profile.add_argument("action", choices=("list", "add", "delete"))
+    profile.add_argument("name", nargs="?", help="Profile to add or delete")
+    profile.set_defaults(func=cmd_profile)
+    
+    serve = subparsers.add_parser(
+        "serve",
+        help="Serve the tracker as an HTTP/JSON API on localhost"
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    serve.add_argument("-p", "--port", type=int, default=8765, help="Port to listen on; 0 picks a free one (default: 8765)")
+    serve.add_argument(
+        "-j", "--workers", type=int, default=4,
+        help="Threads running database reads; writes run on one more (default: 4)"
+    )
+    serve.add_argument(
+        "--cache-ttl", type=float, default=1.0,
+        help="Seconds read responses are cached; 0 disables the cache (default: 1)"
+    )
+    serve.add_argument("--allow-origin", help="Browser origin allowed to call the API (CORS)")
+    serve.set_defaults(func=cmd_serve)
+    
+    return parser
+
+def run(argv) -> Optional[int]:
+    """
+    Parse arguments, run the chosen command and return its exit code.
+    
+    Returns:
+        None when only global options were given, after applying them,
+        so the caller can go on to the interactive menu
+    """
+    args = build_parser().parse_args(argv)
+    if args.db_preset:
+        db.set_preset(args.db_preset)
+    if args.trace:
+        querytrace.enable(args.trace)
+    db.init_db()
+    
+    if args.profile or tracker.profile_selected():
+        try:
+            tracker.use_profile(args.profile or tracker.get_current_profile())
+        except ValueError as e:
+            print(f"{e}. Add it with: main.py profile add NAME", file=sys.stderr)
+            return 2
+    
+    if args.command is None:
+        return None
+    try:
+        return args.func(args)
+    except ValueError as e:
+        # Such as a stored position that is not in the Bible
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader stopped early (e.g. piped into head); drop what is
+        # still buffered instead of failing again on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
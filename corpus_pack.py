@@ -0,0 +1,162 @@
+"""
+Packed, memory-mapped copy of the verse text
+
+The pack is one read-only file holding every verse as UTF-8 text in
+canonical order, plus an array of offsets indexed by verse ordinal:
+
+    header | offsets[TOTAL_VERSES + 1] | text
+
+Reading a verse is two offset lookups and a slice of the mapping, and
+every process that opens the pack shares the same pages of the OS cache.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Optional, Tuple
+import canon
+
+MAGIC = b"BSTPACK\0"
+
+# Bump when the file layout changes
+PACK_FORMAT = 1
+
+# magic, format, byte order (1 = little endian), verse count,
+# corpus_id (16 ASCII hex digits), corpus revision
+_HEADER = struct.Struct("<8sIII16sQ")
+
+# Unsigned 32-bit array type code
+_OFFSET_TYPE = "I" if array("I").itemsize == 4 else "L"
+_OFFSET_SIZE = array(_OFFSET_TYPE).itemsize
+
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 0
+
+class CorpusPack:
+    """Read-only view of a pack file"""
+    
+    __slots__ = ("path", "corpus_state", "_file", "_map", "_offsets", "_text")
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._file.close()
+            raise ValueError(f"Cannot map corpus pack {path}")
+        
+        try:
+            magic, pack_format, byte_order, count, corpus_id, revision = _HEADER.unpack_from(self._map)
+        except struct.error:
+            self.close()
+            raise ValueError(f"Corpus pack {path} is truncated")
+        if magic != MAGIC or pack_format != PACK_FORMAT or byte_order != _BYTE_ORDER \
+                or count != canon.TOTAL_VERSES:
+            self.close()
+            raise ValueError(f"Corpus pack {path} was written in another format")
+        
+        offsets_end = _HEADER.size + _OFFSET_SIZE * (count + 1)
+        view = memoryview(self._map)
+        self._offsets = view[_HEADER.size:offsets_end].cast(_OFFSET_TYPE)
+        self._text = view[offsets_end:]
+        if len(self._text) != self._offsets[count]:
+            self.close()
+            raise ValueError(f"Corpus pack {path} is truncated")
+        
+        self.corpus_state = (corpus_id.decode("ascii"), revision)
+    
+    def text(self, ordinal: int) -> Optional[str]:
+        """Get the text of a verse by ordinal, or None if the pack has no text for it"""
+        start, end = self._offsets[ordinal], self._offsets[ordinal + 1]
+        if start == end:
+            return None
+        return str(self._text[start:end], "utf-8")
+    
+    def verse(self, book_id: int, chapter: int, verse: int) -> Optional[str]:
+        """Get the text of a verse, or None if it is missing"""
+        try:
+            return self.text(canon.ordinal(book_id, chapter, verse))
+        except ValueError:
+            return None
+    
+    def chapter(self, book_id: int, chapter: int) -> List[Tuple[int, str]]:
+        """Get a chapter as (verse_number, text) pairs, skipping missing verses"""
+        try:
+            start = canon.ordinal(book_id, chapter, 1)
+        except ValueError:
+            return []
+        
+        offsets, text = self._offsets, self._text
+        verses = []
+        for verse in range(1, canon.verse_count(book_id, chapter) + 1):
+            ordinal = start + verse - 1
+            if offsets[ordinal] != offsets[ordinal + 1]:
+                verses.append((verse, str(text[offsets[ordinal]:offsets[ordinal + 1]], "utf-8")))
+        return verses
+    
+    def close(self):
+        """Release the mapping and the file"""
+        for name in ("_offsets", "_text"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+    
+    def __del__(self):
+        # Packs that were replaced are released here, once no thread holds them
+        if hasattr(self, "_map"):
+            self.close()
+
+def open_pack(path: str) -> Optional[CorpusPack]:
+    """Open a pack file, or return None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return CorpusPack(path)
+    except (OSError, ValueError):
+        return None
+
+def write_pack(path: str, rows: Iterable[Tuple[int, int, int, str]], corpus_state: Tuple[str, int]) -> int:
+    """
+    Write a pack file from (book_id, chapter, verse, text) rows.
+    
+    The file is written beside the target and moved into place, so readers
+    never see a partial pack.
+    
+    Raises:
+        ValueError: If a row is not a verse of the canon, since the pack
+            could not hold it
+    
+    Returns:
+        Number of verses packed
+    """
+    texts = [None] * canon.TOTAL_VERSES
+    packed = 0
+    for book_id, chapter, verse, text in rows:
+        texts[canon.ordinal(book_id, chapter, verse)] = text.encode("utf-8")
+        packed += 1
+    
+    offsets = array(_OFFSET_TYPE, [0])
+    for encoded in texts:
+        offsets.append(offsets[-1] + (len(encoded) if encoded else 0))
+    
+    corpus_id, revision = corpus_state
+    header = _HEADER.pack(
+        MAGIC, PACK_FORMAT, _BYTE_ORDER, canon.TOTAL_VERSES,
+        corpus_id.encode("ascii").ljust(16, b"0")[:16], revision
+    )
+    
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.write(offsets.tobytes())
+            f.write(b"".join(encoded for encoded in texts if encoded))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return packed
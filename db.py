@@ -5,170 +5,397 @@ Database operations for the Bible tracker
 import sqlite3
 import datetime
 import math
-from typing import Tuple, List, Dict
-from models import BIBLE_BOOKS
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Tuple, List, Dict, Optional
+import canon
+import corpus_pack
+import verse_coverage
+import migrations
+import querytrace
 
 # Database path in the same directory as the program
 DB_PATH = "bible_tracker.db"
 
+# Profile used when a function is not told whose progress to use
+DEFAULT_USER_ID = migrations.DEFAULT_USER_ID
+DEFAULT_PROFILE = migrations.DEFAULT_PROFILE
+
+# Performance presets: PRAGMA settings applied to every new connection.
+# "safe" keeps SQLite's durable defaults (rollback journal, fsync on every
+# commit); "fast" uses a write-ahead log, syncs less often, and gives each
+# connection a larger page cache and a memory-mapped view of the file.
+# WAL needs a local filesystem, so "fast" should not be used on network shares.
+PERFORMANCE_PRESETS = {
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "temp_store": "MEMORY",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "busy_timeout": 5000,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -16000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+    },
+}
+
+# Preset used for new connections, from BIBLE_TRACKER_DB_PRESET or set_preset()
+PERFORMANCE_PRESET = os.environ.get("BIBLE_TRACKER_DB_PRESET", "safe")
+
+# Extra PRAGMA settings applied after the preset, overriding it
+CONNECTION_PRAGMAS = {}
+
+# Packed copy of the verse text, read instead of the verses table when current
+PACK_SUFFIX = ".pack"
+
+# Seconds between checks that the pack still matches the database
+PACK_CHECK_INTERVAL = 1.0
+
+# Number of prepared statements each connection keeps compiled
+STATEMENT_CACHE_SIZE = 128
+
+# An import must add this many times the rows already in reading_history
+# (across all profiles) before its history indexes are dropped and rebuilt
+INDEX_REBUILD_FACTOR = 2
+
+# One long-lived connection per thread, reopened if DB_PATH or the preset
+# changes or the process forks (a connection must never cross into a
+# child process)
+_local = threading.local()
+_stats_lock = threading.Lock()
+_connections_opened = 0
+
+# Transactions committed by this process that changed at least one row
+_writes_committed = 0
+
+def set_preset(name):
+    """
+    Choose the performance preset for connections opened from now on.
+    
+    Raises:
+        ValueError: If there is no preset with that name
+    """
+    global PERFORMANCE_PRESET
+    if name not in PERFORMANCE_PRESETS:
+        raise ValueError(f"Unknown performance preset: {name}")
+    PERFORMANCE_PRESET = name
+
+def get_connection_pragmas():
+    """Get the PRAGMA settings for new connections"""
+    pragmas = dict(PERFORMANCE_PRESETS.get(PERFORMANCE_PRESET, PERFORMANCE_PRESETS["safe"]))
+    pragmas.update(CONNECTION_PRAGMAS)
+    return pragmas
+
+def _open_connection():
+    """Open a new connection and apply the configured pragmas"""
+    global _connections_opened
+    
+    if querytrace.ENABLED:
+        conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE,
+                               factory=querytrace.TracedConnection)
+        querytrace.record_connection_open()
+    else:
+        conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE_SIZE)
+    for name, value in get_connection_pragmas().items():
+        try:
+            conn.execute(f"PRAGMA {name} = {value}")
+        except sqlite3.OperationalError:
+            # The journal mode can only change while no other connection
+            # has the database open; keep the current mode until then
+            if name != "journal_mode":
+                raise
+    
+    with _stats_lock:
+        _connections_opened += 1
+        _local.serial = _connections_opened
+    return conn
+
 def get_connection():
-    """Get a connection to the database"""
-    return sqlite3.connect(DB_PATH)
+    """Get the current thread's shared connection to the database"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH or _local.pid != os.getpid() \
+            or _local.preset != PERFORMANCE_PRESET:
+        # A connection inherited from the parent process is left alone
+        if conn is not None and _local.pid == os.getpid():
+            conn.close()
+        conn = _open_connection()
+        _local.conn = conn
+        _local.path = DB_PATH
+        _local.pid = os.getpid()
+        _local.preset = PERFORMANCE_PRESET
+        _local.depth = 0
+    return conn
 
-def init_db():
-    """Initialize the database with Bible structure."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def close_connection():
+    """Close the current thread's connection if one is open"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        if _local.pid == os.getpid():
+            conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction(immediate: bool = False):
+    """
+    Run a block of statements in a single transaction.
     
-    # Create tables if they don't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS books (
-        id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        total_chapters INTEGER NOT NULL,
-        book_order INTEGER NOT NULL
-    )
-    ''')
+    Commits when the outermost block exits and rolls back on error.
+    Nested blocks join the enclosing transaction. Reads inside the block
+    all see the same consistent state of the database.
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS chapters (
-        id INTEGER PRIMARY KEY,
-        book_id INTEGER NOT NULL,
-        chapter_number INTEGER NOT NULL,
-        total_verses INTEGER NOT NULL,
-        FOREIGN KEY (book_id) REFERENCES books (id)
-    )
-    ''')
+    Args:
+        immediate: Take the write lock at the start (BEGIN IMMEDIATE), so
+            what the block reads cannot change before it writes
+    """
+    global _writes_committed
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS reading_progress (
-        id INTEGER PRIMARY KEY,
-        book_id INTEGER NOT NULL,
-        chapter_number INTEGER NOT NULL,
-        verse_number INTEGER NOT NULL,
-        timestamp DATETIME NOT NULL,
-        FOREIGN KEY (book_id) REFERENCES books (id)
-    )
-    ''')
+    conn = get_connection()
+    cursor = conn.cursor()
+    _local.depth += 1
+    changes = conn.total_changes
+    try:
+        if _local.depth == 1 and not conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        yield cursor
+        if _local.depth == 1:
+            conn.commit()
+            if conn.total_changes != changes:
+                with _stats_lock:
+                    _writes_committed += 1
+            _recheck_pack()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+        cursor.close()
+
+def get_data_version() -> Tuple[int, int, int]:
+    """
+    Get a value that changes whenever the database may have changed, for
+    caching results of reads. It covers writes committed by this process
+    and, through PRAGMA data_version, commits by other connections or
+    processes.
+    """
+    conn = get_connection()
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    # The connection serial tells a reopened connection's counter apart
+    return (_local.serial, data_version, _writes_committed)
+
+# The open pack (or None), the file signature it was validated against
+# and when that signature was last compared with the files on disk
+_pack = None
+_pack_signature = None
+_pack_checked_at = None
+_pack_lock = threading.Lock()
+
+def get_pack_path():
+    """Path of the packed corpus for the current database"""
+    return DB_PATH + PACK_SUFFIX
+
+def _file_signature():
+    """Identify the current state of the database and pack files"""
+    signature = []
+    for path in (DB_PATH, DB_PATH + "-wal", get_pack_path()):
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:
+            signature.append((path, None))
+    return tuple(signature)
+
+def _recheck_pack():
+    """Validate the pack again on its next use, such as after a write"""
+    global _pack_checked_at
+    _pack_checked_at = None
+
+def _drop_pack():
+    """
+    Stop using the open pack until it is validated again. Threads still
+    reading it keep their reference, and its mapping is released once the
+    last of them is done.
+    """
+    global _pack, _pack_signature, _pack_checked_at
+    _pack, _pack_signature, _pack_checked_at = None, None, None
+
+def get_pack():
+    """
+    Get the packed corpus if it exists and matches the database's verse text.
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS reading_history (
-        id INTEGER PRIMARY KEY,
-        book_id INTEGER NOT NULL,
-        chapter_number INTEGER NOT NULL,
-        verse_number INTEGER NOT NULL,
-        date_read DATETIME NOT NULL,
-        FOREIGN KEY (book_id) REFERENCES books (id)
-    )
-    ''')
+    The files are stat'ed at most once per PACK_CHECK_INTERVAL, and the
+    corpus revision is only queried again after the database or pack
+    file has changed on disk.
+    """
+    global _pack, _pack_signature, _pack_checked_at
+    
+    now = time.monotonic()
+    # Read once, as another thread may drop the pack meanwhile
+    checked_at, checked_signature = _pack_checked_at, _pack_signature
+    if checked_at is not None and now - checked_at < PACK_CHECK_INTERVAL \
+            and checked_signature is not None and checked_signature[0][0] == DB_PATH:
+        return _pack
+    
+    signature = _file_signature()
+    _pack_checked_at = now
+    if signature == _pack_signature:
+        return _pack
+    
+    with _pack_lock:
+        if signature != _pack_signature:
+            # A replaced pack is not closed here, since other threads may
+            # still be reading it; it is released when they drop it
+            pack = _pack
+            if pack is None or pack.path != get_pack_path() or signature[2] != _pack_signature[2]:
+                pack = corpus_pack.open_pack(get_pack_path())
+            
+            # A pack built from older verse text is ignored until rebuilt
+            if pack is not None and pack.corpus_state != tuple(get_corpus_state()):
+                pack = None
+            
+            _pack, _pack_signature = pack, signature
+        return _pack
+
+def build_pack():
+    """
+    Pack the verse text into a memory-mapped file beside the database.
     
-    # Add verses table for text
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS verses (
-        id INTEGER PRIMARY KEY,
-        book_id INTEGER NOT NULL,
-        chapter_number INTEGER NOT NULL,
-        verse_number INTEGER NOT NULL,
-        verse_text TEXT NOT NULL,
-        FOREIGN KEY (book_id) REFERENCES books (id),
-        UNIQUE(book_id, chapter_number, verse_number)
-    )
-    ''')
+    Returns:
+        Number of verses packed, or None on error
+    """
+    try:
+        with _pack_lock:
+            _drop_pack()
+            with transaction() as cursor:
+                corpus_state = migrations.get_corpus_state(cursor)
+                cursor.execute("SELECT book_id, chapter_number, verse_number, verse_text FROM verses")
+                return corpus_pack.write_pack(get_pack_path(), cursor, corpus_state)
+    except Exception as e:
+        print(f"Error building corpus pack: {e}")
+        return None
+
+def get_connection_count():
+    """Get the number of connections opened since startup"""
+    return _connections_opened
+
+def init_db():
+    """Initialize the database with Bible structure."""
+    # A current database needs nothing beyond this single check
+    cursor = get_connection().cursor()
+    if migrations.get_schema_version(cursor) >= migrations.SCHEMA_VERSION:
+        return
+    
+    # Another process may be migrating too; holding the write lock from the
+    # start makes it wait, and migrate() reads the version again once it has it
+    with transaction(immediate=True) as cursor:
+        migrations.migrate(cursor)
+
+def get_profiles() -> List[Tuple[int, str]]:
+    """Get the (id, name) of every profile, oldest first"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT id, name FROM users ORDER BY id")
+    return cursor.fetchall()
+
+def get_user_id(name: str) -> Optional[int]:
+    """Get the id of a profile by name (case-insensitive), or None if there is none"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT id FROM users WHERE name = ?", (name.strip(),))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+def create_profile(name: str) -> Optional[int]:
+    """
+    Add a profile that starts reading at Genesis 1:1.
     
-    # Check if books table is already populated
-    cursor.execute("SELECT COUNT(*) FROM books")
-    if cursor.fetchone()[0] == 0:
-        # Populate books table
-        for book in BIBLE_BOOKS:
+    Returns:
+        The new profile's id, or None if the name is empty or taken
+    """
+    name = name.strip()
+    if not name:
+        print("Error creating profile: name is empty")
+        return None
+    
+    try:
+        with transaction() as cursor:
+            timestamp = datetime.datetime.now().isoformat()
+            cursor.execute("INSERT INTO users (name, created_at) VALUES (?, ?)", (name, timestamp))
+            user_id = cursor.lastrowid
             cursor.execute(
-                "INSERT INTO books (id, name, total_chapters, book_order) VALUES (?, ?, ?, ?)",
-                (book["id"], book["name"], book["chapters"], book["id"])
+                "INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (user_id, 1, 1, 1, timestamp)
             )
+        return user_id
+    except sqlite3.IntegrityError:
+        print(f"Error creating profile: {name} already exists")
+        return None
+    except Exception as e:
+        print(f"Error creating profile: {e}")
+        return None
+
+def delete_profile(user_id: int) -> bool:
+    """Delete a profile and all of its reading progress. The default profile is kept."""
+    if user_id == DEFAULT_USER_ID:
+        print("Error deleting profile: the default profile cannot be deleted")
+        return False
     
-    # Check if we need to initialize reading progress
-    cursor.execute("SELECT COUNT(*) FROM reading_progress")
-    if cursor.fetchone()[0] == 0:
-        # Start at Genesis 1:1
-        timestamp = datetime.datetime.now().isoformat()
-        cursor.execute(
-            "INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?)",
-            (1, 1, 1, timestamp)
-        )
-    
-    conn.commit()
-    conn.close()
+    try:
+        with transaction() as cursor:
+            for table in ("reading_progress", "reading_history", "chapter_completion", "verse_coverage"):
+                cursor.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            return cursor.rowcount > 0
+    except Exception as e:
+        print(f"Error deleting profile: {e}")
+        return False
 
-def get_current_progress() -> Tuple[str, int, int]:
+def get_current_progress(user_id=DEFAULT_USER_ID) -> Tuple[str, int, int]:
     """Get the current reading position."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     
     cursor.execute('''
-    SELECT b.name, rp.chapter_number, rp.verse_number
+    SELECT rp.book_id, rp.chapter_number, rp.verse_number
     FROM reading_progress rp
-    JOIN books b ON rp.book_id = b.id
+    WHERE rp.user_id = ?
     ORDER BY rp.timestamp DESC
     LIMIT 1
-    ''')
+    ''', (user_id,))
     
     result = cursor.fetchone()
-    conn.close()
     
-    if result:
-        return result
+    if result and result[0] in canon.BOOKS_BY_ID:
+        return (canon.get_book_name(result[0]), result[1], result[2])
     else:
         # Default to starting at Genesis 1:1
         return ("Genesis", 1, 1)
 
 def get_book_id(book_name):
     """Get the ID of a book by name"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT id FROM books WHERE name = ?", (book_name,))
-    result = cursor.fetchone()
-    
-    conn.close()
-    
-    if result:
-        return result[0]
-    return None
+    return canon.get_book_id(book_name)
 
 def get_book_name(book_id):
     """Get the name of a book by ID"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT name FROM books WHERE id = ?", (book_id,))
-    result = cursor.fetchone()
-    
-    conn.close()
-    
-    if result:
-        return result[0]
-    return None
+    return canon.get_book_name(book_id)
 
 def get_total_verses(book_id, chapter):
     """Get the total number of verses in a chapter"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    
-    conn.close()
-    
-    if result:
-        return result[0]
-    return 30  # Default if not found
+    return canon.verse_count(book_id, chapter)
 
 def get_verse_text(book_id, chapter, verse):
     """Get the text of a verse"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    pack = get_pack()
+    if pack is not None:
+        text = pack.verse(book_id, chapter, verse)
+        return text if text is not None else "Verse text not available."
+    
+    cursor = get_connection().cursor()
     
     cursor.execute(
         "SELECT verse_text FROM verses WHERE book_id = ? AND chapter_number = ? AND verse_number = ?",
@@ -176,57 +403,18 @@ def get_verse_text(book_id, chapter, verse):
     )
     result = cursor.fetchone()
     
-    conn.close()
-    
     if result:
         return result[0]
     return "Verse text not available."
 
-def get_next_verse() -> Tuple[str, int, int]:
+def get_next_verse(user_id=DEFAULT_USER_ID) -> Tuple[str, int, int]:
     """Get the next verse to read."""
-    book, chapter, verse = get_current_progress()
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT id FROM books WHERE name = ?", (book,))
-    book_id = cursor.fetchone()[0]
-    
-    cursor.execute(
-        "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    total_verses = result[0] if result else 30  # Default if not found
+    book, chapter, verse = get_current_progress(user_id)
     
-    next_book = book
-    next_chapter = chapter
-    next_verse = verse + 1
-    
-    if next_verse > total_verses:
-        next_verse = 1
-        next_chapter += 1
-        
-        cursor.execute(
-            "SELECT total_chapters FROM books WHERE id = ?",
-            (book_id,)
-        )
-        total_chapters = cursor.fetchone()[0]
-        
-        if next_chapter > total_chapters:
-            next_chapter = 1
-            cursor.execute(
-                "SELECT name FROM books WHERE book_order = (SELECT book_order + 1 FROM books WHERE id = ?)",
-                (book_id,)
-            )
-            result = cursor.fetchone()
-            if result:
-                next_book = result[0]
-    
-    conn.close()
-    return (next_book, next_chapter, next_verse)
+    book_id, next_chapter, next_verse = canon.next_position(canon.get_book_id(book), chapter, verse)
+    return (canon.get_book_name(book_id), next_chapter, next_verse)
 
-def update_progress(book: str, chapter: int, verse: int, auto_advance=False):
+def update_progress(book: str, chapter: int, verse: int, auto_advance=False, user_id=DEFAULT_USER_ID):
     """
     Update the reading progress.
     
@@ -235,354 +423,380 @@ def update_progress(book: str, chapter: int, verse: int, auto_advance=False):
         chapter: Chapter number
         verse: Verse number
         auto_advance: If True and this is the last verse, advance to next chapter
+        user_id: Profile whose progress is updated
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute("SELECT id FROM books WHERE name = ?", (book,))
-        result = cursor.fetchone()
-        if not result:
-            return False
-        
-        book_id = result[0]
-        
-        # Check if this is the last verse of the chapter
-        cursor.execute(
-            "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-            (book_id, chapter)
-        )
-        result = cursor.fetchone()
-        total_verses = result[0] if result else 30
-        
-        timestamp = datetime.datetime.now().isoformat()
-        
-        # Record the exact verse marked
-        cursor.execute(
-            """
-            INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp)
-            VALUES (?, ?, ?, ?)
-            """,
-            (book_id, chapter, verse, timestamp)
-        )
-        
-        # Add to reading history
-        cursor.execute(
-            """
-            INSERT INTO reading_history (book_id, chapter_number, verse_number, date_read)
-            VALUES (?, ?, ?, ?)
-            """,
-            (book_id, chapter, verse, timestamp)
-        )
-        
-        # If marking the last verse or beyond, consider the chapter complete
-        # Record all verses in the chapter as read if not already read
-        if verse >= total_verses:
-            # For each verse in the chapter, check if it's already in reading history
-            for v in range(1, total_verses + 1):
-                # Skip the current verse which was already added
-                if v == verse:
-                    continue
-                    
-                # Check if this verse is already in reading history
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM reading_history 
-                    WHERE book_id = ? AND chapter_number = ? AND verse_number = ?
-                    """,
-                    (book_id, chapter, v)
-                )
-                
-                if cursor.fetchone()[0] == 0:
-                    # Add this verse to reading history
-                    cursor.execute(
-                        """
-                        INSERT INTO reading_history (book_id, chapter_number, verse_number, date_read)
-                        VALUES (?, ?, ?, ?)
-                        """,
-                        (book_id, chapter, v, timestamp)
-                    )
-        
-        # If auto-advancing, move to the next chapter or book
-        if verse >= total_verses and auto_advance:
+        with transaction() as cursor:
+            book_id = canon.get_book_id(book)
+            if not book_id:
+                return False
+            
+            # Check if this is the last verse of the chapter
+            total_verses = canon.verse_count(book_id, chapter)
+            
+            timestamp = datetime.datetime.now().isoformat()
+            
+            # Record the exact verse marked
             cursor.execute(
-                "SELECT total_chapters FROM books WHERE id = ?",
-                (book_id,)
+                """
+                INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (user_id, book_id, chapter, verse, timestamp)
             )
-            total_chapters = cursor.fetchone()[0]
             
-            # Create a new timestamp for the next position
-            next_timestamp = datetime.datetime.now().isoformat()
+            # Add to reading history
+            cursor.execute(
+                """
+                INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (user_id, book_id, chapter, verse, timestamp)
+            )
             
-            if chapter >= total_chapters:
-                # Last chapter of book, move to next book
-                cursor.execute(
-                    "SELECT name FROM books WHERE book_order = (SELECT book_order + 1 FROM books WHERE id = ?)",
-                    (book_id,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    next_book = result[0]
-                    next_chapter = 1
-                    next_verse = 1
+            # If marking the last verse or beyond, consider the chapter complete
+            # Record all verses in the chapter as read if not already read
+            if verse >= total_verses:
+                _record_unread_verses(cursor, user_id, book_id, chapter, total_verses, timestamp)
+                _record_chapter_completion(cursor, user_id, book_id, chapter, chapter, timestamp)
+                _record_coverage(cursor, user_id, (book_id, chapter, 1), (book_id, chapter, total_verses))
+            else:
+                _record_coverage(cursor, user_id, (book_id, chapter, verse), (book_id, chapter, verse))
+            
+            # If auto-advancing, move to the next chapter or book
+            if verse >= total_verses and auto_advance:
+                total_chapters = canon.chapter_count(book_id)
+                
+                # Create a new timestamp for the next position
+                next_timestamp = datetime.datetime.now().isoformat()
+                
+                if chapter >= total_chapters:
+                    # Last chapter of book, move to next book
+                    if book_id < canon.LAST_BOOK_ID:
+                        next_book_id = book_id + 1
+                        next_chapter = 1
+                        next_verse = 1
+                        
+                        # Update progress with next book
+                        cursor.execute(
+                            """
+                            INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp)
+                            VALUES (?, ?, ?, ?, ?)
+                            """,
+                            (user_id, next_book_id, next_chapter, next_verse, next_timestamp)
+                        )
+                        
+                        # Add to reading history
+                        cursor.execute(
+                            """
+                            INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+                            VALUES (?, ?, ?, ?, ?)
+                            """,
+                            (user_id, next_book_id, next_chapter, next_verse, next_timestamp)
+                        )
+                        _record_coverage(cursor, user_id, (next_book_id, 1, 1), (next_book_id, 1, 1))
+                else:
+                    # Move to next chapter
+                    next_chapter = chapter + 1
                     
-                    # Update progress with next book
+                    # Update progress with next chapter
                     cursor.execute(
                         """
-                        INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp)
-                        VALUES ((SELECT id FROM books WHERE name = ?), ?, ?, ?)
+                        INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp)
+                        VALUES (?, ?, ?, ?, ?)
                         """,
-                        (next_book, next_chapter, next_verse, next_timestamp)
+                        (user_id, book_id, next_chapter, 1, next_timestamp)
                     )
                     
                     # Add to reading history
                     cursor.execute(
                         """
-                        INSERT INTO reading_history (book_id, chapter_number, verse_number, date_read)
-                        VALUES ((SELECT id FROM books WHERE name = ?), ?, ?, ?)
+                        INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+                        VALUES (?, ?, ?, ?, ?)
                         """,
-                        (next_book, next_chapter, next_verse, next_timestamp)
+                        (user_id, book_id, next_chapter, 1, next_timestamp)
                     )
-            else:
-                # Move to next chapter
-                next_chapter = chapter + 1
-                
-                # Update progress with next chapter
-                cursor.execute(
-                    """
-                    INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (book_id, next_chapter, 1, next_timestamp)
-                )
-                
-                # Add to reading history
-                cursor.execute(
-                    """
-                    INSERT INTO reading_history (book_id, chapter_number, verse_number, date_read)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (book_id, next_chapter, 1, next_timestamp)
-                )
+                    _record_coverage(cursor, user_id, (book_id, next_chapter, 1), (book_id, next_chapter, 1))
         
-        conn.commit()
         return True
     except Exception as e:
         print(f"Error updating progress: {e}")
         return False
-    finally:
-        conn.close()
 
-        
-def reset_reading_progress():
-    """Reset all reading progress while keeping verses."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _load_coverage(cursor, user_id) -> verse_coverage.Coverage:
+    """Read a profile's verse coverage bitmap"""
+    cursor.execute("SELECT bitmap FROM verse_coverage WHERE user_id = ?", (user_id,))
+    result = cursor.fetchone()
+    return verse_coverage.Coverage(result[0]) if result else verse_coverage.Coverage()
+
+def _record_coverage(cursor, user_id, first, last):
+    """
+    Mark a span of verses as read in the coverage bitmap.
     
+    Args:
+        first: (book_id, chapter, verse) of the first verse
+        last: (book_id, chapter, verse) of the last verse (inclusive)
+    """
     try:
-        # Delete all reading progress
-        cursor.execute("DELETE FROM reading_progress")
-        
-        # Delete all reading history
-        cursor.execute("DELETE FROM reading_history")
-        
-        # Reset to Genesis 1:1
-        timestamp = datetime.datetime.now().isoformat()
-        cursor.execute(
-            "INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?)",
-            (1, 1, 1, timestamp)
+        start, end = canon.ordinal(*first), canon.ordinal(*last)
+    except ValueError:
+        return  # Not a real verse, so nothing to cover
+    
+    bitmap = _load_coverage(cursor, user_id)
+    bitmap.add_range(start, end)
+    cursor.execute(
+        "INSERT OR REPLACE INTO verse_coverage (user_id, bitmap) VALUES (?, ?)",
+        (user_id, bitmap.to_bytes())
+    )
+
+def _record_unread_verses(cursor, user_id, book_id, chapter, total_verses, timestamp):
+    """Add every verse of a chapter missing from reading history in one statement"""
+    cursor.execute(
+        """
+        WITH RECURSIVE verse_numbers(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM verse_numbers WHERE n < ?
+        )
+        INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+        SELECT ?, ?, ?, n, ?
+        FROM verse_numbers
+        WHERE NOT EXISTS (
+            SELECT 1 FROM reading_history
+            WHERE user_id = ? AND book_id = ? AND chapter_number = ? AND verse_number = n
         )
+        """,
+        (total_verses, user_id, book_id, chapter, timestamp, user_id, book_id, chapter)
+    )
+
+def _record_chapter_completion(cursor, user_id, book_id, first_chapter, last_chapter, timestamp):
+    """Add newly completed chapters in a range to the chapter_completion table"""
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO chapter_completion (user_id, book_id, chapter_number, completed_at, verses_read)
+        SELECT ?, c.book_id, c.chapter_number, ?,
+               (SELECT COUNT(DISTINCT verse_number) FROM reading_history
+                WHERE user_id = ? AND book_id = c.book_id AND chapter_number = c.chapter_number)
+        FROM chapters c
+        WHERE c.book_id = ? AND c.chapter_number BETWEEN ? AND ?
+        """,
+        (user_id, timestamp, user_id, book_id, first_chapter, last_chapter)
+    )
+
+def mark_chapters_read(book: str, first_chapter: int, last_chapter: int, user_id=DEFAULT_USER_ID):
+    """
+    Record a range of chapters as read without moving the reading position.
+    
+    Every verse in the range that is not already in reading history is
+    added by a single INSERT ... SELECT, however many verses that is.
+    
+    Args:
+        book: Book name
+        first_chapter: First chapter of the range
+        last_chapter: Last chapter of the range (inclusive)
+        user_id: Profile whose history is updated
+    """
+    try:
+        with transaction() as cursor:
+            book_id = canon.get_book_id(book)
+            if not book_id:
+                return False
+            
+            timestamp = datetime.datetime.now().isoformat()
+            
+            cursor.execute(
+                """
+                WITH RECURSIVE verse_numbers(n) AS (
+                    SELECT 1 UNION ALL SELECT n + 1 FROM verse_numbers
+                    WHERE n < (SELECT MAX(total_verses) FROM chapters WHERE book_id = ?)
+                )
+                INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+                SELECT ?, c.book_id, c.chapter_number, vn.n, ?
+                FROM chapters c
+                JOIN verse_numbers vn ON vn.n <= c.total_verses
+                WHERE c.book_id = ? AND c.chapter_number BETWEEN ? AND ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM reading_history rh
+                    WHERE rh.user_id = ?
+                    AND rh.book_id = c.book_id
+                    AND rh.chapter_number = c.chapter_number
+                    AND rh.verse_number = vn.n
+                )
+                ORDER BY c.chapter_number, vn.n
+                """,
+                (book_id, user_id, timestamp, book_id, first_chapter, last_chapter, user_id)
+            )
+            _record_chapter_completion(cursor, user_id, book_id, first_chapter, last_chapter, timestamp)
+            
+            first_chapter = max(first_chapter, 1)
+            last_chapter = min(last_chapter, canon.chapter_count(book_id))
+            if first_chapter <= last_chapter:
+                _record_coverage(
+                    cursor,
+                    user_id,
+                    (book_id, first_chapter, 1),
+                    (book_id, last_chapter, canon.verse_count(book_id, last_chapter))
+                )
         
-        conn.commit()
         return True
     except Exception as e:
-        print(f"Error resetting progress: {e}")
+        print(f"Error updating progress: {e}")
         return False
-    finally:
-        conn.close()
 
-def export_to_json(output_file="bible_export.json", format_type="nested", book_filter=None):
-    """Export Bible data to JSON file."""
-    import json
+def import_readings(readings: Iterable[Tuple[int, int, str]], user_id=DEFAULT_USER_ID) -> int:
+    """
+    Add many readings to the history in a single transaction.
     
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    Rows are inserted with one executemany, and the derived data (chapter
+    completion and the coverage bitmap) is brought up to date once at the
+    end. The history indexes cover every profile, so only an import much
+    larger than the whole table (see INDEX_REBUILD_FACTOR) loads with them
+    dropped and rebuilds them afterwards; below that, rebuilding them costs
+    more than maintaining them row by row. The reading position does not move.
     
-    if format_type == "nested":
-        # Get all books or filtered books
-        if book_filter:
-            cursor.execute(
-                "SELECT id, name FROM books WHERE name = ? ORDER BY book_order", 
-                (book_filter,)
-            )
-        else:
-            cursor.execute("SELECT id, name FROM books ORDER BY book_order")
-        
-        books = [dict(row) for row in cursor.fetchall()]
+    Args:
+        readings: (first_ordinal, last_ordinal, date_read) spans; every
+            verse of each span is recorded as read on that date
+        user_id: Profile whose history is updated
+    
+    Returns:
+        Number of verses added
+    """
+    readings = list(readings)
+    total = sum(last - first + 1 for first, last, _ in readings)
+    if not total:
+        return 0
+    
+    bitmap = verse_coverage.Coverage()
+    
+    def rows():
+        for first, last, date_read in readings:
+            bitmap.add_range(first, last)
+            for book_id, chapter, verse in canon.positions(first, last):
+                yield (user_id, book_id, chapter, verse, date_read)
+    
+    with transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM reading_history")
+        rebuild_indexes = total > INDEX_REBUILD_FACTOR * cursor.fetchone()[0]
+        if rebuild_indexes:
+            migrations.drop_history_indexes(cursor)
         
-        bible_data = []
+        cursor.executemany(
+            "INSERT INTO reading_history (user_id, book_id, chapter_number, verse_number, date_read) VALUES (?, ?, ?, ?, ?)",
+            rows()
+        )
         
-        for book in books:
-            book_data = {
-                "book": book["name"],
-                "chapters": []
-            }
+        if rebuild_indexes:
+            migrations.create_history_indexes(cursor)
+        migrations.rebuild_chapter_completion(cursor, user_id)
+        cursor.execute(
+            "INSERT OR REPLACE INTO verse_coverage (user_id, bitmap) VALUES (?, ?)",
+            (user_id, (_load_coverage(cursor, user_id) | bitmap).to_bytes())
+        )
+    
+    return total
+
+def reset_reading_progress(user_id=DEFAULT_USER_ID):
+    """Reset a profile's reading progress while keeping verses."""
+    try:
+        with transaction() as cursor:
+            # Delete all reading progress
+            cursor.execute("DELETE FROM reading_progress WHERE user_id = ?", (user_id,))
+            
+            # Delete all reading history
+            cursor.execute("DELETE FROM reading_history WHERE user_id = ?", (user_id,))
+            cursor.execute("DELETE FROM chapter_completion WHERE user_id = ?", (user_id,))
+            cursor.execute("DELETE FROM verse_coverage WHERE user_id = ?", (user_id,))
             
-            # Get chapters for this book
+            # Reset to Genesis 1:1
+            timestamp = datetime.datetime.now().isoformat()
             cursor.execute(
-                "SELECT chapter_number FROM chapters WHERE book_id = ? ORDER BY chapter_number",
-                (book["id"],)
+                "INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (user_id, 1, 1, 1, timestamp)
             )
-            chapters = [dict(row) for row in cursor.fetchall()]
-            
-            for chapter in chapters:
-                chapter_data = {
-                    "chapter": chapter["chapter_number"],
-                    "verses": []
-                }
-                
-                # Get verses for this chapter
-                cursor.execute(
-                    """
-                    SELECT verse_number, verse_text 
-                    FROM verses 
-                    WHERE book_id = ? AND chapter_number = ? 
-                    ORDER BY verse_number
-                    """,
-                    (book["id"], chapter["chapter_number"])
-                )
-                verses = [dict(row) for row in cursor.fetchall()]
-                
-                for verse in verses:
-                    chapter_data["verses"].append({
-                        "verse": verse["verse_number"],
-                        "text": verse["verse_text"]
-                    })
-                
-                book_data["chapters"].append(chapter_data)
-            
-            bible_data.append(book_data)
-        
-    elif format_type == "flat":
-        # Get all verses in a flat structure
-        if book_filter:
-            cursor.execute("""
-                SELECT b.name as book, v.chapter_number as chapter, v.verse_number as verse, v.verse_text as text
-                FROM verses v
-                JOIN books b ON v.book_id = b.id
-                WHERE b.name = ?
-                ORDER BY b.book_order, v.chapter_number, v.verse_number
-            """, (book_filter,))
-        else:
-            cursor.execute("""
-                SELECT b.name as book, v.chapter_number as chapter, v.verse_number as verse, v.verse_text as text
-                FROM verses v
-                JOIN books b ON v.book_id = b.id
-                ORDER BY b.book_order, v.chapter_number, v.verse_number
-            """)
         
-        bible_data = [dict(row) for row in cursor.fetchall()]
-    
-    conn.close()
+        return True
+    except Exception as e:
+        print(f"Error resetting progress: {e}")
+        return False
+
+def rebuild_chapter_completion(user_id=None):
+    """
+    Recompute completed chapters and verse coverage from the full reading history.
     
-    # Write to file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(bible_data, f, indent=2, ensure_ascii=False)
+    Args:
+        user_id: Only rebuild this profile (default: every profile)
+    """
+    try:
+        with transaction() as cursor:
+            migrations.rebuild_chapter_completion(cursor, user_id)
+            migrations.rebuild_coverage(cursor, user_id)
+        return True
+    except Exception as e:
+        print(f"Error rebuilding chapter completion: {e}")
+        return False
+
+def get_coverage(user_id=DEFAULT_USER_ID) -> verse_coverage.Coverage:
+    """Get the set of distinct verses read"""
+    return _load_coverage(get_connection().cursor(), user_id)
+
+def export_to_json(output_file="bible_export.json", format_type="nested", book_filter=None, progress=None):
+    """Export Bible data to JSON file."""
+    import exporter  # Local import to avoid circular import
     
+    exporter.export(output_file, format_type, book_filter, progress=progress)
     return True
 
 def get_all_books():
     """Get all books in the database"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     
     cursor.execute("SELECT name FROM books ORDER BY book_order")
     books = [row[0] for row in cursor.fetchall()]
     
-    conn.close()
     return books
 
-def get_completed_chapters(book_name):
+def get_completed_chapters(book_name, user_id=DEFAULT_USER_ID):
     """Get a list of completed chapters for a specific book."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get book ID
-    cursor.execute("SELECT id FROM books WHERE name = ?", (book_name,))
-    result = cursor.fetchone()
-    if not result:
-        conn.close()
+    book_id = canon.get_book_id(book_name)
+    if not book_id:
         return []
     
-    book_id = result[0]
-    
-    # Query to find completed chapters
-    cursor.execute("""
-        SELECT DISTINCT rh.chapter_number
-        FROM reading_history rh
-        JOIN chapters c ON rh.book_id = c.book_id AND rh.chapter_number = c.chapter_number
-        WHERE rh.book_id = ? AND rh.verse_number >= c.total_verses
-        ORDER BY rh.chapter_number
-    """, (book_id,))
+    return _completed_chapters(get_connection().cursor(), user_id, book_id)
+
+def _completed_chapters(cursor, user_id, book_id):
+    """Get the completed chapter numbers of a book using an open cursor"""
+    cursor.execute(
+        "SELECT chapter_number FROM chapter_completion WHERE user_id = ? AND book_id = ? ORDER BY chapter_number",
+        (user_id, book_id)
+    )
     
     completed_chapters = [row[0] for row in cursor.fetchall()]
     
-    conn.close()
     return completed_chapters
 
-def get_books_read():
+def get_books_read(user_id=DEFAULT_USER_ID):
     """Get a list of completely read books based on reading history."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get all books
-    cursor.execute("SELECT id, name, total_chapters FROM books ORDER BY book_order")
-    all_books = cursor.fetchall()
-    
-    completed_books = []
+    return _books_read(get_connection().cursor(), user_id)
+
+def _books_read(cursor, user_id):
+    """Get the names of completely read books using an open cursor"""
+    # A book is complete when every one of its chapters is complete
+    cursor.execute("""
+        SELECT b.name
+        FROM books b
+        JOIN chapter_completion cc
+          ON cc.user_id = ? AND cc.book_id = b.id AND cc.chapter_number BETWEEN 1 AND b.total_chapters
+        GROUP BY b.id
+        HAVING COUNT(*) = b.total_chapters
+        ORDER BY b.book_order
+    """, (user_id,))
     
-    for book_id, book_name, total_chapters in all_books:
-        # Check if we have read every chapter of this book
-        is_book_complete = True
-        
-        for chapter in range(1, total_chapters + 1):
-            # Get total verses in this chapter
-            cursor.execute(
-                "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-                (book_id, chapter)
-            )
-            result = cursor.fetchone()
-            if not result:
-                is_book_complete = False
-                break
-                
-            total_verses = result[0]
-            
-            # Check if we've read the last verse of this chapter
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM reading_history
-                WHERE book_id = ? AND chapter_number = ? AND verse_number = ?
-                """,
-                (book_id, chapter, total_verses)
-            )
-            
-            if cursor.fetchone()[0] == 0:
-                # Haven't read the last verse of this chapter
-                is_book_complete = False
-                break
-        
-        if is_book_complete:
-            completed_books.append(book_name)
+    completed_books = [row[0] for row in cursor.fetchall()]
     
-    conn.close()
     return completed_books
 
-def get_reading_stats():
+def get_reading_stats(user_id=DEFAULT_USER_ID):
     """Get reading statistics"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     
     # Get reading history
     cursor.execute(
@@ -590,9 +804,11 @@ def get_reading_stats():
         SELECT b.name, rh.chapter_number, rh.verse_number, rh.date_read
         FROM reading_history rh
         JOIN books b ON rh.book_id = b.id
+        WHERE rh.user_id = ?
         ORDER BY rh.date_read DESC
         LIMIT 100
-        """
+        """,
+        (user_id,)
     )
     reading_history = cursor.fetchall()
     
@@ -601,9 +817,11 @@ def get_reading_stats():
         """
         SELECT DISTINCT substr(date_read, 1, 10) as read_date
         FROM reading_history
+        WHERE user_id = ?
         ORDER BY read_date DESC
         LIMIT 30
-        """
+        """,
+        (user_id,)
     )
     reading_dates = [row[0] for row in cursor.fetchall()]
     
@@ -633,7 +851,9 @@ def get_reading_stats():
         """
         SELECT COUNT(*), COUNT(DISTINCT substr(date_read, 1, 10))
         FROM reading_history
-        """
+        WHERE user_id = ?
+        """,
+        (user_id,)
     )
     total_verses, total_days = cursor.fetchone()
     total_verses = total_verses or 0
@@ -646,10 +866,12 @@ def get_reading_stats():
         """
         SELECT substr(date_read, 1, 10) as read_date, COUNT(*) as verse_count
         FROM reading_history
+        WHERE user_id = ?
         GROUP BY read_date
         ORDER BY verse_count DESC
         LIMIT 1
-        """
+        """,
+        (user_id,)
     )
     result = cursor.fetchone()
     most_productive_day = result if result else ("No data", 0)
@@ -665,8 +887,6 @@ def get_reading_stats():
         
         reading_by_date[date_str].append(passage)
     
-    conn.close()
-    
     return {
         "streak": current_streak,
         "total_verses": total_verses,
@@ -675,125 +895,47 @@ def get_reading_stats():
         "reading_by_date": reading_by_date
     }
 
-def calculate_percentages():
+def calculate_percentages(user_id=DEFAULT_USER_ID):
     """Calculate completion percentages based on actual reading history."""
-    book, chapter, verse = get_current_progress()
+    book, chapter, verse = get_current_progress(user_id)
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    # Calculate Bible completion from the distinct verses read
+    total_verses_read = get_coverage(user_id).count()
     
-    # Get current book ID
-    cursor.execute("SELECT id, total_chapters FROM books WHERE name = ?", (book,))
-    book_id, total_chapters = cursor.fetchone()
-    
-    # Get total verses in current chapter
-    cursor.execute(
-        "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    total_verses = result[0] if result else 30  # Default if not found
-    
-    # Calculate chapter completion
-    chapter_percentage = (verse / total_verses) * 100
-    
-    # Calculate book completion
-    # First, get sum of verses in chapters before current chapter
-    cursor.execute(
-        """
-        SELECT SUM(total_verses) 
-        FROM chapters 
-        WHERE book_id = ? AND chapter_number < ?
-        """,
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    verses_before_current_chapter = result[0] if result and result[0] else 0
-    
-    # Get total verses in book
-    cursor.execute(
-        "SELECT SUM(total_verses) FROM chapters WHERE book_id = ?",
-        (book_id,)
-    )
-    result = cursor.fetchone()
-    total_verses_in_book = result[0] if result and result[0] else 1  # Avoid division by zero
-    
-    book_percentage = ((verses_before_current_chapter + verse) / total_verses_in_book) * 100
-    
-    # Calculate Bible completion based on actual reading history
-    cursor.execute("""
-        SELECT COUNT(*) FROM reading_history
-    """)
-    total_verses_read = cursor.fetchone()[0]
-    
-    # Get total verses in Bible
-    cursor.execute("SELECT SUM(total_verses) FROM chapters")
-    result = cursor.fetchone()
-    total_verses_in_bible = result[0] if result and result[0] else 1  # Avoid division by zero
-    
-    bible_percentage = (total_verses_read / total_verses_in_bible) * 100
-    
-    conn.close()
+    return _percentages(canon.get_book_id(book), chapter, verse, total_verses_read)
+
+def _percentages(book_id, chapter, verse, total_verses_read):
+    """Calculate chapter, book and Bible percentages from the canon index"""
+    total_verses = canon.verse_count(book_id, chapter)
+    # A verse past the chapter end marks the chapter complete
+    verse = min(verse, total_verses)
+    verses_before_current_chapter = canon.verses_before_chapter(book_id, chapter)
+    total_verses_in_book = canon.book_verse_count(book_id) or 1  # Avoid division by zero
     
     return {
-        "chapter": chapter_percentage,
-        "book": book_percentage,
-        "bible": bible_percentage
+        "chapter": (verse / total_verses) * 100,
+        "book": ((verses_before_current_chapter + verse) / total_verses_in_book) * 100,
+        "bible": (total_verses_read / canon.TOTAL_VERSES) * 100
     }
 
-def estimate_completion_times():
+def estimate_completion_times(user_id=DEFAULT_USER_ID):
     """Estimate days to complete current book and entire Bible."""
-    book, chapter, verse = get_current_progress()
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get current book ID
-    cursor.execute("SELECT id FROM books WHERE name = ?", (book,))
-    book_id = cursor.fetchone()[0]
-    
-    # Get remaining verses in current book
-    cursor.execute(
-        """
-        SELECT SUM(total_verses) 
-        FROM chapters 
-        WHERE book_id = ? AND chapter_number > ?
-        """,
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    remaining_verses_in_book = result[0] if result and result[0] else 0
+    book, chapter, verse = get_current_progress(user_id)
     
-    # Add remaining verses in current chapter
-    cursor.execute(
-        "SELECT total_verses FROM chapters WHERE book_id = ? AND chapter_number = ?",
-        (book_id, chapter)
-    )
-    result = cursor.fetchone()
-    total_verses_in_chapter = result[0] if result else 30
-    remaining_verses_in_chapter = total_verses_in_chapter - verse
-    
-    remaining_verses_in_book += remaining_verses_in_chapter
-    
-    # Get remaining verses in Bible
-    cursor.execute(
-        """
-        SELECT SUM(c.total_verses)
-        FROM chapters c
-        JOIN books b ON c.book_id = b.id
-        WHERE b.book_order > ?
-        """,
-        (book_id,)
+    # Calculate estimates based on reading history
+    return _estimates(canon.get_book_id(book), chapter, verse, get_reading_rate(user_id))
+
+def _estimates(book_id, chapter, verse, reading_rate):
+    """Estimate days to finish the book and Bible from the canon index"""
+    verse = min(verse, canon.verse_count(book_id, chapter))
+    # Remaining verses in the current chapter and the chapters after it
+    remaining_verses_in_book = (
+        canon.book_verse_count(book_id)
+        - canon.verses_before_chapter(book_id, chapter)
+        - verse
     )
-    result = cursor.fetchone()
-    remaining_verses_after_book = result[0] if result and result[0] else 0
+    remaining_verses_in_bible = remaining_verses_in_book + canon.verses_after_book(book_id)
     
-    remaining_verses_in_bible = remaining_verses_in_book + remaining_verses_after_book
-    
-    conn.close()
-    
-    # Calculate estimates based on reading history
-    reading_rate = get_reading_rate()
     days_to_complete_book = math.ceil(remaining_verses_in_book / reading_rate) if reading_rate > 0 else 30
     days_to_complete_bible = math.ceil(remaining_verses_in_bible / reading_rate) if reading_rate > 0 else 365
     
@@ -802,46 +944,41 @@ def estimate_completion_times():
         "bible": days_to_complete_bible
     }
 
-def get_reading_rate():
+def get_reading_rate(user_id=DEFAULT_USER_ID):
     """Calculate the average verses read per day."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get reading history
+    return _reading_rate(get_connection().cursor(), user_id)
+
+def _reading_rate(cursor, user_id):
+    """Calculate the average verses read per day using an open cursor"""
+    # Counted inside SQLite from the profile's slice of the date index, so
+    # the cost follows this reader's history rather than every reader's
     cursor.execute(
         """
-        SELECT date_read
+        SELECT COUNT(*), COUNT(DISTINCT substr(date_read, 1, 10))
         FROM reading_history
-        ORDER BY date_read
-        """
+        WHERE user_id = ?
+        """,
+        (user_id,)
     )
-    reading_history = cursor.fetchall()
+    verses, days = cursor.fetchone()
     
-    if len(reading_history) < 2:
-        conn.close()
+    if verses < 2 or not days:
         return 10.0  # Default rate if not enough data
     
-    # Calculate average verses per day
-    verse_counts_by_day = {}
-    for row in reading_history:
-        date_read = row[0].split()[0] if ' ' in row[0] else row[0].split('T')[0]
-        if date_read not in verse_counts_by_day:
-            verse_counts_by_day[date_read] = 0
-        verse_counts_by_day[date_read] += 1
-    
-    daily_verses = list(verse_counts_by_day.values())
-    
-    conn.close()
-    
-    if not daily_verses:
-        return 10.0  # Default
-    
-    return sum(daily_verses) / len(daily_verses)
+    # Average verses per reading day
+    return verses / days
+
+def get_corpus_state():
+    """Get the (corpus_id, revision) pair that changes whenever verse text changes"""
+    return migrations.get_corpus_state(get_connection().cursor())
 
 def get_chapter_verses(book_id, chapter):
     """Get all verses for a specific chapter"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    pack = get_pack()
+    if pack is not None:
+        return pack.chapter(book_id, chapter)
+    
+    cursor = get_connection().cursor()
     
     cursor.execute(
         "SELECT verse_number, verse_text FROM verses WHERE book_id = ? AND chapter_number = ? ORDER BY verse_number",
@@ -849,5 +986,58 @@ def get_chapter_verses(book_id, chapter):
     )
     verses = cursor.fetchall()
     
-    conn.close()
-    return verses
\ No newline at end of file
+    return verses
+
+def get_dashboard_data(include_verse_text=True, user_id=DEFAULT_USER_ID):
+    """
+    Collect everything the dashboard displays in one consistent read.
+    
+    The current position and book are resolved once and shared by every
+    calculation, so a redraw costs a handful of queries.
+    
+    Args:
+        include_verse_text: Also read the current verse text; callers
+            with their own text cache can skip it (verse_text is None)
+        user_id: Profile whose progress is shown
+    
+    Returns:
+        Dictionary with position, verse text, next verse, percentages,
+        completion estimates, chapter completion and completed books
+    """
+    with transaction() as cursor:
+        cursor.execute('''
+        SELECT rp.book_id, rp.chapter_number, rp.verse_number
+        FROM reading_progress rp
+        WHERE rp.user_id = ?
+        ORDER BY rp.timestamp DESC
+        LIMIT 1
+        ''', (user_id,))
+        result = cursor.fetchone()
+        if result and result[0] in canon.BOOKS_BY_ID:
+            book_id, chapter, verse = result
+        else:
+            # Default to starting at Genesis 1:1
+            book_id, chapter, verse = (canon.FIRST_BOOK_ID, 1, 1)
+        
+        verse_text = get_verse_text(book_id, chapter, verse) if include_verse_text else None
+        
+        total_verses_read = _load_coverage(cursor, user_id).count()
+        
+        reading_rate = _reading_rate(cursor, user_id)
+        completed_chapters = set(_completed_chapters(cursor, user_id, book_id))
+        completed_books = _books_read(cursor, user_id)
+    
+    next_book_id, next_chapter, next_verse = canon.next_position(book_id, chapter, verse)
+    
+    return {
+        "position": (canon.get_book_name(book_id), chapter, verse),
+        "verse_text": verse_text,
+        "next_position": (canon.get_book_name(next_book_id), next_chapter, next_verse),
+        "percentages": _percentages(book_id, chapter, verse, total_verses_read),
+        "estimates": _estimates(book_id, chapter, verse, reading_rate),
+        "chapters": {
+            chapter_num: chapter_num in completed_chapters
+            for chapter_num in range(1, canon.chapter_count(book_id) + 1)
+        },
+        "completed_books": completed_books
+    }
\ No newline at end of file
@@ -0,0 +1,393 @@
+"""
+Streaming export of Bible text
+
+Rows are read from a single ordered cursor and written as they arrive,
+so memory use stays flat no matter how much of the Bible is exported.
+Exports can be written as JSON, NDJSON or CSV, optionally gzip
+compressed, to a file, to stdout, or as one file per book rendered in
+parallel worker processes.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from json.encoder import encode_basestring
+from typing import Callable, Optional
+import canon
+import db
+
+# Called as progress(verses_written, total_verses)
+ProgressCallback = Callable[[int, int], None]
+
+# How many verses to write between progress reports
+PROGRESS_INTERVAL = 500
+
+# Output file name that means "write to standard output"
+STDOUT = "-"
+
+# Same trade-off between speed and size as the gzip command line tool
+GZIP_LEVEL = 6
+
+# File extension for each export format
+FORMATS = {
+    "nested": ".json",
+    "flat": ".json",
+    "ndjson": ".ndjson",
+    "csv": ".csv",
+}
+
+CSV_HEADER = ("book", "chapter", "verse", "text")
+
+def _dump(value) -> str:
+    """Encode a scalar the same way json.dump(..., ensure_ascii=False) does"""
+    if isinstance(value, str):
+        return encode_basestring(value)
+    return json.dumps(value)
+
+def count_verses(book_filter=None) -> int:
+    """Count the verses an export will write"""
+    cursor = db.get_connection().cursor()
+    if book_filter:
+        cursor.execute("SELECT COUNT(*) FROM verses WHERE book_id = ?", (canon.get_book_id(book_filter),))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM verses")
+    return cursor.fetchone()[0]
+
+def _nested_rows(cursor, book_filter):
+    """Books, chapters and verses in canonical order, one row per verse"""
+    # Outer joins keep books and chapters that have no verse text
+    query = """
+        SELECT b.name, c.chapter_number, v.verse_number, v.verse_text
+        FROM books b
+        LEFT JOIN chapters c ON c.book_id = b.id
+        LEFT JOIN verses v ON v.book_id = c.book_id AND v.chapter_number = c.chapter_number
+    """
+    if book_filter:
+        cursor.execute(query + """
+        WHERE b.id = ?
+        ORDER BY c.chapter_number, v.verse_number
+        """, (canon.get_book_id(book_filter),))
+    else:
+        cursor.execute(query + "ORDER BY b.book_order, c.chapter_number, v.verse_number")
+    return cursor
+
+def _flat_rows(cursor, book_filter):
+    """Every verse in canonical order"""
+    query = """
+        SELECT b.name, v.chapter_number, v.verse_number, v.verse_text
+        FROM verses v
+        JOIN books b ON v.book_id = b.id
+    """
+    if book_filter:
+        # Walks the (book_id, chapter_number, verse_number) index in order
+        cursor.execute(query + """
+        WHERE v.book_id = ?
+        ORDER BY v.chapter_number, v.verse_number
+        """, (canon.get_book_id(book_filter),))
+    else:
+        cursor.execute(query + "ORDER BY b.book_order, v.chapter_number, v.verse_number")
+    return cursor
+
+def write_nested_json(out, rows, progress=None, total=0) -> int:
+    """
+    Write rows as nested JSON (books > chapters > verses).
+    
+    Output is identical to json.dump(data, out, indent=2, ensure_ascii=False).
+    
+    Returns:
+        Number of verses written
+    """
+    written = 0
+    current_book = None
+    current_chapter = None
+    book_has_chapters = False
+    chapter_has_verses = False
+    
+    out.write("[")
+    for book, chapter, verse, text in rows:
+        if book != current_book:
+            # Close the previous book
+            if current_book is not None:
+                if current_chapter is not None:
+                    out.write("\n        ]" if chapter_has_verses else "]")
+                    out.write("\n      }")
+                out.write("\n    ]" if book_has_chapters else "]")
+                out.write("\n  },")
+            
+            out.write(f'\n  {{\n    "book": {_dump(book)},\n    "chapters": [')
+            current_book = book
+            current_chapter = None
+            book_has_chapters = False
+        
+        if chapter is None:
+            continue
+        
+        if chapter != current_chapter:
+            # Close the previous chapter
+            if current_chapter is not None:
+                out.write("\n        ]" if chapter_has_verses else "]")
+                out.write("\n      },")
+            
+            out.write(f'\n      {{\n        "chapter": {_dump(chapter)},\n        "verses": [')
+            current_chapter = chapter
+            book_has_chapters = True
+            chapter_has_verses = False
+        
+        if verse is None:
+            continue
+        
+        out.write("," if chapter_has_verses else "")
+        out.write(
+            f'\n          {{\n            "verse": {_dump(verse)},'
+            f'\n            "text": {_dump(text)}\n          }}'
+        )
+        chapter_has_verses = True
+        
+        written += 1
+        if progress and written % PROGRESS_INTERVAL == 0:
+            progress(written, total)
+    
+    # Close whatever is still open
+    if current_book is not None:
+        if current_chapter is not None:
+            out.write("\n        ]" if chapter_has_verses else "]")
+            out.write("\n      }")
+        out.write("\n    ]" if book_has_chapters else "]")
+        out.write("\n  }\n]")
+    else:
+        out.write("]")
+    
+    if progress:
+        progress(written, total)
+    return written
+
+def write_flat_json(out, rows, progress=None, total=0) -> int:
+    """
+    Write rows as a flat JSON list of verse objects.
+    
+    Output is identical to json.dump(data, out, indent=2, ensure_ascii=False).
+    
+    Returns:
+        Number of verses written
+    """
+    written = 0
+    
+    separator = ""
+    out.write("[")
+    for book, chapter, verse, text in rows:
+        out.write(
+            f'{separator}\n  {{\n    "book": {_dump(book)},\n    "chapter": {_dump(chapter)},'
+            f'\n    "verse": {_dump(verse)},\n    "text": {_dump(text)}\n  }}'
+        )
+        separator = ","
+        
+        written += 1
+        if progress and written % PROGRESS_INTERVAL == 0:
+            progress(written, total)
+    out.write("\n]" if written else "]")
+    
+    if progress:
+        progress(written, total)
+    return written
+
+def write_ndjson(out, rows, progress=None, total=0) -> int:
+    """
+    Write rows as newline-delimited JSON, one compact verse object per line.
+    
+    Returns:
+        Number of verses written
+    """
+    written = 0
+    
+    for book, chapter, verse, text in rows:
+        out.write(
+            f'{{"book":{_dump(book)},"chapter":{_dump(chapter)},'
+            f'"verse":{_dump(verse)},"text":{_dump(text)}}}\n'
+        )
+        
+        written += 1
+        if progress and written % PROGRESS_INTERVAL == 0:
+            progress(written, total)
+    
+    if progress:
+        progress(written, total)
+    return written
+
+def write_csv(out, rows, progress=None, total=0) -> int:
+    """
+    Write rows as CSV with a book,chapter,verse,text header.
+    
+    Returns:
+        Number of verses written
+    """
+    written = 0
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    
+    for row in rows:
+        writer.writerow(row)
+        
+        written += 1
+        if progress and written % PROGRESS_INTERVAL == 0:
+            progress(written, total)
+    
+    if progress:
+        progress(written, total)
+    return written
+
+WRITERS = {
+    "nested": (_nested_rows, write_nested_json),
+    "flat": (_flat_rows, write_flat_json),
+    "ndjson": (_flat_rows, write_ndjson),
+    "csv": (_flat_rows, write_csv),
+}
+
+def output_filename(base, format_type, compress=False) -> str:
+    """Add the format's extension (and .gz) to a file name that lacks them"""
+    extension = FORMATS[format_type]
+    if compress and base.endswith(".gz"):
+        base = base[:-3]
+    if not base.endswith(extension):
+        base += extension
+    return base + ".gz" if compress else base
+
+@contextmanager
+def open_output(output_file, compress=False):
+    """
+    Open an export destination as UTF-8 text.
+    
+    Args:
+        output_file: Path of the file to write, or STDOUT
+        compress: Gzip the output
+    """
+    if output_file == STDOUT:
+        sys.stdout.flush()
+        raw = sys.stdout.buffer
+    else:
+        raw = open(output_file, 'wb')
+    
+    binary = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL) if compress else raw
+    text = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+    try:
+        yield text
+        text.flush()
+    except BrokenPipeError:
+        if raw is not sys.stdout.buffer:
+            raise
+        # The reader stopped early (e.g. piped into head); discard whatever
+        # is still buffered instead of failing on the next write
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        # Detach so closing the wrapper never closes stdout
+        text.detach()
+        if compress:
+            binary.close()
+        if raw is sys.stdout.buffer:
+            raw.flush()
+        else:
+            raw.close()
+
+def export(output_file="bible_export.json", format_type="nested", book_filter=None,
+           compress=None, progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Stream Bible text to a file or stdout.
+    
+    Args:
+        output_file: Path of the file to write, or STDOUT
+        format_type: "nested" (books > chapters > verses), "flat", "ndjson" or "csv"
+        book_filter: Only export this book
+        compress: Gzip the output; by default only when output_file ends in .gz
+        progress: Optional callback receiving (verses_written, total_verses)
+    
+    Returns:
+        Number of verses written
+    """
+    if format_type not in WRITERS:
+        raise ValueError(f"Unknown export format: {format_type}")
+    if compress is None:
+        compress = output_file.endswith(".gz")
+    
+    with open_output(output_file, compress) as out:
+        return write_export(out, format_type, book_filter, progress)
+
+def write_export(out, format_type="nested", book_filter=None,
+                 progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Stream Bible text to an open text file.
+    
+    Returns:
+        Number of verses written
+    """
+    if format_type not in WRITERS:
+        raise ValueError(f"Unknown export format: {format_type}")
+    
+    total = count_verses(book_filter) if progress else 0
+    
+    select, write = WRITERS[format_type]
+    cursor = db.get_connection().cursor()
+    try:
+        return write(out, select(cursor, book_filter), progress, total)
+    finally:
+        cursor.close()
+
+def _book_filename(book_name, format_type, compress) -> str:
+    """File name for one book of a sharded export, e.g. 43_john.json"""
+    book_id = canon.get_book_id(book_name)
+    slug = book_name.lower().replace(" ", "_")
+    return output_filename(f"{book_id:02d}_{slug}", format_type, compress)
+
+def _init_worker(db_path, preset):
+    """Point a worker process at the parent's database and preset"""
+    db.DB_PATH = db_path
+    db.set_preset(preset)
+
+def _export_book(output_file, format_type, book_name, compress) -> int:
+    """Export one book in a worker process"""
+    return export(output_file, format_type, book_name, compress)
+
+def export_by_book(output_dir, format_type="nested", compress=False, workers=None,
+                   progress: Optional[ProgressCallback] = None) -> int:
+    """
+    Export every book to its own file, rendering books in parallel processes.
+    
+    Args:
+        output_dir: Directory for the per-book files, created if missing
+        format_type: "nested", "flat", "ndjson" or "csv"
+        compress: Gzip each file
+        workers: Number of worker processes (default: one per CPU)
+        progress: Optional callback receiving (verses_written, total_verses),
+            called as each book finishes
+    
+    Returns:
+        Number of verses written across all files
+    """
+    # Deferred so that loading this module does not pull in multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    if format_type not in WRITERS:
+        raise ValueError(f"Unknown export format: {format_type}")
+    os.makedirs(output_dir, exist_ok=True)
+    
+    total = count_verses() if progress else 0
+    written = 0
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db.DB_PATH, db.PERFORMANCE_PRESET)) as pool:
+        futures = [
+            pool.submit(
+                _export_book,
+                os.path.join(output_dir, _book_filename(book_name, format_type, compress)),
+                format_type, book_name, compress
+            )
+            for book_name in canon.BOOK_NAMES
+        ]
+        for future in as_completed(futures):
+            written += future.result()
+            if progress:
+                progress(written, total)
+    
+    return written
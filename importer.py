@@ -0,0 +1,186 @@
+"""
+Bulk import of reading history
+
+Reads passages and the dates they were read from CSV, JSON or NDJSON,
+expands each passage to its verses and loads them all in one transaction
+through db.import_readings. Each entry holds either a passage:
+
+    passage,date
+    John 3:16-18,2023-01-05
+    Psalms 119,2023-01-06T07:30:00
+
+or the book/chapter/verse columns written by the exporter (verse may be
+left empty for a whole chapter):
+
+    {"book": "John", "chapter": 3, "verse": 16, "date": "2023-01-05"}
+
+Dates are ISO 8601 dates or date-times.
+"""
+
+import csv
+import datetime
+import json
+import sys
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import db
+from reference import passage_ordinals
+
+# Input file name that means "read from standard input"
+STDIN = "-"
+
+# Import format for each file extension
+FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+# Column names accepted for the passage and the date, in order of preference
+PASSAGE_KEYS = ("passage", "reference")
+DATE_KEYS = ("date", "date_read")
+
+class ImportResult(NamedTuple):
+    """Outcome of an import"""
+    passages: int
+    verses: int
+    errors: List[str]
+
+def detect_format(input_file: str) -> Optional[str]:
+    """Get the import format implied by a file name, or None if it implies none"""
+    name = input_file.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for extension, format_type in FORMATS.items():
+        if name.endswith(extension):
+            return format_type
+    return None
+
+def parse_date(value) -> str:
+    """
+    Normalize an ISO 8601 date or date-time to the form stored in reading history.
+    
+    Raises:
+        ValueError: If the value is not an ISO date
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Not a date: {value!r}")
+    return datetime.datetime.fromisoformat(value.strip()).isoformat()
+
+def _entry_passage(entry: dict) -> str:
+    """Get the passage of an entry from its passage or book/chapter/verse fields"""
+    for key in PASSAGE_KEYS:
+        if entry.get(key):
+            return str(entry[key])
+    
+    if entry.get("book") and entry.get("chapter"):
+        passage = f"{entry['book']} {entry['chapter']}"
+        if entry.get("verse"):
+            passage += f":{entry['verse']}"
+        return passage
+    raise ValueError("Entry has no passage")
+
+def _entry_date(entry: dict, parsed_dates: dict) -> str:
+    """Get the date of an entry, reusing dates already parsed for earlier entries"""
+    for key in DATE_KEYS:
+        value = entry.get(key)
+        if value:
+            # Logs repeat each date for every passage read that day
+            try:
+                return parsed_dates[value]
+            except (KeyError, TypeError):
+                date_read = parsed_dates[value] = parse_date(value)
+                return date_read
+    raise ValueError("Entry has no date")
+
+def _csv_entries(f) -> Iterator[Tuple[str, dict]]:
+    """Rows of a CSV file with a header row, keyed by lower-case column name"""
+    reader = csv.reader(f)
+    header = [name.strip().lower() for name in next(reader, [])]
+    for row in reader:
+        if row:
+            yield f"line {reader.line_num}", dict(zip(header, row))
+
+def _json_entries(f) -> Iterator[Tuple[str, dict]]:
+    """Objects of a JSON list"""
+    entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError("JSON import must be a list of entries")
+    for number, entry in enumerate(entries, 1):
+        yield f"entry {number}", entry
+
+def _ndjson_entries(f) -> Iterator[Tuple[str, dict]]:
+    """Objects of a newline-delimited JSON file, skipping blank lines"""
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield f"line {number}", json.loads(line)
+            except ValueError:
+                yield f"line {number}", None
+
+READERS = {
+    "csv": _csv_entries,
+    "json": _json_entries,
+    "ndjson": _ndjson_entries,
+}
+
+def read_readings(f, format_type: str) -> Tuple[List[Tuple[int, int, str]], List[str]]:
+    """
+    Parse every entry of an import file.
+    
+    Returns:
+        The (first_ordinal, last_ordinal, date_read) span of each valid
+        entry, and a message for each entry that could not be read
+    """
+    readings = []
+    errors = []
+    parsed_dates = {}
+    for location, entry in READERS[format_type](f):
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("Not an object")
+            start, end = passage_ordinals(_entry_passage(entry))
+            readings.append((start, end, _entry_date(entry, parsed_dates)))
+        except ValueError as e:
+            errors.append(f"{location}: {e}")
+    return readings, errors
+
+def _open_input(input_file: str):
+    """Open an import source as UTF-8 text"""
+    if input_file == STDIN:
+        # closefd=False so that finishing the import leaves stdin open
+        return open(sys.stdin.fileno(), encoding="utf-8-sig", newline="", closefd=False)
+    if input_file.endswith(".gz"):
+        import gzip  # Deferred since most imports are not compressed
+        return gzip.open(input_file, "rt", encoding="utf-8-sig", newline="")
+    return open(input_file, encoding="utf-8-sig", newline="")
+
+def import_history(input_file: str, format_type: str = None, strict: bool = False,
+                   user_id: int = db.DEFAULT_USER_ID) -> ImportResult:
+    """
+    Add the readings in a file to the reading history.
+    
+    Args:
+        input_file: Path of the file to read (optionally gzipped), or STDIN
+        format_type: "csv", "json" or "ndjson"; by default from the file extension
+        strict: Import nothing if any entry is invalid, instead of skipping it
+        user_id: Profile whose history the readings are added to
+    
+    Raises:
+        ValueError: If the format is unknown, or strict is set and an
+            entry is invalid
+    
+    Returns:
+        The passages and verses imported and the entries that were skipped
+    """
+    format_type = format_type or detect_format(input_file)
+    if format_type not in READERS:
+        raise ValueError(f"Unknown import format for {input_file}; choose one of {', '.join(READERS)}")
+    
+    with _open_input(input_file) as f:
+        readings, errors = read_readings(f, format_type)
+    if strict and errors:
+        raise ValueError(f"{len(errors)} invalid entries, first at {errors[0]}")
+    
+    verses = db.import_readings(readings, user_id)
+    return ImportResult(len(readings), verses, errors)
@@ -6,18 +6,31 @@ A console application to track Bible reading progress
 
 VERSION = "2.0"
 
+import sys
 import db
-import ui
 
-def main():
-    """Main application loop."""
+def main(argv=None):
+    """Main application loop, or a single command when arguments are given."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        import cli
+        status = cli.run(argv)
+        # Global options alone (such as --profile) start the menu
+        if status is not None:
+            return status
+    
     # Initialize database if needed
     db.init_db()
     
+    # Deferred so command line runs never load rich
+    import ui
+    
+    ui.select_startup_profile()
+    
     while True:
         ui.display_dashboard()
         
-        choice = ui.console.input("\n[bold]Enter command (u/r/e/b/s/x/v/q):[/bold] ").strip().lower()
+        choice = ui.console.input("\n[bold]Enter command (u/r/e/b/f/s/p/x/v/q):[/bold] ").strip().lower()
         
         if choice == 'u':
             ui.update_reading_progress()
@@ -27,18 +40,23 @@ def main():
             ui.export_bible_menu()
         elif choice == 'b':
             ui.read_bible_book()
+        elif choice == 'f':
+            ui.search_bible()
         elif choice == 's':
             ui.view_statistics()
+        elif choice == 'p':
+            ui.choose_profile()
         elif choice == 'x':
             ui.reset_reading_progress()
         elif choice == 'v':
             ui.display_version_info()
         elif choice == 'q':
             ui.console.print("[yellow]Goodbye![/yellow]")
+            db.close_connection()
             break
         else:
             ui.console.print("[red]Invalid command.[/red]")
             ui.console.input("Press Enter to continue...")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,472 @@
+"""
+Versioned schema migrations for the Bible tracker database
+"""
+
+import datetime
+import sqlite3
+from models import BIBLE_BOOKS
+import canon
+import verse_coverage
+
+# Profile that owns the progress recorded before profiles existed
+DEFAULT_USER_ID = 1
+DEFAULT_PROFILE = "default"
+
+def _create_base_schema(cursor):
+    """Version 1: create the original tables and seed the books"""
+    # Create tables if they don't exist
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        total_chapters INTEGER NOT NULL,
+        book_order INTEGER NOT NULL
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS chapters (
+        id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        total_verses INTEGER NOT NULL,
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reading_progress (
+        id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        verse_number INTEGER NOT NULL,
+        timestamp DATETIME NOT NULL,
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS reading_history (
+        id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        verse_number INTEGER NOT NULL,
+        date_read DATETIME NOT NULL,
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    )
+    ''')
+    
+    # Add verses table for text
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS verses (
+        id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        verse_number INTEGER NOT NULL,
+        verse_text TEXT NOT NULL,
+        FOREIGN KEY (book_id) REFERENCES books (id),
+        UNIQUE(book_id, chapter_number, verse_number)
+    )
+    ''')
+    
+    # Check if books table is already populated
+    cursor.execute("SELECT COUNT(*) FROM books")
+    if cursor.fetchone()[0] == 0:
+        # Populate books table
+        for book in BIBLE_BOOKS:
+            cursor.execute(
+                "INSERT INTO books (id, name, total_chapters, book_order) VALUES (?, ?, ?, ?)",
+                (book["id"], book["name"], book["chapters"], book["id"])
+            )
+    
+    # Check if we need to initialize reading progress
+    cursor.execute("SELECT COUNT(*) FROM reading_progress")
+    if cursor.fetchone()[0] == 0:
+        # Start at Genesis 1:1
+        timestamp = datetime.datetime.now().isoformat()
+        cursor.execute(
+            "INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?)",
+            (1, 1, 1, timestamp)
+        )
+
+def _add_indexes(cursor):
+    """Version 2: index the columns used for lookups and sorting"""
+    # Covers chapter completion checks on (book, chapter, last verse)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_history_position
+    ON reading_history (book_id, chapter_number, verse_number, date_read)
+    ''')
+    
+    # Daily reading statistics group and sort on the date
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_history_date
+    ON reading_history (date_read)
+    ''')
+    
+    # Covers the latest-position lookup (ORDER BY timestamp DESC LIMIT 1)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_progress_timestamp
+    ON reading_progress (timestamp, book_id, chapter_number, verse_number)
+    ''')
+    
+    # Covers verse count lookups by book and chapter
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_chapters_book_chapter
+    ON chapters (book_id, chapter_number, total_verses)
+    ''')
+
+def create_history_indexes(cursor):
+    """Create the reading_history indexes if they are missing"""
+    # Every history query is for one profile, so the indexes lead on user_id.
+    # Covers chapter completion checks on (book, chapter, last verse)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_history_position
+    ON reading_history (user_id, book_id, chapter_number, verse_number, date_read)
+    ''')
+    
+    # Daily reading statistics group and sort on the date
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_history_date
+    ON reading_history (user_id, date_read)
+    ''')
+
+def drop_history_indexes(cursor):
+    """Drop the reading_history indexes, so a bulk load need not maintain them row by row"""
+    cursor.execute("DROP INDEX IF EXISTS idx_reading_history_position")
+    cursor.execute("DROP INDEX IF EXISTS idx_reading_history_date")
+
+def _add_chapter_completion(cursor):
+    """Version 3: keep completed chapters in their own table"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS chapter_completion (
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        completed_at DATETIME NOT NULL,
+        verses_read INTEGER NOT NULL,
+        PRIMARY KEY (book_id, chapter_number),
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    ) WITHOUT ROWID
+    ''')
+    
+    # The schema of this version, before profiles; rebuild_chapter_completion
+    # now fills the table version 8 creates
+    cursor.execute("DELETE FROM chapter_completion")
+    cursor.execute('''
+    INSERT INTO chapter_completion (book_id, chapter_number, completed_at, verses_read)
+    SELECT rh.book_id, rh.chapter_number, MIN(rh.date_read),
+           (SELECT COUNT(DISTINCT verse_number) FROM reading_history
+            WHERE book_id = rh.book_id AND chapter_number = rh.chapter_number)
+    FROM reading_history rh
+    JOIN chapters c ON rh.book_id = c.book_id AND rh.chapter_number = c.chapter_number
+    WHERE rh.verse_number >= c.total_verses
+    GROUP BY rh.book_id, rh.chapter_number
+    ''')
+
+def rebuild_chapter_completion(cursor, user_id=None):
+    """
+    Recompute the chapter_completion table from reading history.
+    
+    A chapter is complete once its last verse (or beyond) has been read;
+    it is dated by the first such reading.
+    
+    Args:
+        user_id: Only rebuild this profile (default: every profile)
+    """
+    user_filter = "" if user_id is None else "AND rh.user_id = :user_id"
+    cursor.execute(
+        "DELETE FROM chapter_completion" + ("" if user_id is None else " WHERE user_id = :user_id"),
+        {"user_id": user_id}
+    )
+    cursor.execute(f'''
+    INSERT INTO chapter_completion (user_id, book_id, chapter_number, completed_at, verses_read)
+    SELECT rh.user_id, rh.book_id, rh.chapter_number, MIN(rh.date_read),
+           (SELECT COUNT(DISTINCT verse_number) FROM reading_history
+            WHERE user_id = rh.user_id AND book_id = rh.book_id AND chapter_number = rh.chapter_number)
+    FROM reading_history rh
+    JOIN chapters c ON rh.book_id = c.book_id AND rh.chapter_number = c.chapter_number
+    WHERE rh.verse_number >= c.total_verses {user_filter}
+    GROUP BY rh.user_id, rh.book_id, rh.chapter_number
+    ''', {"user_id": user_id})
+
+def _seed_chapters(cursor):
+    """Version 4: fill in verse counts for any chapters missing from the table"""
+    cursor.execute("SELECT book_id, chapter_number FROM chapters")
+    existing = set(cursor.fetchall())
+    
+    cursor.executemany(
+        "INSERT INTO chapters (book_id, chapter_number, total_verses) VALUES (?, ?, ?)",
+        [
+            (book_id, chapter, counts[chapter])
+            for book_id, counts in canon.VERSE_COUNTS.items()
+            for chapter in range(1, len(counts))
+            if (book_id, chapter) not in existing
+        ]
+    )
+
+def _add_verse_coverage(cursor):
+    """Version 5: store the distinct verses read as a bitmap"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS verse_coverage (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        bitmap BLOB NOT NULL
+    )
+    ''')
+    
+    # The schema of this version, before profiles; rebuild_coverage now
+    # fills the table version 8 creates
+    cursor.execute("SELECT DISTINCT book_id, chapter_number, verse_number FROM reading_history")
+    bitmap = verse_coverage.from_positions(cursor.fetchall())
+    
+    cursor.execute(
+        "INSERT OR REPLACE INTO verse_coverage (id, bitmap) VALUES (1, ?)",
+        (bitmap.to_bytes(),)
+    )
+
+def rebuild_coverage(cursor, user_id=None):
+    """
+    Recompute the verse coverage bitmaps from reading history.
+    
+    Args:
+        user_id: Only rebuild this profile (default: every profile)
+    """
+    if user_id is None:
+        cursor.execute("SELECT id FROM users")
+        user_ids = [row[0] for row in cursor.fetchall()]
+    else:
+        user_ids = [user_id]
+    
+    for user_id in user_ids:
+        cursor.execute(
+            "SELECT DISTINCT book_id, chapter_number, verse_number FROM reading_history WHERE user_id = ?",
+            (user_id,)
+        )
+        bitmap = verse_coverage.from_positions(cursor.fetchall())
+        
+        cursor.execute(
+            "INSERT OR REPLACE INTO verse_coverage (user_id, bitmap) VALUES (?, ?)",
+            (user_id, bitmap.to_bytes())
+        )
+
+def _add_verse_search(cursor):
+    """Version 6: full-text search index over verse text"""
+    create_verse_search(cursor)
+
+def create_verse_search(cursor) -> bool:
+    """
+    Create the verses_fts full-text index and the triggers that keep it in
+    step with the verses table, then fill it from the existing verses.
+    
+    Returns:
+        False if this SQLite build has no FTS5, in which case nothing is created
+    """
+    try:
+        # External content table: the index stores no second copy of the text
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS verses_fts USING fts5(
+            verse_text,
+            content='verses',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError:
+        return False
+    
+    # Every change to verses is applied to the index incrementally
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS verses_fts_insert AFTER INSERT ON verses BEGIN
+        INSERT INTO verses_fts (rowid, verse_text) VALUES (new.id, new.verse_text);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS verses_fts_delete AFTER DELETE ON verses BEGIN
+        INSERT INTO verses_fts (verses_fts, rowid, verse_text) VALUES ('delete', old.id, old.verse_text);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS verses_fts_update AFTER UPDATE ON verses BEGIN
+        INSERT INTO verses_fts (verses_fts, rowid, verse_text) VALUES ('delete', old.id, old.verse_text);
+        INSERT INTO verses_fts (rowid, verse_text) VALUES (new.id, new.verse_text);
+    END
+    ''')
+    
+    rebuild_verse_search(cursor)
+    return True
+
+def rebuild_verse_search(cursor):
+    """Rebuild the full-text index from the verses table"""
+    cursor.execute("INSERT INTO verses_fts (verses_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO verses_fts (verses_fts) VALUES ('optimize')")
+
+def has_verse_search(cursor) -> bool:
+    """Check whether the database has a full-text index"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verses_fts'")
+    return cursor.fetchone() is not None
+
+def _add_corpus_state(cursor):
+    """Version 7: track changes to verse text so derived caches can be validated cheaply"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS corpus_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        corpus_id TEXT NOT NULL,
+        revision INTEGER NOT NULL
+    )
+    ''')
+    
+    # A random ID tells apart databases that happen to share a revision number
+    cursor.execute('''
+    INSERT OR IGNORE INTO corpus_state (id, corpus_id, revision)
+    VALUES (1, lower(hex(randomblob(8))), 0)
+    ''')
+    
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS verses_revision_{event.lower()} AFTER {event} ON verses BEGIN
+            UPDATE corpus_state SET revision = revision + 1 WHERE id = 1;
+        END
+        ''')
+
+def get_corpus_state(cursor):
+    """Get the (corpus_id, revision) pair that changes whenever verse text changes"""
+    cursor.execute("SELECT corpus_id, revision FROM corpus_state WHERE id = 1")
+    return cursor.fetchone()
+
+def _add_profiles(cursor):
+    """
+    Version 8: give every reader a profile.
+    
+    Progress, history and the tables derived from them gain a user_id, and
+    existing data becomes the default profile's. Their indexes are rebuilt
+    to lead on user_id, so each profile's queries touch only its own rows.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+        created_at DATETIME NOT NULL
+    )
+    ''')
+    cursor.execute(
+        "INSERT OR IGNORE INTO users (id, name, created_at) VALUES (?, ?, ?)",
+        (DEFAULT_USER_ID, DEFAULT_PROFILE, datetime.datetime.now().isoformat())
+    )
+    
+    for table in ("reading_progress", "reading_history"):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN user_id INTEGER NOT NULL DEFAULT {DEFAULT_USER_ID}")
+    
+    drop_history_indexes(cursor)
+    cursor.execute("DROP INDEX IF EXISTS idx_reading_progress_timestamp")
+    create_history_indexes(cursor)
+    
+    # Covers the latest-position lookup (ORDER BY timestamp DESC LIMIT 1)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reading_progress_timestamp
+    ON reading_progress (user_id, timestamp, book_id, chapter_number, verse_number)
+    ''')
+    
+    # The derived tables are keyed by profile, so they are recreated and refilled
+    cursor.execute("DROP TABLE IF EXISTS chapter_completion")
+    cursor.execute('''
+    CREATE TABLE chapter_completion (
+        user_id INTEGER NOT NULL,
+        book_id INTEGER NOT NULL,
+        chapter_number INTEGER NOT NULL,
+        completed_at DATETIME NOT NULL,
+        verses_read INTEGER NOT NULL,
+        PRIMARY KEY (user_id, book_id, chapter_number),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute("DROP TABLE IF EXISTS verse_coverage")
+    cursor.execute('''
+    CREATE TABLE verse_coverage (
+        user_id INTEGER PRIMARY KEY,
+        bitmap BLOB NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    
+    rebuild_chapter_completion(cursor)
+    rebuild_coverage(cursor)
+
+def _correct_canon_counts(cursor):
+    """
+    Version 9: make the books and chapters tables agree with canon.
+    
+    Version 4 only added missing chapters, so a database seeded with other
+    verse counts kept them, and chapter completion (computed in SQL from
+    these tables) disagreed with the position and percentages (computed
+    from canon). Wrong counts are corrected, duplicate chapters and those
+    canon does not have are removed, and chapter completion is recomputed
+    if anything changed.
+    """
+    changes = cursor.connection.total_changes
+    
+    cursor.executemany(
+        "UPDATE books SET total_chapters = ? WHERE id = ? AND total_chapters != ?",
+        [(book["chapters"], book["id"], book["chapters"]) for book in BIBLE_BOOKS]
+    )
+    
+    cursor.execute('''
+    DELETE FROM chapters WHERE id NOT IN (
+        SELECT MIN(id) FROM chapters GROUP BY book_id, chapter_number
+    )
+    ''')
+    cursor.execute("SELECT book_id, chapter_number FROM chapters")
+    extra = [
+        (book_id, chapter) for book_id, chapter in cursor.fetchall()
+        if not 1 <= chapter < len(canon.VERSE_COUNTS.get(book_id, ()))
+    ]
+    cursor.executemany("DELETE FROM chapters WHERE book_id = ? AND chapter_number = ?", extra)
+    cursor.executemany(
+        "UPDATE chapters SET total_verses = ? WHERE book_id = ? AND chapter_number = ? AND total_verses != ?",
+        [
+            (counts[chapter], book_id, chapter, counts[chapter])
+            for book_id, counts in canon.VERSE_COUNTS.items()
+            for chapter in range(1, len(counts))
+        ]
+    )
+    
+    if cursor.connection.total_changes != changes:
+        rebuild_chapter_completion(cursor)
+
+# Migrations in order; a database at version N has applied the first N
+MIGRATIONS = [
+    _create_base_schema,
+    _add_indexes,
+    _add_chapter_completion,
+    _seed_chapters,
+    _add_verse_coverage,
+    _add_verse_search,
+    _add_corpus_state,
+    _add_profiles,
+    _correct_canon_counts,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(cursor):
+    """Get the schema version stored in the database"""
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+def migrate(cursor):
+    """
+    Bring the database schema up to date.
+    
+    Applies every migration newer than the stored version, then records
+    the new version. Existing databases are upgraded in place.
+    
+    Returns:
+        The schema version before migrating
+    """
+    version = get_schema_version(cursor)
+    for migration in MIGRATIONS[version:]:
+        migration(cursor)
+    
+    if version < SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return version
@@ -0,0 +1,262 @@
+"""
+Per-query instrumentation for the database layer
+
+When tracing is on, db opens its connections with TracedConnection, whose
+cursors record every statement: its text, the call site that ran it, how
+long it took (including fetching its rows) and how many rows it returned.
+Connection opens are counted per call site too. Nothing is recorded, and
+connections are plain sqlite3 connections, while tracing is off.
+
+Turn tracing on with BIBLE_TRACKER_TRACE=1 (or --trace on the command
+line). The trace is written as JSON when the program exits, to
+BIBLE_TRACKER_TRACE_FILE or bible_tracker_trace.json. Only the latest
+MAX_RECORDS statements are kept, so a long-running traced process (such as
+the server) does not grow without bound.
+"""
+
+import atexit
+import collections
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Trace file written on exit when tracing is on
+DEFAULT_TRACE_FILE = "bible_tracker_trace.json"
+
+# Whether statements are being recorded
+ENABLED = os.environ.get("BIBLE_TRACKER_TRACE", "") not in ("", "0")
+
+TRACE_FILE = os.environ.get("BIBLE_TRACKER_TRACE_FILE", DEFAULT_TRACE_FILE)
+
+# Statements kept; older ones are dropped as new ones are recorded
+MAX_RECORDS = 100000
+
+# Frames skipped when looking for a statement's call site: this module,
+# sqlite3, context manager machinery, and db's connection plumbing, so
+# statements are blamed on the code that asked for them
+_INTERNAL_FILES = (__file__, sqlite3.__file__)
+_PASSTHROUGH_FUNCTIONS = {
+    ("db", "_open_connection"),
+    ("db", "get_connection"),
+    ("db", "transaction"),
+}
+
+# Statement start times are reported relative to this
+_epoch = time.perf_counter()
+
+_records = collections.deque(maxlen=MAX_RECORDS)
+# Statements recorded since startup, including dropped ones
+_recorded = 0
+_connection_opens = {}
+_lock = threading.Lock()
+_dump_registered = False
+
+class QueryRecord:
+    """One executed statement"""
+    
+    __slots__ = ("sql", "call_site", "started", "duration", "rows")
+    
+    def __init__(self, sql: str, call_site: str, started: float):
+        self.sql = sql
+        self.call_site = call_site
+        self.started = started
+        self.duration = 0.0
+        self.rows = 0
+    
+    def to_dict(self) -> dict:
+        return {
+            "sql": " ".join(self.sql.split()),
+            "call_site": self.call_site,
+            "started": round(self.started - _epoch, 6),
+            "duration_ms": round(self.duration * 1000, 4),
+            "rows": self.rows,
+        }
+
+def call_site() -> str:
+    """Describe the code that caused the current statement as module.function:line"""
+    frame = sys._getframe(1)
+    while frame is not None and (
+        frame.f_code.co_filename in _INTERNAL_FILES
+        or frame.f_code.co_filename.endswith("contextlib.py")
+        or (frame.f_globals.get("__name__"), frame.f_code.co_name) in _PASSTHROUGH_FUNCTIONS
+    ):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+def _record(sql: str) -> QueryRecord:
+    global _recorded
+    record = QueryRecord(sql, call_site(), time.perf_counter())
+    with _lock:
+        _records.append(record)
+        _recorded += 1
+    return record
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that records each statement and the rows fetched from it"""
+    
+    _record = None
+    
+    def execute(self, sql, parameters=()):
+        self._record = record = _record(sql)
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record.duration += time.perf_counter() - record.started
+    
+    def executemany(self, sql, seq_of_parameters):
+        self._record = record = _record(sql)
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record.duration += time.perf_counter() - record.started
+            record.rows = max(self.rowcount, 0)
+    
+    def executescript(self, sql_script):
+        self._record = record = _record(sql_script)
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record.duration += time.perf_counter() - record.started
+    
+    def _fetched(self, start: float, rows: int):
+        record = self._record
+        if record is not None:
+            record.duration += time.perf_counter() - start
+            record.rows += rows
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors, and commits, are recorded"""
+    
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+    
+    def commit(self):
+        record = _record("COMMIT")
+        try:
+            super().commit()
+        finally:
+            record.duration = time.perf_counter() - record.started
+
+def record_connection_open():
+    """Count a new connection against the code that caused it to be opened"""
+    site = call_site()
+    with _lock:
+        _connection_opens[site] = _connection_opens.get(site, 0) + 1
+
+def enable(trace_file: Optional[str] = None):
+    """
+    Start recording statements made on connections opened from now on,
+    and write the trace to trace_file when the program exits.
+    """
+    global ENABLED, TRACE_FILE
+    ENABLED = True
+    if trace_file:
+        TRACE_FILE = trace_file
+    _register_dump()
+
+def _register_dump():
+    global _dump_registered
+    if not _dump_registered:
+        atexit.register(_dump_on_exit)
+        _dump_registered = True
+
+def _dump_on_exit():
+    try:
+        dump(TRACE_FILE)
+    except OSError as e:
+        print(f"Error writing query trace: {e}", file=sys.stderr)
+
+def mark() -> int:
+    """Get a position in the trace, for summarizing what happens after it"""
+    with _lock:
+        return _recorded
+
+def records_since(position: int = 0) -> List[QueryRecord]:
+    """Get the statements recorded after a mark that are still kept"""
+    with _lock:
+        skip = max(0, position - (_recorded - len(_records)))
+        return list(itertools.islice(_records, skip, None))
+
+def dropped_count() -> int:
+    """Get the number of statements no longer kept because of MAX_RECORDS"""
+    with _lock:
+        return _recorded - len(_records)
+
+def summarize(records: List[QueryRecord]) -> List[Dict]:
+    """
+    Group statements by call site.
+    
+    Returns:
+        One entry per call site with its statement count, total time in
+        milliseconds and rows returned, slowest first
+    """
+    sites = {}
+    for record in records:
+        site = sites.setdefault(record.call_site, {"call_site": record.call_site, "queries": 0,
+                                                   "total_ms": 0.0, "rows": 0})
+        site["queries"] += 1
+        site["total_ms"] += record.duration * 1000
+        site["rows"] += record.rows
+    
+    for site in sites.values():
+        site["total_ms"] = round(site["total_ms"], 4)
+    return sorted(sites.values(), key=lambda site: site["total_ms"], reverse=True)
+
+def get_connection_opens() -> Dict[str, int]:
+    """Get the number of connections opened, by call site"""
+    with _lock:
+        return dict(_connection_opens)
+
+def dump(path: str):
+    """Write the kept statements, a per-call-site summary of them and connection opens as JSON"""
+    records = records_since(0)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "queries": [record.to_dict() for record in records],
+            "dropped": dropped_count(),
+            "summary": summarize(records),
+            "connection_opens": get_connection_opens(),
+        }, f, indent=2)
+
+if ENABLED:
+    _register_dump()
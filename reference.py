@@ -0,0 +1,242 @@
+"""
+Verse reference value type backed by a global verse ordinal
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple, Union
+import canon
+
+# "John 3:16", "1 John 2", "song of solomon 1:1"
+_REFERENCE_PATTERN = re.compile(r"^\s*(.+?)\s+(\d+)(?::(\d+))?\s*$")
+
+# The dash between the two ends of a passage, e.g. "John 3:16-18"
+_RANGE_SEPARATOR = re.compile(r"\s*[-\u2013\u2014]\s*")
+
+# The end of a passage within the same book: "18" or "4:2"
+_RANGE_END_PATTERN = re.compile(r"^(\d+)(?::(\d+))?$")
+
+class Reference:
+    """
+    A single verse of the Bible.
+    
+    Stored as its ordinal in canonical order (0 is Genesis 1:1), so
+    references are small, hashable and ordered, and stepping or measuring
+    between them is integer arithmetic.
+    """
+    
+    __slots__ = ("ordinal",)
+    
+    def __init__(self, ordinal: int):
+        if not 0 <= ordinal < canon.TOTAL_VERSES:
+            raise ValueError(f"Verse ordinal out of range: {ordinal}")
+        object.__setattr__(self, "ordinal", ordinal)
+    
+    @classmethod
+    def from_position(cls, book: Union[str, int], chapter: int, verse: int = 1) -> "Reference":
+        """
+        Build a reference from a book name or ID, chapter and verse.
+        
+        Raises:
+            ValueError: If the verse does not exist
+        """
+        book_id = book if isinstance(book, int) else canon.get_book_id(book)
+        if book_id is None:
+            raise ValueError(f"Unknown book: {book}")
+        return cls(canon.ordinal(book_id, chapter, verse))
+    
+    @classmethod
+    def parse(cls, text: str) -> "Reference":
+        """
+        Parse text such as "John 3:16" or "Psalms 23" (verse 1).
+        
+        Book names are matched case-insensitively, then by partial name.
+        
+        Raises:
+            ValueError: If the text is not a valid reference
+        """
+        match = _REFERENCE_PATTERN.match(text)
+        book = canon.find_book(match.group(1)) if match else None
+        if not book:
+            raise ValueError(f"Not a Bible reference: {text!r}")
+        
+        verse = int(match.group(3)) if match.group(3) else 1
+        return cls.from_position(book, int(match.group(2)), verse)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Reference is immutable")
+    
+    @property
+    def book_id(self) -> int:
+        """Book ID"""
+        return canon.position(self.ordinal)[0]
+    
+    @property
+    def book(self) -> str:
+        """Book name"""
+        return canon.get_book_name(self.book_id)
+    
+    @property
+    def chapter(self) -> int:
+        """Chapter number"""
+        return canon.position(self.ordinal)[1]
+    
+    @property
+    def verse(self) -> int:
+        """Verse number"""
+        return canon.position(self.ordinal)[2]
+    
+    def to_tuple(self) -> Tuple[str, int, int]:
+        """Get the (book name, chapter, verse) tuple used throughout the tracker"""
+        book_id, chapter, verse = canon.position(self.ordinal)
+        return (canon.get_book_name(book_id), chapter, verse)
+    
+    def next(self) -> Optional["Reference"]:
+        """Get the following verse, or None after Revelation 22:21"""
+        if self.ordinal + 1 >= canon.TOTAL_VERSES:
+            return None
+        return Reference(self.ordinal + 1)
+    
+    def previous(self) -> Optional["Reference"]:
+        """Get the preceding verse, or None before Genesis 1:1"""
+        if self.ordinal == 0:
+            return None
+        return Reference(self.ordinal - 1)
+    
+    def distance(self, other: "Reference") -> int:
+        """Get the number of verses from this reference to another"""
+        return other.ordinal - self.ordinal
+    
+    def range(self, end: "Reference") -> Iterator["Reference"]:
+        """Iterate over the verses from this reference to end, inclusive"""
+        for ordinal in range(self.ordinal, end.ordinal + 1):
+            yield Reference(ordinal)
+    
+    def chapter_start(self) -> "Reference":
+        """Get the first verse of this reference's chapter"""
+        book_id, chapter, verse = canon.position(self.ordinal)
+        return Reference(self.ordinal - verse + 1)
+    
+    def chapter_end(self) -> "Reference":
+        """Get the last verse of this reference's chapter"""
+        book_id, chapter, verse = canon.position(self.ordinal)
+        return Reference(self.ordinal - verse + canon.verse_count(book_id, chapter))
+    
+    def __add__(self, verses: int) -> "Reference":
+        if not isinstance(verses, int):
+            return NotImplemented
+        return Reference(self.ordinal + verses)
+    
+    def __sub__(self, other):
+        if isinstance(other, Reference):
+            return self.ordinal - other.ordinal
+        if isinstance(other, int):
+            return Reference(self.ordinal - other)
+        return NotImplemented
+    
+    def __eq__(self, other):
+        if not isinstance(other, Reference):
+            return NotImplemented
+        return self.ordinal == other.ordinal
+    
+    def __lt__(self, other):
+        if not isinstance(other, Reference):
+            return NotImplemented
+        return self.ordinal < other.ordinal
+    
+    def __le__(self, other):
+        if not isinstance(other, Reference):
+            return NotImplemented
+        return self.ordinal <= other.ordinal
+    
+    def __gt__(self, other):
+        if not isinstance(other, Reference):
+            return NotImplemented
+        return self.ordinal > other.ordinal
+    
+    def __ge__(self, other):
+        if not isinstance(other, Reference):
+            return NotImplemented
+        return self.ordinal >= other.ordinal
+    
+    def __hash__(self):
+        return hash(self.ordinal)
+    
+    def __reduce__(self):
+        return (Reference, (self.ordinal,))
+    
+    def __str__(self):
+        book, chapter, verse = self.to_tuple()
+        return f"{book} {chapter}:{verse}"
+    
+    def __repr__(self):
+        return f"Reference({str(self)!r})"
+
+@lru_cache(maxsize=1024)
+def _book_id(name: str) -> Optional[int]:
+    """Resolve a book name as written in a passage; cached for bulk parsing"""
+    book = canon.find_book(name)
+    return canon.get_book_id(book) if book else None
+
+def _passage_end(book_id: int, chapter: int, verse: Optional[int]) -> int:
+    """The ordinal of a passage's last verse; a bare chapter ends at its last verse"""
+    if verse is None:
+        verse = canon.verse_count(book_id, chapter)
+    return canon.ordinal(book_id, chapter, verse)
+
+def passage_ordinals(text: str) -> Tuple[int, int]:
+    """
+    Parse a passage into the ordinals of its first and last verse.
+    
+    See parse_passage for the accepted forms.
+    
+    Raises:
+        ValueError: If the text is not a valid passage or ends before it starts
+    """
+    start_text, _, end_text = _RANGE_SEPARATOR.sub("-", text.strip(), count=1).partition("-")
+    match = _REFERENCE_PATTERN.match(start_text)
+    book_id = _book_id(match.group(1)) if match else None
+    if not book_id:
+        raise ValueError(f"Not a Bible passage: {text!r}")
+    
+    chapter = int(match.group(2))
+    verse = int(match.group(3)) if match.group(3) else None
+    start = canon.ordinal(book_id, chapter, verse or 1)
+    
+    if not end_text:
+        end = _passage_end(book_id, chapter, verse)
+    elif _RANGE_END_PATTERN.match(end_text):
+        end_match = _RANGE_END_PATTERN.match(end_text)
+        if end_match.group(2):
+            end = _passage_end(book_id, int(end_match.group(1)), int(end_match.group(2)))
+        elif verse is not None:
+            # "John 3:16-18": the end is a verse of the same chapter
+            end = _passage_end(book_id, chapter, int(end_match.group(1)))
+        else:
+            # "John 3-5": the end is a chapter
+            end = _passage_end(book_id, int(end_match.group(1)), None)
+    else:
+        end_match = _REFERENCE_PATTERN.match(end_text)
+        end_book_id = _book_id(end_match.group(1)) if end_match else None
+        if not end_book_id:
+            raise ValueError(f"Not a Bible passage: {text!r}")
+        end = _passage_end(end_book_id, int(end_match.group(2)),
+                           int(end_match.group(3)) if end_match.group(3) else None)
+    
+    if end < start:
+        raise ValueError(f"Passage ends before it starts: {text!r}")
+    return start, end
+
+def parse_passage(text: str) -> Tuple[Reference, Reference]:
+    """
+    Parse a passage into its first and last verse.
+    
+    Accepts a verse ("John 3:16"), a chapter ("John 3"), and ranges of
+    either: "John 3:16-18", "John 3-5", "John 3:16-4:2" and ranges across
+    books such as "Genesis 50-Exodus 2".
+    
+    Raises:
+        ValueError: If the text is not a valid passage or ends before it starts
+    """
+    start, end = passage_ordinals(text)
+    return Reference(start), Reference(end)
@@ -0,0 +1,218 @@
+"""
+Full-text verse search
+
+Searches verse text through the verses_fts FTS5 index, or through the
+pure-Python index in verse_index when SQLite has no FTS5. Results from
+either engine are ranked by BM25. Queries use a small syntax that is translated into safe FTS5 syntax:
+
+    love one another      verses containing every word
+    faith OR hope         verses containing either word
+    love NOT hate         verses containing love but not hate
+    "in the beginning"    an exact phrase
+    bless*                words starting with a prefix
+"""
+
+import os
+import re
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple, Union
+import canon
+import db
+import migrations
+
+# Number of results returned when no limit is given
+DEFAULT_LIMIT = 20
+
+# Words of context shown around the matches in a snippet
+SNIPPET_WORDS = 16
+
+# Markers placed around matched words in snippets by default
+DEFAULT_HIGHLIGHT = ("[", "]")
+
+OPERATORS = ("AND", "OR", "NOT")
+
+# Search engine: "fts", "index", or "auto" to use FTS5 whenever the
+# database has a full-text index and the pure-Python index otherwise
+ENGINE = os.environ.get("BIBLE_TRACKER_SEARCH_ENGINE", "auto")
+
+class Term(NamedTuple):
+    """A word, or a phrase of several words, to match"""
+    words: Tuple[str, ...]
+    prefix: bool = False
+
+# A parsed query is a list of terms with operators between them
+QueryItem = Union[Term, str]
+
+class SearchResult(NamedTuple):
+    """A verse matching a search, best matches first"""
+    book: str
+    chapter: int
+    verse: int
+    text: str
+    snippet: str
+    score: float
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"?|([^\s"]+)')
+
+# A word as the index tokenizer sees it: letters and digits only
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+def normalize_word(word: str) -> str:
+    """Fold case and strip accents the way the index tokenizer does"""
+    decomposed = unicodedata.normalize("NFKD", word.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized words"""
+    words = WORD_PATTERN.findall(text.casefold())
+    if text.isascii():
+        return words
+    return [normalize_word(word) for word in words]
+
+def parse_query(query: str) -> List[QueryItem]:
+    """
+    Parse a search query into terms and operators.
+    
+    Punctuation is dropped, so input such as "John 3:16" can never be a
+    syntax error. Operators with nothing to join are ignored, and words
+    with no operator between them are joined with AND.
+    
+    Returns:
+        Alternating Term and operator items, starting and ending with a Term
+    """
+    items = []
+    for phrase, word in _QUERY_TOKEN.findall(query):
+        if word in OPERATORS:
+            # A second operator in a row replaces the first
+            if items and isinstance(items[-1], str):
+                items[-1] = word
+            elif items:
+                items.append(word)
+            continue
+        
+        words = tuple(tokenize(phrase if phrase else word))
+        if not words:
+            continue
+        
+        if items and isinstance(items[-1], Term):
+            items.append("AND")
+        items.append(Term(words, prefix=not phrase and word.endswith("*")))
+    
+    if items and isinstance(items[-1], str):
+        items.pop()
+    return items
+
+def to_fts_query(items: List[QueryItem]) -> str:
+    """Render parsed query items as an FTS5 MATCH expression"""
+    parts = []
+    for item in items:
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            phrase = '"' + " ".join(item.words) + '"'
+            parts.append(phrase + "*" if item.prefix else phrase)
+    return " ".join(parts)
+
+def get_engine() -> str:
+    """Get the search engine in use: fts or index"""
+    if ENGINE in ("fts", "index"):
+        return ENGINE
+    return "fts" if migrations.has_verse_search(db.get_connection().cursor()) else "index"
+
+def rebuild_index() -> str:
+    """
+    Rebuild the search index from the verses table.
+    
+    Creates the FTS5 index if the database lacks one, and falls back to
+    rebuilding the pure-Python index when SQLite has no FTS5.
+    
+    Returns:
+        The engine whose index was rebuilt: "fts" or "index"
+    """
+    if ENGINE != "index":
+        with db.transaction() as cursor:
+            if migrations.has_verse_search(cursor):
+                migrations.rebuild_verse_search(cursor)
+                return "fts"
+            if migrations.create_verse_search(cursor):
+                return "fts"
+    
+    import verse_index  # Local import to avoid circular import
+    verse_index.get_index(rebuild=True)
+    return "index"
+
+def _filters(book: Optional[str], chapter: Optional[int]) -> Tuple[str, list]:
+    """Build the extra WHERE clauses and parameters for book/chapter filters"""
+    sql, params = "", []
+    if book:
+        sql += " AND v.book_id = ?"
+        params.append(canon.get_book_id(book))
+        if chapter:
+            sql += " AND v.chapter_number = ?"
+            params.append(chapter)
+    return sql, params
+
+def search(query: str, book: str = None, chapter: int = None, limit: int = DEFAULT_LIMIT,
+           offset: int = 0, highlight: Tuple[str, str] = DEFAULT_HIGHLIGHT) -> List[SearchResult]:
+    """
+    Search verse text.
+    
+    Args:
+        query: Words, "phrases", prefix* terms and AND/OR/NOT operators
+        book: Only search this book
+        chapter: Only search this chapter of the book
+        limit: Maximum number of results
+        offset: Number of best results to skip, for paging
+        highlight: Strings placed before and after each matched word in snippets
+    
+    Returns:
+        Matching verses, best first; score is the negated BM25 rank, so
+        higher scores are better matches
+    """
+    items = parse_query(query)
+    if not items:
+        return []
+    if get_engine() == "index":
+        import verse_index  # Local import to avoid circular import
+        return verse_index.search(items, book, chapter, limit, offset, highlight)
+    
+    filter_sql, filter_params = _filters(book, chapter)
+    cursor = db.get_connection().cursor()
+    cursor.execute(f"""
+        SELECT b.name, v.chapter_number, v.verse_number, v.verse_text,
+               snippet(verses_fts, 0, ?, ?, '…', ?), bm25(verses_fts)
+        FROM verses_fts
+        JOIN verses v ON v.id = verses_fts.rowid
+        JOIN books b ON b.id = v.book_id
+        WHERE verses_fts MATCH ?{filter_sql}
+        ORDER BY bm25(verses_fts)
+        LIMIT ? OFFSET ?
+    """, (highlight[0], highlight[1], SNIPPET_WORDS, to_fts_query(items),
+          *filter_params, limit, offset))
+    
+    return [
+        SearchResult(book_name, chapter_number, verse_number, text, snippet, -rank)
+        for book_name, chapter_number, verse_number, text, snippet, rank in cursor.fetchall()
+    ]
+
+def count(query: str, book: str = None, chapter: int = None) -> int:
+    """Count the verses matching a search"""
+    items = parse_query(query)
+    if not items:
+        return 0
+    if get_engine() == "index":
+        import verse_index  # Local import to avoid circular import
+        return verse_index.count(items, book, chapter)
+    
+    filter_sql, filter_params = _filters(book, chapter)
+    cursor = db.get_connection().cursor()
+    if filter_sql:
+        cursor.execute(f"""
+            SELECT COUNT(*)
+            FROM verses_fts
+            JOIN verses v ON v.id = verses_fts.rowid
+            WHERE verses_fts MATCH ?{filter_sql}
+        """, (to_fts_query(items), *filter_params))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM verses_fts WHERE verses_fts MATCH ?", (to_fts_query(items),))
+    return cursor.fetchone()[0]
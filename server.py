@@ -0,0 +1,592 @@
+"""
+Local HTTP/JSON API over the tracker
+
+A small HTTP/1.1 server built on asyncio and the standard library, so web
+and phone front-ends can read and update reading progress. The event loop
+only parses requests and writes responses; tracker and database calls go
+through aiotracker, so reads run on a bounded pool of reader threads and
+writes are made one at a time on a single writer thread. Responses to
+read endpoints are cached until the next write through the server, or for
+CACHE_TTL seconds so changes made by other programs are picked up.
+
+Start it with:
+
+    python main.py serve --port 8765
+
+Every endpoint takes an optional profile (a query parameter, or a field of
+the JSON body for POST requests). GET / lists the endpoints.
+"""
+
+import asyncio
+import io
+import json
+import signal
+import sys
+import time
+from http import HTTPStatus
+from typing import Callable, Dict, NamedTuple, Optional, TextIO, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+import aiotracker
+import db
+import exporter
+import search
+import tracker
+from textcache import LRUCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Threads running tracker reads; each keeps its own database connection
+DEFAULT_WORKERS = 4
+
+# Seconds a cached read stays valid when nothing is written through the
+# server, so writes made by other programs show up soon after
+CACHE_TTL = 1.0
+
+# Read responses kept in the cache
+CACHE_SIZE = 512
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1024 * 1024
+
+# Bytes of a streamed response collected before they are sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 15
+
+# Host header values always accepted, besides the address the server is
+# bound to; others are refused, so a web page cannot reach the API
+# through DNS rebinding
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# Content type of each export format
+EXPORT_CONTENT_TYPES = {
+    "nested": "application/json",
+    "flat": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+class HTTPError(Exception):
+    """An error reported to the client with a status code and a JSON message"""
+    
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class Response(NamedTuple):
+    """A response body that is not JSON"""
+    content_type: str
+    body: bytes
+
+class StreamedResponse(NamedTuple):
+    """
+    A response too large to build in memory: write is called with a text
+    file on a reader thread, and what it writes is sent as it is written.
+    Streamed responses are never cached.
+    """
+    content_type: str
+    write: Callable[[TextIO], object]
+
+class Route(NamedTuple):
+    """An endpoint: the function run on a worker thread, and whether it writes"""
+    handler: Callable[[Dict[str, str]], object]
+    write: bool = False
+    description: str = ""
+
+def _int_param(params: Dict[str, str], name: str, default: Optional[int] = None) -> int:
+    """Get a required (or defaulted) integer parameter"""
+    value = params.get(name)
+    if value is None or value == "":
+        if default is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing parameter: {name}")
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Not a number: {name}={value}")
+
+def _bool_param(params: Dict[str, str], name: str, default: bool = False) -> bool:
+    """Get a flag given as a JSON boolean or as 1/true/yes or 0/false/no"""
+    value = params.get(name)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("1", "true", "yes"):
+        return True
+    if isinstance(value, str) and value.lower() in ("0", "false", "no"):
+        return False
+    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Not true or false: {name}={value}")
+
+def _book_param(params: Dict[str, str]) -> str:
+    """Get the book named by the book parameter, matched like user input"""
+    if not params.get("book"):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing parameter: book")
+    book = tracker.find_book(str(params["book"]))
+    if not book:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"Book not found: {params['book']}")
+    return book
+
+def _chapter_param(params: Dict[str, str], book: str, name: str = "chapter") -> int:
+    """Get a chapter number that exists in book"""
+    chapter = _int_param(params, name)
+    if not 1 <= chapter <= tracker.get_chapter_count(book):
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"{book} has no chapter {chapter}")
+    return chapter
+
+def _position(book: str, chapter: int, verse: int) -> dict:
+    return {"book": book, "chapter": chapter, "verse": verse}
+
+def get_index(params):
+    """List the endpoints"""
+    return [
+        {"method": method, "path": path, "description": route.description}
+        for (method, path), route in ROUTES.items()
+    ]
+
+def get_position(params):
+    """GET /position"""
+    book, chapter, verse = tracker.get_current_position(params.get("profile"))
+    return dict(_position(book, chapter, verse), text=tracker.get_verse_content(book, chapter, verse))
+
+def get_next(params):
+    """GET /next"""
+    book, chapter, verse = tracker.get_next_verse(params.get("profile"))
+    return dict(_position(book, chapter, verse), text=tracker.get_verse_content(book, chapter, verse))
+
+def get_chapter(params):
+    """GET /chapter"""
+    book = _book_param(params)
+    chapter = _chapter_param(params, book)
+    return {
+        "book": book,
+        "chapter": chapter,
+        "verses": [{"verse": verse, "text": text} for verse, text in tracker.get_chapter_content(book, chapter)],
+    }
+
+def get_book_chapters(params):
+    """GET /chapters"""
+    book = _book_param(params)
+    chapters = tracker.get_book_chapters(book, params.get("profile"))
+    return {"book": book, "chapters": {str(number): done for number, done in chapters.items()}}
+
+def get_books(params):
+    """GET /books"""
+    return [{"book": book, "chapters": tracker.get_chapter_count(book)} for book in tracker.get_all_books()]
+
+def get_percentages(params):
+    """GET /percentages"""
+    return tracker.get_progress_percentages(params.get("profile"))
+
+def get_estimates(params):
+    """GET /estimates"""
+    return tracker.get_completion_estimates(params.get("profile"))
+
+def get_stats(params):
+    """GET /stats"""
+    return tracker.get_reading_statistics(params.get("profile"))
+
+def get_dashboard(params):
+    """GET /dashboard"""
+    snapshot = tracker.get_dashboard_snapshot(params.get("profile"))
+    return {
+        "position": _position(snapshot.book, snapshot.chapter, snapshot.verse),
+        "verse_text": snapshot.verse_text,
+        "next_position": _position(*snapshot.next_position),
+        "percentages": dict(snapshot.percentages),
+        "estimates": dict(snapshot.estimates),
+        "chapters": {str(number): done for number, done in snapshot.chapters.items()},
+        "completed_books": list(snapshot.completed_books),
+    }
+
+def get_profiles(params):
+    """GET /profiles"""
+    return tracker.get_profiles()
+
+def get_search(params):
+    """GET /search"""
+    query = params.get("q", "").strip()
+    if not query:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing parameter: q")
+    book = _book_param(params) if params.get("book") else None
+    chapter = _chapter_param(params, book) if book and params.get("chapter") else None
+    limit = _int_param(params, "limit", search.DEFAULT_LIMIT)
+    offset = _int_param(params, "offset", 0)
+    
+    return {
+        "total": tracker.count_search_results(query, book, chapter),
+        "results": [result._asdict() for result in tracker.search_verses(query, book, chapter, limit, offset)],
+    }
+
+def get_export(params):
+    """GET /export"""
+    format_type = params.get("format", "ndjson")
+    if format_type not in EXPORT_CONTENT_TYPES:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown export format: {format_type}")
+    book = _book_param(params) if params.get("book") else None
+    
+    return StreamedResponse(f"{EXPORT_CONTENT_TYPES[format_type]}; charset=utf-8",
+                            lambda out: exporter.write_export(out, format_type, book))
+
+def post_position(params):
+    """POST /position"""
+    book = _book_param(params)
+    chapter = _chapter_param(params, book)
+    verse = _int_param(params, "verse")
+    if not 1 <= verse <= tracker.get_verse_count(book, chapter):
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"{book} {chapter} has no verse {verse}")
+    
+    auto_advance = _bool_param(params, "auto_advance")
+    if not tracker.update_reading_position(book, chapter, verse, auto_advance, params.get("profile")):
+        raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "Could not update the reading position")
+    return get_position(params)
+
+def post_chapter_complete(params):
+    """POST /chapter-complete"""
+    book = _book_param(params)
+    chapter = _chapter_param(params, book)
+    if not tracker.mark_chapter_complete(book, chapter, params.get("profile")):
+        raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "Could not mark the chapter complete")
+    return get_position(params)
+
+def post_chapters_read(params):
+    """POST /chapters-read"""
+    book = _book_param(params)
+    first = _chapter_param(params, book, "first")
+    last = _chapter_param(params, book, "last") if params.get("last") else first
+    if not tracker.mark_chapters_read(book, first, last, params.get("profile")):
+        raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "Could not record the chapters")
+    return get_book_chapters(params)
+
+ROUTES = {
+    ("GET", "/"): Route(get_index, description="This list"),
+    ("GET", "/position"): Route(get_position, description="Current position and its verse text"),
+    ("GET", "/next"): Route(get_next, description="Next verse to read"),
+    ("GET", "/dashboard"): Route(get_dashboard, description="Everything the dashboard shows"),
+    ("GET", "/percentages"): Route(get_percentages, description="Chapter, book and Bible completion"),
+    ("GET", "/estimates"): Route(get_estimates, description="Days left in the book and the Bible"),
+    ("GET", "/stats"): Route(get_stats, description="Reading statistics"),
+    ("GET", "/books"): Route(get_books, description="Every book with its chapter count"),
+    ("GET", "/chapters"): Route(get_book_chapters, description="Completed chapters of ?book="),
+    ("GET", "/chapter"): Route(get_chapter, description="Verse text of ?book=&chapter="),
+    ("GET", "/search"): Route(get_search, description="Search verse text: ?q=&book=&chapter=&limit=&offset="),
+    ("GET", "/profiles"): Route(get_profiles, description="Profile names"),
+    ("GET", "/export"): Route(get_export, description="Bible text as ?format=nested|flat|ndjson|csv&book="),
+    ("POST", "/position"): Route(post_position, write=True,
+                                 description="Set the position: {book, chapter, verse, auto_advance}"),
+    ("POST", "/chapter-complete"): Route(post_chapter_complete, write=True,
+                                         description="Finish a chapter and advance: {book, chapter}"),
+    ("POST", "/chapters-read"): Route(post_chapters_read, write=True,
+                                      description="Record chapters as read: {book, first, last}"),
+}
+
+class APIServer:
+    """Serves ROUTES over HTTP, running handlers through aiotracker"""
+    
+    def __init__(self, workers: int = DEFAULT_WORKERS, cache_ttl: float = CACHE_TTL,
+                 allow_origin: Optional[str] = None):
+        """
+        Args:
+            workers: Threads running tracker reads
+            cache_ttl: Seconds a cached read stays valid (0 disables the cache)
+            allow_origin: Origin allowed to call the API from a browser (CORS)
+        """
+        self.cache_ttl = cache_ttl
+        self.allow_origin = allow_origin
+        aiotracker.configure(readers=workers)
+        self._cache = LRUCache(CACHE_SIZE)
+        # Bumped by every write, which makes every cached response stale
+        self._generation = 0
+        self._server = None
+        self._allowed_hosts = set(LOCAL_HOSTS)
+    
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+        """Start listening; returns the address actually bound (port 0 picks a free port)"""
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        bound = self._server.sockets[0].getsockname()[:2]
+        self._allowed_hosts.update((host.lower(), bound[0]))
+        return bound
+    
+    async def serve_forever(self):
+        """Serve until cancelled"""
+        async with self._server:
+            await self._server.serve_forever()
+    
+    def close(self):
+        """Stop listening and wait for running handlers to finish"""
+        if self._server is not None:
+            self._server.close()
+        aiotracker.close()
+    
+    def cache_stats(self) -> dict:
+        """Get hit/miss counts and the size of the response cache"""
+        return self._cache.stats()
+    
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests on one connection until the client closes it or stops using it"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    status, content_type, payload = _error(e.status, e.message)
+                    writer.write(self._format_response(status, payload, content_type, False))
+                    break
+                if request is None:
+                    break
+                
+                method, target, headers, body = request
+                keep_alive = _keep_alive(headers)
+                status, content_type, payload, cache_state = await self.dispatch(method, target, body, headers)
+                if isinstance(payload, StreamedResponse):
+                    # HTTP/1.0 clients get the body unframed, ended by closing
+                    chunked = headers["_version"] != "HTTP/1.0"
+                    keep_alive = keep_alive and chunked
+                    writer.write(self._format_head(status, content_type, keep_alive, None, cache_state))
+                    try:
+                        await aiotracker.run_read(_send_stream, payload, writer, asyncio.get_running_loop(), chunked)
+                    except ConnectionError:
+                        raise
+                    except Exception as e:
+                        # The status is already sent; closing tells the client the body is cut short
+                        print(f"Error streaming response: {e}", file=sys.stderr)
+                        break
+                else:
+                    writer.write(self._format_response(status, payload, content_type, keep_alive, cache_state))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Read one request as (method, target, headers, body), or None at end of stream"""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        
+        headers = {"_version": version}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked request bodies are not supported")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Bad Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+    
+    async def dispatch(self, method: str, target: str, body: bytes = b"",
+                       headers: Optional[Dict[str, str]] = None) -> Tuple[HTTPStatus, str, bytes, str]:
+        """
+        Run the endpoint for a request.
+        
+        Args:
+            headers: Request headers, with lowercase names
+        
+        Returns:
+            The status, content type, body and cache state ("hit", "miss"
+            or "" for responses that are never cached)
+        """
+        headers = headers or {}
+        host = headers.get("host")
+        if host is not None and _host_name(host) not in self._allowed_hosts:
+            return (*_error(HTTPStatus.FORBIDDEN, f"Host not allowed: {host}"), "")
+        
+        if method == "OPTIONS" and self.allow_origin:
+            return HTTPStatus.NO_CONTENT, "text/plain", b"", ""
+        
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        route = ROUTES.get((method, path))
+        if route is None:
+            if any(route_path == path for _, route_path in ROUTES):
+                return (*_error(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {path}"), "")
+            return (*_error(HTTPStatus.NOT_FOUND, f"No endpoint {path}"), "")
+        
+        # A browser only sends JSON after a CORS preflight, so other pages
+        # cannot write with a form or a "simple" text/plain request
+        content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        if route.write and content_type != "application/json":
+            return (*_error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Writes need Content-Type: application/json"), "")
+        
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                fields = json.loads(body)
+            except ValueError:
+                return (*_error(HTTPStatus.BAD_REQUEST, "Request body is not JSON"), "")
+            if not isinstance(fields, dict):
+                return (*_error(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object"), "")
+            # Parameters are single values, which also keeps them usable in cache keys
+            for name, value in fields.items():
+                if isinstance(value, (list, dict)):
+                    return (*_error(HTTPStatus.BAD_REQUEST, f"Parameter must be a single value: {name}"), "")
+            params.update(fields)
+        
+        profile = params.get("profile")
+        if profile is not None and not isinstance(profile, str):
+            return (*_error(HTTPStatus.BAD_REQUEST, "Parameter must be a profile name: profile"), "")
+        
+        if route.write:
+            # Writes queue for the writer thread; reads carry on meanwhile
+            response = await self._run(aiotracker.run_write, route.handler, params)
+            self._generation += 1
+            return (*response, "")
+        
+        key = (path, tuple(sorted(params.items())))
+        cached = self._cache.get(key) if self.cache_ttl > 0 else None
+        if cached is not None:
+            generation, expires, response = cached
+            if generation == self._generation and time.monotonic() < expires:
+                return (*response, "hit")
+        
+        generation = self._generation
+        response = await self._run(aiotracker.run_read, route.handler, params)
+        if isinstance(response[2], StreamedResponse):
+            return (*response, "")
+        if response[0] == HTTPStatus.OK and self.cache_ttl > 0:
+            self._cache.put(key, (generation, time.monotonic() + self.cache_ttl, response))
+        return (*response, "miss")
+    
+    async def _run(self, runner, handler, params) -> Tuple[HTTPStatus, str, Union[bytes, StreamedResponse]]:
+        """Run a handler with aiotracker.run_read or run_write and encode its result"""
+        try:
+            result = await runner(handler, params)
+        except HTTPError as e:
+            return _error(e.status, e.message)
+        except ValueError as e:
+            return _error(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            print(f"Error handling request: {e}", file=sys.stderr)
+            return _error(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal error")
+        
+        if isinstance(result, Response):
+            return HTTPStatus.OK, result.content_type, result.body
+        if isinstance(result, StreamedResponse):
+            return HTTPStatus.OK, result.content_type, result
+        return HTTPStatus.OK, "application/json; charset=utf-8", json.dumps(result, ensure_ascii=False).encode("utf-8")
+    
+    def _format_response(self, status: HTTPStatus, body: bytes, content_type: str, keep_alive: bool,
+                         cache_state: str = "") -> bytes:
+        """Build the bytes of a response"""
+        return self._format_head(status, content_type, keep_alive, len(body), cache_state) + body
+    
+    def _format_head(self, status: HTTPStatus, content_type: str, keep_alive: bool, length: Optional[int],
+                     cache_state: str = "") -> bytes:
+        """Build the status line and headers; a length of None means a chunked body (or none when closing)"""
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+        ]
+        if length is not None:
+            lines.append(f"Content-Length: {length}")
+        elif keep_alive:
+            lines.append("Transfer-Encoding: chunked")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        if cache_state:
+            lines.append(f"X-Cache: {cache_state}")
+        if self.allow_origin:
+            lines.append(f"Access-Control-Allow-Origin: {self.allow_origin}")
+            lines.append("Access-Control-Allow-Methods: GET, POST, OPTIONS")
+            lines.append("Access-Control-Allow-Headers: Content-Type")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+class _ConnectionWriter(io.RawIOBase):
+    """Binary file, written on a worker thread, whose data is sent on the event loop's connection"""
+    
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop, chunked: bool):
+        super().__init__()
+        self._writer = writer
+        self._loop = loop
+        self._chunked = chunked
+        # Set once sending fails, so buffered data left over is dropped
+        self._failed = False
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data and not self._failed:
+            # An empty chunk would end the body
+            self.send(b"%x\r\n%s\r\n" % (len(data), data) if self._chunked else data)
+        return len(data)
+    
+    def send(self, data: bytes):
+        """Send bytes as they are, waiting until the connection has taken them"""
+        try:
+            asyncio.run_coroutine_threadsafe(self._send(data), self._loop).result()
+        except BaseException:
+            self._failed = True
+            raise
+    
+    async def _send(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+def _send_stream(response: StreamedResponse, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop,
+                 chunked: bool):
+    """Write a streamed response's body to a connection, on a reader thread"""
+    raw = _ConnectionWriter(writer, loop, chunked)
+    out = io.TextIOWrapper(io.BufferedWriter(raw, STREAM_CHUNK_SIZE), encoding="utf-8", newline="")
+    response.write(out)
+    out.flush()
+    if chunked:
+        raw.send(b"0\r\n\r\n")
+
+def _error(status: HTTPStatus, message: str) -> Tuple[HTTPStatus, str, bytes]:
+    """Build an error response with a JSON message"""
+    return status, "application/json; charset=utf-8", json.dumps({"error": message}).encode("utf-8")
+
+def _host_name(host: str) -> str:
+    """The name or address in a Host header, without the port"""
+    host = host.strip().lower()
+    if host.startswith("["):
+        return host[1:host.find("]")]
+    return host.rpartition(":")[0] if ":" in host else host
+
+def _keep_alive(headers: Dict[str, str]) -> bool:
+    """Whether the client wants the connection kept open after this request"""
+    connection = headers.get("connection", "").lower()
+    if headers["_version"] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+                cache_ttl: float = CACHE_TTL, allow_origin: Optional[str] = None):
+    """Run the API server until cancelled"""
+    db.init_db()
+    server = APIServer(workers, cache_ttl, allow_origin)
+    
+    # Stop cleanly on SIGTERM too, letting running writes finish
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass  # Not available on Windows
+    
+    try:
+        host, port = await server.start(host, port)
+        print(f"Serving the tracker API on http://{host}:{port}/ (Ctrl+C to stop)", flush=True)
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,82 @@
+"""
+Command line tests against a stored position the Bible does not have
+
+Run from the repository root with:
+
+    python -m unittest discover tests
+"""
+
+import datetime
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import db
+
+class OutOfRangePositionTest(unittest.TestCase):
+    """Commands run on a database whose stored position is past the chapter or book end"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="bible-cli-test-")
+        db.close_connection()
+        db.DB_PATH = os.path.join(self.workdir, "bible_tracker.db")
+        db.init_db()
+    
+    def tearDown(self):
+        db.close_connection()
+        db.DB_PATH = "bible_tracker.db"
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def store_position(self, book_id, chapter, verse):
+        with db.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO reading_progress (user_id, book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (db.DEFAULT_USER_ID, book_id, chapter, verse, datetime.datetime.now().isoformat())
+            )
+    
+    def run_cli(self, *args):
+        # main.py opens bible_tracker.db in the working directory
+        return subprocess.run([sys.executable, os.path.join(REPO_ROOT, "main.py"), *args],
+                              cwd=self.workdir, capture_output=True, text=True)
+    
+    def test_verse_past_chapter_end(self):
+        self.store_position(43, 3, 999)  # John 3 has 36 verses
+        
+        status = self.run_cli("status")
+        self.assertEqual(status.returncode, 0, status.stderr)
+        self.assertTrue(status.stdout.startswith("John 3:36 "))
+        self.assertIn("chapter 100%", status.stdout)
+        
+        following = self.run_cli("next", "--json")
+        self.assertEqual(following.returncode, 0, following.stderr)
+        self.assertIn('"reference": "John 4:1"', following.stdout)
+    
+    def test_marking_from_verse_past_chapter_end(self):
+        self.store_position(43, 3, 999)
+        
+        marked = self.run_cli("mark-chapter")
+        self.assertEqual(marked.returncode, 0, marked.stderr)
+        self.assertIn("Now at John 4:1", marked.stdout)
+        
+        self.store_position(43, 3, 999)
+        marked = self.run_cli("mark-verse", "5")
+        self.assertEqual(marked.returncode, 0, marked.stderr)
+        self.assertIn("John 3:5", marked.stdout)
+    
+    def test_chapter_past_book_end(self):
+        self.store_position(43, 99, 1)  # John has 21 chapters
+        
+        for args in (("status",), ("next",), ("mark-chapter",), ("mark-verse", "5")):
+            result = self.run_cli(*args)
+            self.assertEqual(result.returncode, 1, args)
+            self.assertNotIn("Traceback", result.stderr)
+            self.assertTrue(result.stderr.strip(), args)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Parsing reading history imports
+
+Run from the repository root with:
+
+    python -m unittest discover tests
+"""
+
+import io
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import importer
+from reference import Reference
+
+def span(first: str, last: str, date_read: str):
+    """An expected reading: the ordinals of its first and last verse, and its date"""
+    return (Reference.parse(first).ordinal, Reference.parse(last).ordinal, date_read)
+
+class ReadReadingsTest(unittest.TestCase):
+    """read_readings on each format, with valid and invalid entries"""
+    
+    def read(self, text: str, format_type: str):
+        return importer.read_readings(io.StringIO(text), format_type)
+    
+    def test_csv_passages(self):
+        readings, errors = self.read(
+            "Passage,Date\n"
+            "John 3:16-18,2023-01-05\n"
+            "\n"
+            "Psalms 119,2023-01-06T07:30:00\n",
+            "csv"
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(readings, [
+            span("John 3:16", "John 3:18", "2023-01-05T00:00:00"),
+            span("Psalms 119:1", "Psalms 119:176", "2023-01-06T07:30:00"),
+        ])
+    
+    def test_csv_exporter_columns(self):
+        readings, errors = self.read(
+            "book,chapter,verse,date_read\n"
+            "John,3,16,2023-01-05\n"
+            "Jude,1,,2023-01-06\n",
+            "csv"
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(readings, [
+            span("John 3:16", "John 3:16", "2023-01-05T00:00:00"),
+            span("Jude 1:1", "Jude 1:25", "2023-01-06T00:00:00"),
+        ])
+    
+    def test_json_list(self):
+        readings, errors = self.read(
+            '[{"reference": "Genesis 50-Exodus 1", "date": "2023-02-01"},'
+            ' {"book": "John", "chapter": 3, "verse": 16, "date": "2023-02-02T21:00:00"}]',
+            "json"
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(readings, [
+            span("Genesis 50:1", "Exodus 1:22", "2023-02-01T00:00:00"),
+            span("John 3:16", "John 3:16", "2023-02-02T21:00:00"),
+        ])
+    
+    def test_json_must_be_a_list(self):
+        with self.assertRaises(ValueError):
+            self.read('{"passage": "John 3:16", "date": "2023-02-01"}', "json")
+    
+    def test_invalid_entries_are_reported_and_skipped(self):
+        readings, errors = self.read(
+            '{"passage": "John 3:16", "date": "2023-03-01"}\n'
+            "\n"
+            "not json\n"
+            '["John 3:16", "2023-03-01"]\n'
+            '{"passage": "John 3:99", "date": "2023-03-01"}\n'
+            '{"passage": "Nowhere 1", "date": "2023-03-01"}\n'
+            '{"passage": "John 3:18-16", "date": "2023-03-01"}\n'
+            '{"passage": "John 3:17", "date": "yesterday"}\n'
+            '{"passage": "John 3:17"}\n'
+            '{"date": "2023-03-01"}\n'
+            '{"passage": "John 3:17", "date": 20230301}\n',
+            "ndjson"
+        )
+        self.assertEqual(readings, [span("John 3:16", "John 3:16", "2023-03-01T00:00:00")])
+        self.assertEqual([error.split(":")[0] for error in errors],
+                         ["line 3", "line 4", "line 5", "line 6", "line 7", "line 8", "line 9", "line 10", "line 11"])
+    
+    def test_repeated_dates_are_parsed_once(self):
+        lines = "".join(f'{{"passage": "Psalms {chapter}", "date": "2023-04-01"}}\n' for chapter in range(1, 4))
+        readings, errors = self.read(lines, "ndjson")
+        self.assertEqual(errors, [])
+        self.assertEqual({date_read for _, _, date_read in readings}, {"2023-04-01T00:00:00"})
+
+class DetectFormatTest(unittest.TestCase):
+    """Formats implied by file names"""
+    
+    def test_extensions(self):
+        self.assertEqual(importer.detect_format("log.CSV"), "csv")
+        self.assertEqual(importer.detect_format("log.json.gz"), "json")
+        self.assertEqual(importer.detect_format("log.jsonl"), "ndjson")
+        self.assertIsNone(importer.detect_format("log.txt"))
+        self.assertIsNone(importer.detect_format(importer.STDIN))
+
+if __name__ == "__main__":
+    unittest.main()
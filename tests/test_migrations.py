@@ -0,0 +1,180 @@
+"""
+Upgrading a database made before schema versions existed
+
+Run from the repository root with:
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import canon
+import db
+import migrations
+import tracker
+from models import BIBLE_BOOKS
+from reference import passage_ordinals
+
+# The tables as the first release created them, at user_version 0; kept
+# as written then, like the migrations themselves
+BASELINE_SCHEMA = """
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    total_chapters INTEGER NOT NULL,
+    book_order INTEGER NOT NULL
+);
+CREATE TABLE chapters (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL,
+    chapter_number INTEGER NOT NULL,
+    total_verses INTEGER NOT NULL,
+    FOREIGN KEY (book_id) REFERENCES books (id)
+);
+CREATE TABLE reading_progress (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL,
+    chapter_number INTEGER NOT NULL,
+    verse_number INTEGER NOT NULL,
+    timestamp DATETIME NOT NULL,
+    FOREIGN KEY (book_id) REFERENCES books (id)
+);
+CREATE TABLE reading_history (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL,
+    chapter_number INTEGER NOT NULL,
+    verse_number INTEGER NOT NULL,
+    date_read DATETIME NOT NULL,
+    FOREIGN KEY (book_id) REFERENCES books (id)
+);
+CREATE TABLE verses (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL,
+    chapter_number INTEGER NOT NULL,
+    verse_number INTEGER NOT NULL,
+    verse_text TEXT NOT NULL,
+    FOREIGN KEY (book_id) REFERENCES books (id),
+    UNIQUE(book_id, chapter_number, verse_number)
+);
+"""
+
+class BaselineUpgradeTest(unittest.TestCase):
+    """A version 0 database with reading history, upgraded by init_db"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="bible-migration-test-")
+        self.path = os.path.join(self.workdir, "bible_tracker.db")
+        
+        conn = sqlite3.connect(self.path)
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany(
+            "INSERT INTO books (id, name, total_chapters, book_order) VALUES (?, ?, ?, ?)",
+            [(book["id"], book["name"], book["chapters"], book["id"]) for book in BIBLE_BOOKS]
+        )
+        # All of John 3 (36 verses) and Genesis 1:1-5, read on two days
+        history = [(43, 3, verse, f"2024-05-01T08:{verse:02d}:00") for verse in range(1, 37)]
+        history += [(1, 1, verse, f"2024-05-02T08:{verse:02d}:00") for verse in range(1, 6)]
+        # A verse read twice counts once
+        history.append((1, 1, 5, "2024-05-02T09:00:00"))
+        conn.executemany(
+            "INSERT INTO reading_history (book_id, chapter_number, verse_number, date_read) VALUES (?, ?, ?, ?)",
+            history
+        )
+        conn.executemany(
+            "INSERT INTO reading_progress (book_id, chapter_number, verse_number, timestamp) VALUES (?, ?, ?, ?)",
+            [(1, 1, 1, "2024-04-30T08:00:00"), (43, 4, 1, "2024-05-01T08:36:00.000001"),
+             (1, 1, 6, "2024-05-02T09:00:00.000001")]
+        )
+        conn.commit()
+        conn.close()
+        
+        db.close_connection()
+        db.DB_PATH = self.path
+    
+    def tearDown(self):
+        db.close_connection()
+        db.DB_PATH = "bible_tracker.db"
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_upgrade_keeps_progress(self):
+        db.init_db()
+        
+        cursor = db.get_connection().cursor()
+        self.assertEqual(migrations.get_schema_version(cursor), migrations.SCHEMA_VERSION)
+        
+        self.assertEqual(tracker.get_current_position(), ("Genesis", 1, 6))
+        self.assertEqual([name for _, name in db.get_profiles()], [db.DEFAULT_PROFILE])
+        
+        john = tracker.get_book_chapters("John")
+        self.assertTrue(john[3])
+        self.assertEqual([chapter for chapter, done in john.items() if done], [3])
+        self.assertEqual(db.get_completed_chapters("Genesis"), [])
+        
+        self.assertEqual(db.get_coverage().count(), 41)
+        self.assertEqual(tracker.get_reading_statistics()["total_verses"], 42)
+    
+    def test_upgrade_is_repeatable(self):
+        db.init_db()
+        db.close_connection()
+        # A second start finds the schema current and changes nothing
+        db.init_db()
+        
+        self.assertEqual(tracker.get_current_position(), ("Genesis", 1, 6))
+        self.assertEqual(db.get_coverage().count(), 41)
+
+class CanonCountsTest(unittest.TestCase):
+    """A version 8 database whose books and chapters tables disagree with canon"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="bible-migration-test-")
+        db.close_connection()
+        db.DB_PATH = os.path.join(self.workdir, "bible_tracker.db")
+        db.init_db()
+        
+        with db.transaction() as cursor:
+            # Counts seeded by an older release: John 3 with 40 verses, Jude
+            # with two chapters, a duplicate and an extra chapter of John
+            cursor.execute("UPDATE chapters SET total_verses = 40 WHERE book_id = 43 AND chapter_number = 3")
+            cursor.execute("UPDATE books SET total_chapters = 2 WHERE id = 65")
+            cursor.executemany(
+                "INSERT INTO chapters (book_id, chapter_number, total_verses) VALUES (?, ?, ?)",
+                [(43, 3, 40), (43, 22, 30)]
+            )
+            cursor.execute("PRAGMA user_version = 8")
+        db.import_readings([(*passage_ordinals("John 3"), "2024-05-01T08:00:00"),
+                            (*passage_ordinals("Jude 1"), "2024-05-02T08:00:00")])
+        db.close_connection()
+    
+    def tearDown(self):
+        db.close_connection()
+        db.DB_PATH = "bible_tracker.db"
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_counts_follow_canon(self):
+        self.assertEqual(db.get_completed_chapters("John"), [])
+        db.close_connection()
+        
+        db.init_db()
+        
+        cursor = db.get_connection().cursor()
+        self.assertEqual(migrations.get_schema_version(cursor), migrations.SCHEMA_VERSION)
+        cursor.execute("SELECT book_id, chapter_number, total_verses FROM chapters ORDER BY book_id, chapter_number")
+        self.assertEqual(cursor.fetchall(), [
+            (book_id, chapter, counts[chapter])
+            for book_id, counts in sorted(canon.VERSE_COUNTS.items())
+            for chapter in range(1, len(counts))
+        ])
+        
+        self.assertEqual(db.get_completed_chapters("John"), [3])
+        self.assertEqual(db.get_books_read(), ["Jude"])
+
+if __name__ == "__main__":
+    unittest.main()
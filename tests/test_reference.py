@@ -0,0 +1,101 @@
+"""
+Verse references and passage parsing
+
+Run from the repository root with:
+
+    python -m unittest discover tests
+"""
+
+import os
+import pickle
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import canon
+from reference import Reference, parse_passage, passage_ordinals
+
+# Genesis has 1533 verses, so Exodus 1:1 is ordinal 1533
+EXODUS_START = 1533
+
+class ReferenceTest(unittest.TestCase):
+    """Building, stepping and comparing references"""
+    
+    def test_ends_of_the_canon(self):
+        first = Reference.from_position("Genesis", 1, 1)
+        last = Reference.parse("Revelation 22:21")
+        self.assertEqual(first.ordinal, 0)
+        self.assertEqual(last.ordinal, canon.TOTAL_VERSES - 1)
+        self.assertIsNone(first.previous())
+        self.assertIsNone(last.next())
+    
+    def test_steps_across_chapters_and_books(self):
+        self.assertEqual(str(Reference.parse("John 3:36").next()), "John 4:1")
+        self.assertEqual(str(Reference.parse("Genesis 50:26").next()), "Exodus 1:1")
+        self.assertEqual(Reference.parse("Exodus 1:1").ordinal, EXODUS_START)
+        self.assertEqual(str(Reference.parse("Exodus 1:1").previous()), "Genesis 50:26")
+    
+    def test_arithmetic(self):
+        start = Reference.parse("John 3:16")
+        self.assertEqual(str(start + 3), "John 3:19")
+        self.assertEqual(str(start - 15), "John 3:1")
+        self.assertEqual(Reference.parse("John 4:1") - start, 21)
+        self.assertEqual(start.distance(Reference.parse("John 3:18")), 2)
+        self.assertEqual([str(reference) for reference in start.range(start + 2)],
+                         ["John 3:16", "John 3:17", "John 3:18"])
+        self.assertEqual(str(start.chapter_start()), "John 3:1")
+        self.assertEqual(str(start.chapter_end()), "John 3:36")
+    
+    def test_value_semantics(self):
+        reference = Reference.parse("john 3:16")
+        self.assertEqual(reference, Reference.from_position(43, 3, 16))
+        self.assertEqual(len({reference, Reference.parse("John 3:16")}), 1)
+        self.assertLess(reference, reference + 1)
+        self.assertEqual(pickle.loads(pickle.dumps(reference)), reference)
+        self.assertEqual(reference.to_tuple(), ("John", 3, 16))
+        with self.assertRaises(AttributeError):
+            reference.ordinal = 0
+    
+    def test_chapter_only_means_its_first_verse(self):
+        self.assertEqual(str(Reference.parse("Psalms 23")), "Psalms 23:1")
+    
+    def test_invalid_references(self):
+        for text in ("John 3:37", "John 22:1", "Nowhere 1:1", "John", ""):
+            with self.assertRaises(ValueError, msg=text):
+                Reference.parse(text)
+        for ordinal in (-1, canon.TOTAL_VERSES):
+            with self.assertRaises(ValueError):
+                Reference(ordinal)
+        with self.assertRaises(ValueError):
+            Reference.parse("Revelation 22:21") + 1
+
+class PassageTest(unittest.TestCase):
+    """Passages in every accepted form, as ordinals and as references"""
+    
+    def assertPassage(self, text, first, last):
+        start, end = parse_passage(text)
+        self.assertEqual((str(start), str(end)), (first, last))
+        self.assertEqual(passage_ordinals(text), (start.ordinal, end.ordinal))
+    
+    def test_forms(self):
+        self.assertPassage("John 3:16", "John 3:16", "John 3:16")
+        self.assertPassage("John 3", "John 3:1", "John 3:36")
+        self.assertPassage("John 3:16-18", "John 3:16", "John 3:18")
+        self.assertPassage("John 3-5", "John 3:1", "John 5:47")
+        self.assertPassage("John 3:16-4:2", "John 3:16", "John 4:2")
+        self.assertPassage("Genesis 50-Exodus 2", "Genesis 50:1", "Exodus 2:25")
+        self.assertPassage("Genesis 50:26 - Exodus 1:1", "Genesis 50:26", "Exodus 1:1")
+    
+    def test_dashes_and_case(self):
+        self.assertPassage("john 3:16–18", "John 3:16", "John 3:18")
+        self.assertPassage("1 john 2 — 3", "1 John 2:1", "1 John 3:24")
+    
+    def test_invalid_passages(self):
+        for text in ("John 3:18-16", "Exodus 1-Genesis 50", "John 3:16-99", "Nowhere 1", "John 3:16-Nowhere 2", ""):
+            with self.assertRaises(ValueError, msg=text):
+                passage_ordinals(text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Startup time of the status command, against the budget the benchmarks enforce
+
+Run from the repository root with:
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import db
+from benchmarks import run, synthetic
+
+# Modules the status command has no use for, each imported only by the
+# commands that need it
+DEFERRED_MODULES = ("search", "verse_index", "exporter", "importer", "ui", "rich")
+
+class StatusStartupTest(unittest.TestCase):
+    """main.py status in a new process, on a database with a synthetic history"""
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="bible-startup-test-")
+        db.close_connection()
+        synthetic.add_history(os.path.join(self.workdir, "bible_tracker.db"), run.DEFAULT_ROWS[0])
+    
+    def tearDown(self):
+        db.close_connection()
+        db.DB_PATH = "bible_tracker.db"
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def run_status(self, *options):
+        # main.py opens bible_tracker.db in the working directory
+        return subprocess.run([sys.executable, *options, os.path.join(REPO_ROOT, "main.py"), "status"],
+                              cwd=self.workdir, capture_output=True, text=True, check=True)
+    
+    def test_within_budget(self):
+        # The first run compiles bytecode and warms the page cache
+        self.run_status()
+        
+        timings = []
+        for _ in range(run.DEFAULT_REPEAT):
+            start = time.perf_counter()
+            self.run_status()
+            timings.append((time.perf_counter() - start) * 1000)
+        
+        budget = run.STARTUP_BUDGETS_MS["startup.cli_status"]
+        median = statistics.median(timings)
+        self.assertLessEqual(median, budget, f"status took {median:.1f} ms, the budget is {budget} ms")
+    
+    def test_deferred_modules_not_imported(self):
+        # -X importtime lists every module imported, one per line of stderr
+        imported = {line.rsplit("|", 1)[-1].strip()
+                    for line in self.run_status("-X", "importtime").stderr.splitlines()
+                    if line.startswith("import time:")}
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, imported)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Bounded cache for Bible text
+
+Recently read verses and chapters are kept in memory instead of being
+queried again. The tracker empties the caches when the corpus revision
+changes, e.g. after a rebuild or a new pack.
+"""
+
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe cache that keeps the most recently used entries"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Get a cached value and mark it as recently used"""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._entries[key]
+    
+    def peek(self, key, default=None):
+        """Get a cached value without counting it as a use"""
+        with self._lock:
+            return self._entries.get(key, default)
+    
+    def put(self, key, value):
+        """Add a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> dict:
+        """Get hit/miss counts and the current size"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxsize": self.maxsize}
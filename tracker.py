@@ -4,96 +4,524 @@ Reading progress tracking functionality
 
 import datetime
 import math
-from typing import Tuple, Dict, List
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Tuple, Dict, List, Mapping, NamedTuple, Optional, Union
+import canon
 import db
+from reference import Reference
+from textcache import LRUCache
 
-def get_current_position() -> Tuple[str, int, int]:
+# Number of chapters and single verses kept in the text caches
+CHAPTER_CACHE_SIZE = 64
+VERSE_CACHE_SIZE = 512
+
+_chapter_cache = LRUCache(CHAPTER_CACHE_SIZE)
+_verse_cache = LRUCache(VERSE_CACHE_SIZE)
+
+# The database and corpus revision the cached text belongs to
+_text_cache_key = None
+
+# Per thread: the data version at which the text caches were last checked
+# against the corpus (text_version), and when and at which data version the
+# profile ids were last checked (profiles_checked_at, profiles_version).
+# Data versions come from each thread's own connection, so they can only be
+# compared within a thread
+_checked = threading.local()
+
+# Single background thread that loads chapters ahead of the reader
+_prefetcher = None
+
+# Profile used by functions not given one, from BIBLE_TRACKER_PROFILE or
+# use_profile() (None: the default profile)
+_current_profile = os.environ.get("BIBLE_TRACKER_PROFILE") or None
+
+# Profile ids already looked up, by database and name; dropped when the
+# data version changes, since another process may delete a profile
+_profile_ids = {}
+
+# Seconds between checks that the profile ids are still current
+PROFILE_CHECK_INTERVAL = 1.0
+
+# A position argument: a Reference, or a book name followed by chapter/verse
+BookOrReference = Union[str, Reference]
+
+class DashboardSnapshot(NamedTuple):
+    """Immutable view of everything the dashboard displays"""
+    book: str
+    chapter: int
+    verse: int
+    verse_text: str
+    next_position: Tuple[str, int, int]
+    percentages: Mapping[str, float]
+    estimates: Mapping[str, int]
+    chapters: Mapping[int, bool]
+    completed_books: Tuple[str, ...]
+
+def _unpack(book: BookOrReference, chapter=None, verse=None) -> Tuple[str, int, int]:
+    """Turn a Reference or book/chapter/verse arguments into a position tuple"""
+    if isinstance(book, Reference):
+        return book.to_tuple()
+    return (book, chapter, verse)
+
+def _user_id(profile: str = None) -> int:
+    """
+    Get the id of a profile, or of the current profile when none is given.
+    
+    Raises:
+        ValueError: If there is no profile with that name
+    """
+    name = profile or _current_profile
+    if name is None:
+        return db.DEFAULT_USER_ID
+    
+    # Reading the data version costs a query, so it is read at most once
+    # per PROFILE_CHECK_INTERVAL
+    now = time.monotonic()
+    checked_at = getattr(_checked, "profiles_checked_at", None)
+    if checked_at is None or now - checked_at >= PROFILE_CHECK_INTERVAL:
+        version = (db.DB_PATH, db.get_data_version())
+        if version != getattr(_checked, "profiles_version", None):
+            _profile_ids.clear()
+            _checked.profiles_version = version
+        _checked.profiles_checked_at = now
+    
+    key = (db.DB_PATH, name.strip())
+    user_id = _profile_ids.get(key)
+    if user_id is None:
+        user_id = db.get_user_id(name)
+        if user_id is None:
+            raise ValueError(f"No profile named '{name}'")
+        _profile_ids[key] = user_id
+    return user_id
+
+def get_profiles() -> List[str]:
+    """Get the names of all profiles, oldest first"""
+    return [name for _, name in db.get_profiles()]
+
+def get_current_profile() -> str:
+    """Get the name of the profile used when no profile is given"""
+    return _current_profile or db.DEFAULT_PROFILE
+
+def profile_selected() -> bool:
+    """Whether a profile was chosen with use_profile() or BIBLE_TRACKER_PROFILE"""
+    return _current_profile is not None
+
+def use_profile(profile: Optional[str]):
+    """
+    Make a profile the one used when no profile is given, or go back to
+    the default profile when profile is None.
+    
+    Raises:
+        ValueError: If there is no profile with that name
+    """
+    global _current_profile
+    
+    if profile is None:
+        _current_profile = None
+        return
+    
+    user_id = _user_id(profile)
+    _current_profile = next(name for id_, name in db.get_profiles() if id_ == user_id)
+
+def create_profile(profile: str) -> bool:
+    """Add a profile that starts reading at Genesis 1:1"""
+    return db.create_profile(profile) is not None
+
+def delete_profile(profile: str) -> bool:
+    """Delete a profile and its reading progress, switching back to the default profile if it was current"""
+    global _current_profile
+    
+    try:
+        user_id = _user_id(profile)
+        was_current = user_id == _user_id()
+    except ValueError as e:
+        print(f"Error deleting profile: {e}")
+        return False
+    
+    if not db.delete_profile(user_id):
+        return False
+    
+    _profile_ids.clear()
+    if was_current:
+        _current_profile = None
+    return True
+
+def get_current_position(profile: str = None) -> Tuple[str, int, int]:
     """Get the current reading position"""
-    return db.get_current_progress()
+    return db.get_current_progress(_user_id(profile))
 
-def get_next_verse() -> Tuple[str, int, int]:
+def get_current_reference(profile: str = None) -> Reference:
+    """
+    Get the current reading position as a Reference.
+    
+    A stored verse past the end of its chapter (which marks the chapter
+    complete) is read as the chapter's last verse.
+    """
+    book, chapter, verse = db.get_current_progress(_user_id(profile))
+    last_verse = canon.verse_count(canon.get_book_id(book), chapter)
+    return Reference.from_position(book, chapter, max(1, min(verse, last_verse)))
+
+def get_next_verse(profile: str = None) -> Tuple[str, int, int]:
     """Get the next verse to read"""
-    return db.get_next_verse()
+    return db.get_next_verse(_user_id(profile))
+
+def get_next_reference(profile: str = None) -> Optional[Reference]:
+    """Get the next verse to read as a Reference, or None at the end of the Bible"""
+    return get_current_reference(profile).next()
 
-def update_reading_position(book: str, chapter: int, verse: int, auto_advance=False) -> bool:
+def update_reading_position(book: BookOrReference, chapter: int = None, verse: int = None,
+                            auto_advance=False, profile: str = None) -> bool:
     """Update the current reading position"""
-    return db.update_progress(book, chapter, verse, auto_advance)
+    book, chapter, verse = _unpack(book, chapter, verse)
+    return db.update_progress(book, chapter, verse, auto_advance, _user_id(profile))
 
-def mark_chapter_complete(book: str, chapter: int) -> bool:
+def mark_chapter_complete(book: BookOrReference, chapter: int = None, profile: str = None) -> bool:
     """Mark a chapter as complete and advance to the next chapter"""
+    book, chapter, _ = _unpack(book, chapter)
+    
     # Get the total verses in this chapter
-    book_id = db.get_book_id(book)
+    book_id = canon.get_book_id(book)
     if not book_id:
         return False
     
-    total_verses = db.get_total_verses(book_id, chapter)
+    total_verses = canon.verse_count(book_id, chapter)
     
     # Mark as complete and auto-advance
-    return db.update_progress(book, chapter, total_verses, auto_advance=True)
+    return db.update_progress(book, chapter, total_verses, auto_advance=True, user_id=_user_id(profile))
+
+def mark_chapters_read(book: str, first_chapter: int, last_chapter: int = None, profile: str = None) -> bool:
+    """Record a chapter or range of chapters as read without moving the position"""
+    if last_chapter is None:
+        last_chapter = first_chapter
+    
+    return db.mark_chapters_read(book, first_chapter, last_chapter, _user_id(profile))
 
-def reset_progress() -> bool:
+def mark_book_read(book: str, profile: str = None) -> bool:
+    """Record every chapter of a book as read without moving the position"""
+    book_id = canon.get_book_id(book)
+    if not book_id:
+        return False
+    
+    return db.mark_chapters_read(book, 1, canon.chapter_count(book_id), _user_id(profile))
+
+def reset_progress(profile: str = None) -> bool:
     """Reset reading progress to Genesis 1:1"""
-    return db.reset_reading_progress()
+    return db.reset_reading_progress(_user_id(profile))
+
+def rebuild_completion_data() -> bool:
+    """Recompute completed chapters of every profile from the full reading history"""
+    return db.rebuild_chapter_completion()
+
+def get_search_engine() -> str:
+    """Get the search engine in use: "fts" (SQLite FTS5) or "index" (pure Python)"""
+    import search  # Deferred to keep startup fast
+    return search.get_engine()
+
+def search_verses(query: str, book: str = None, chapter: int = None, limit: int = None,
+                  offset: int = 0, highlight: Tuple[str, str] = None) -> list:
+    """
+    Search verse text, best matches first.
+    
+    Args:
+        query: Words, "phrases", prefix* terms and AND/OR/NOT operators
+        book: Only search this book
+        chapter: Only search this chapter of the book
+        limit: Maximum number of results; search.DEFAULT_LIMIT by default
+        offset: Number of best results to skip, for paging
+        highlight: Strings placed before and after each matched word in
+            snippets; search.DEFAULT_HIGHLIGHT by default
+    
+    Returns:
+        A list of search.SearchResult
+    """
+    import search  # Deferred to keep startup fast
+    
+    if limit is None:
+        limit = search.DEFAULT_LIMIT
+    if highlight is None:
+        highlight = search.DEFAULT_HIGHLIGHT
+    return search.search(query, book, chapter, limit, offset, highlight)
+
+def count_search_results(query: str, book: str = None, chapter: int = None) -> int:
+    """Count the verses matching a search"""
+    import search  # Deferred to keep startup fast
+    return search.count(query, book, chapter)
 
-def get_progress_percentages() -> Dict[str, float]:
+def rebuild_search_index() -> Optional[str]:
+    """
+    Rebuild the verse search index from the verses table.
+    
+    Returns:
+        The engine whose index was rebuilt ("fts" or "index"), or None on error
+    """
+    import search  # Deferred to keep startup fast
+    
+    try:
+        return search.rebuild_index()
+    except Exception as e:
+        print(f"Error rebuilding search index: {e}")
+        return None
+
+def get_progress_percentages(profile: str = None) -> Dict[str, float]:
     """Calculate completion percentages"""
-    return db.calculate_percentages()
+    return db.calculate_percentages(_user_id(profile))
+
+def get_coverage_percentages(book: str = None, chapter: int = None, profile: str = None) -> Dict[str, float]:
+    """
+    Get the share of distinct verses read, ignoring re-reads.
+    
+    Always includes the whole Bible; includes the book and chapter when
+    they are given.
+    """
+    bitmap = db.get_coverage(_user_id(profile))
+    percentages = {"bible": bitmap.bible_percentage()}
+    
+    book_id = canon.get_book_id(book) if book else None
+    if book_id:
+        percentages["book"] = bitmap.book_percentage(book_id)
+        if chapter:
+            percentages["chapter"] = bitmap.chapter_percentage(book_id, chapter)
+    
+    return percentages
+
+def _ordinal_span(book: str = None, chapter: int = None) -> Tuple[int, int]:
+    """Get the first and last verse ordinals of the Bible, a book or a chapter"""
+    book_id = canon.get_book_id(book) if book else None
+    if not book_id:
+        return (0, canon.TOTAL_VERSES - 1)
+    if chapter:
+        start = canon.ordinal(book_id, chapter, 1)
+        return (start, start + canon.verse_count(book_id, chapter) - 1)
+    
+    start = canon.BOOK_OFFSETS[book_id]
+    return (start, start + canon.book_verse_count(book_id) - 1)
+
+def get_unread_verses(book: str, chapter: int = None, profile: str = None) -> List[Reference]:
+    """Get the verses of a book or chapter that have never been read"""
+    start, end = _ordinal_span(book, chapter)
+    return [Reference(ordinal) for ordinal in db.get_coverage(_user_id(profile)).unread(start, end)]
+
+def get_first_unread(book: str = None, profile: str = None) -> Optional[Reference]:
+    """Get the first verse never read, in a book or the whole Bible"""
+    ordinal = db.get_coverage(_user_id(profile)).first_unread(*_ordinal_span(book))
+    return Reference(ordinal) if ordinal is not None else None
 
-def get_completion_estimates() -> Dict[str, int]:
+def get_completion_estimates(profile: str = None) -> Dict[str, int]:
     """Estimate days to complete current book and entire Bible"""
-    return db.estimate_completion_times()
+    return db.estimate_completion_times(_user_id(profile))
 
-def get_verse_content(book: str, chapter: int, verse: int) -> str:
+def _check_text_cache():
+    """Drop cached text if the database or its verse text has changed"""
+    global _text_cache_key
+    
+    # The corpus can only have changed if the data version has
+    version = (db.DB_PATH, db.get_data_version())
+    if version == getattr(_checked, "text_version", None):
+        return
+    _checked.text_version = version
+    
+    key = (db.DB_PATH, db.get_corpus_state())
+    if key != _text_cache_key:
+        _chapter_cache.clear()
+        _verse_cache.clear()
+        _text_cache_key = key
+
+def _chapter_verses(book_id: int, chapter: int) -> Tuple[Tuple[int, str], ...]:
+    """Get a chapter's verses through the chapter cache"""
+    verses = _chapter_cache.get((book_id, chapter))
+    if verses is None:
+        verses = tuple(db.get_chapter_verses(book_id, chapter))
+        _chapter_cache.put((book_id, chapter), verses)
+    return verses
+
+def get_verse_content(book: BookOrReference, chapter: int = None, verse: int = None) -> str:
     """Get the content of a specific verse"""
-    book_id = db.get_book_id(book)
+    book, chapter, verse = _unpack(book, chapter, verse)
+    book_id = canon.get_book_id(book)
     if not book_id:
         return "Book not found."
     
-    return db.get_verse_text(book_id, chapter, verse)
+    _check_text_cache()
+    
+    # A cached chapter already holds the verse
+    verses = _chapter_cache.peek((book_id, chapter))
+    if verses and 1 <= verse <= len(verses) and verses[verse - 1][0] == verse:
+        return verses[verse - 1][1]
+    
+    text = _verse_cache.get((book_id, chapter, verse))
+    if text is None:
+        text = db.get_verse_text(book_id, chapter, verse)
+        _verse_cache.put((book_id, chapter, verse), text)
+    return text
 
-def get_book_chapters(book_name: str) -> Dict[int, bool]:
+def get_book_chapters(book_name: str, profile: str = None) -> Dict[int, bool]:
     """Get all chapters for a book with completion status"""
-    completed_chapters = db.get_completed_chapters(book_name)
-    book_id = db.get_book_id(book_name)
-    
+    book_id = canon.get_book_id(book_name)
     if not book_id:
         return {}
     
-    # Get total chapters
-    for book in db.BIBLE_BOOKS:
-        if book["id"] == book_id:
-            total_chapters = book["chapters"]
-            break
-    else:
-        return {}
+    completed_chapters = set(db.get_completed_chapters(book_name, _user_id(profile)))
     
     # Create dictionary with completion status
     chapters = {}
-    for chapter_num in range(1, total_chapters + 1):
+    for chapter_num in range(1, canon.chapter_count(book_id) + 1):
         chapters[chapter_num] = chapter_num in completed_chapters
     
     return chapters
 
-def get_completed_books() -> List[str]:
+def find_book(query: str) -> str:
+    """Match user input to a book name, exactly or by partial name"""
+    return canon.find_book(query)
+
+def get_chapter_count(book: str) -> int:
+    """Get the number of chapters in a book"""
+    return canon.chapter_count(canon.get_book_id(book))
+
+def get_verse_count(book: str, chapter: int) -> int:
+    """Get the number of verses in a chapter"""
+    return canon.verse_count(canon.get_book_id(book), chapter)
+
+def get_completed_books(profile: str = None) -> List[str]:
     """Get a list of completed books"""
-    return db.get_books_read()
+    return db.get_books_read(_user_id(profile))
 
-def get_reading_statistics() -> Dict:
+def get_reading_statistics(profile: str = None) -> Dict:
     """Get reading statistics"""
-    return db.get_reading_stats()
+    return db.get_reading_stats(_user_id(profile))
 
 def get_all_books() -> List[str]:
     """Get all books in the Bible"""
-    return db.get_all_books()
+    return list(canon.BOOK_NAMES)
 
-def get_chapter_content(book: str, chapter: int) -> List[Tuple[int, str]]:
+def get_chapter_content(book: BookOrReference, chapter: int = None) -> List[Tuple[int, str]]:
     """Get all verses for a specific chapter"""
-    book_id = db.get_book_id(book)
+    book, chapter, _ = _unpack(book, chapter)
+    book_id = canon.get_book_id(book)
     if not book_id:
         return []
     
-    return db.get_chapter_verses(book_id, chapter)
+    _check_text_cache()
+    return list(_chapter_verses(book_id, chapter))
 
-def export_bible(output_file="bible_export.json", format_type="nested", book_filter=None) -> bool:
-    """Export Bible text to JSON"""
-    return db.export_to_json(output_file, format_type, book_filter)
+def _prefetch_chapter(book_id: int, chapter: int):
+    """Load a chapter into the cache on the prefetch thread"""
+    try:
+        _chapter_verses(book_id, chapter)
+    except Exception:
+        # The reader will fetch (and report) it directly if needed
+        pass
+
+def prefetch_adjacent_chapters(book: BookOrReference, chapter: int = None):
+    """
+    Start loading the chapters before and after a chapter in the background,
+    so moving to either one is served from the cache.
+    """
+    global _prefetcher
+    
+    book, chapter, _ = _unpack(book, chapter)
+    book_id = canon.get_book_id(book)
+    if not book_id:
+        return
+    
+    _check_text_cache()
+    for adjacent in (chapter + 1, chapter - 1):
+        if 1 <= adjacent <= canon.chapter_count(book_id) and (book_id, adjacent) not in _chapter_cache:
+            if _prefetcher is None:
+                from concurrent.futures import ThreadPoolExecutor  # Deferred to keep startup fast
+                _prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+            _prefetcher.submit(_prefetch_chapter, book_id, adjacent)
+
+def build_corpus_pack() -> Optional[int]:
+    """
+    Pack the verse text into a memory-mapped file that verse reads use
+    instead of the database while it is current.
+    
+    Returns:
+        Number of verses packed, or None on error
+    """
+    return db.build_pack()
+
+def get_text_cache_stats() -> Dict[str, dict]:
+    """Get hit/miss counts and sizes of the chapter and verse caches"""
+    return {"chapters": _chapter_cache.stats(), "verses": _verse_cache.stats()}
+
+def get_dashboard_snapshot(profile: str = None) -> DashboardSnapshot:
+    """Read all dashboard data in a single consistent pass"""
+    data = db.get_dashboard_data(include_verse_text=False, user_id=_user_id(profile))
+    book, chapter, verse = data["position"]
+    
+    return DashboardSnapshot(
+        book=book,
+        chapter=chapter,
+        verse=verse,
+        verse_text=get_verse_content(book, chapter, verse),
+        next_position=data["next_position"],
+        percentages=MappingProxyType(data["percentages"]),
+        estimates=MappingProxyType(data["estimates"]),
+        chapters=MappingProxyType(data["chapters"]),
+        completed_books=tuple(data["completed_books"])
+    )
+
+def get_connection_count() -> int:
+    """Get the number of database connections opened so far"""
+    return db.get_connection_count()
+
+def get_data_version() -> Tuple[int, int, int]:
+    """Get a value that changes whenever the database may have changed, for caching reads"""
+    return db.get_data_version()
+
+def export_filename(base, format_type="nested", compress=False) -> str:
+    """Add the export format's extension (and .gz) to a file name"""
+    import exporter  # Deferred to keep startup fast
+    return exporter.output_filename(base, format_type, compress)
+
+def export_bible(output_file="bible_export.json", format_type="nested", book_filter=None,
+                 progress=None, compress=None) -> bool:
+    """
+    Export Bible text to a file, or to stdout when output_file is "-".
+    
+    Args:
+        format_type: "nested", "flat", "ndjson" or "csv"
+        progress: Optional callback receiving (verses_written, total_verses)
+        compress: Gzip the output; by default only when output_file ends in .gz
+    """
+    import exporter  # Deferred to keep startup fast
+    
+    try:
+        exporter.export(output_file, format_type, book_filter, compress, progress)
+        return True
+    except Exception as e:
+        print(f"Error exporting Bible data: {e}")
+        return False
+
+def export_bible_by_book(output_dir, format_type="nested", compress=False, workers=None,
+                         progress=None) -> bool:
+    """Export each book to its own file in output_dir using parallel worker processes"""
+    import exporter  # Deferred to keep startup fast
+    
+    try:
+        exporter.export_by_book(output_dir, format_type, compress, workers, progress)
+        return True
+    except Exception as e:
+        print(f"Error exporting Bible data: {e}")
+        return False
+
+def import_reading_history(input_file, format_type=None, strict=False, profile: str = None):
+    """
+    Add readings from a CSV, JSON or NDJSON file (or stdin when input_file
+    is "-") to the reading history in one transaction.
+    
+    Returns:
+        An importer.ImportResult with the passages and verses imported and
+        any skipped entries, or None on error
+    """
+    import importer  # Deferred to keep startup fast
+    
+    try:
+        return importer.import_history(input_file, format_type, strict, _user_id(profile))
+    except Exception as e:
+        print(f"Error importing reading history: {e}")
+        return None
@@ -3,47 +3,94 @@ User interface functions for the Bible tracker
 """
 
 import datetime
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
+from rich.markup import escape
+from rich.segment import Segments
 from rich import box
+import querytrace
 import tracker
 
 # Initialize rich console for pretty display
 console = Console()
 
+# Database connections opened by the most recent dashboard render
+last_render_connections = 0
+
+# Call sites listed in the query summary shown while tracing
+TRACE_SUMMARY_SITES = 8
+
+# The dashboard data as (data version and profile it was read at, snapshot)
+_dashboard_snapshot = (None, None)
+
+# Rendered dashboard sections: name -> ((console width, inputs), segments)
+_dashboard_sections = {}
+
 def clear_screen():
     """Clear the console screen"""
     console.clear()
 
-def display_dashboard():
-    """Display the main dashboard."""
-    clear_screen()
-    console.print(Panel.fit("[bold blue]Bible Study Tracker v2.0[/bold blue]", box=box.DOUBLE))    
-    # Get current progress
-    book, chapter, verse = tracker.get_current_position()
-    console.print(f"\n[bold green]Current Position:[/bold green] {book} {chapter}:{verse}")
+def reset_dashboard_cache():
+    """Forget the cached dashboard, so the next render reads and draws everything again"""
+    global _dashboard_snapshot
+    _dashboard_snapshot = (None, None)
+    _dashboard_sections.clear()
+
+def _current_snapshot():
+    """Get the dashboard data, reading it again only when the database or profile changed"""
+    global _dashboard_snapshot
+    key = (tracker.get_data_version(), tracker.get_current_profile())
+    cached_key, snapshot = _dashboard_snapshot
+    if cached_key != key:
+        snapshot = tracker.get_dashboard_snapshot()
+        _dashboard_snapshot = (key, snapshot)
+    return snapshot
+
+def _print_section(name, inputs, build):
+    """
+    Print a dashboard section, rendering it again only when its inputs or
+    the console width changed since it was last drawn.
+    
+    Args:
+        name: Section name, the key of its cache entry
+        inputs: Everything the section shows, compared with ==
+        build: Returns the section's markup strings and renderables
+    """
+    key = (console.width, inputs)
+    cached = _dashboard_sections.get(name)
+    if cached is None or cached[0] != key:
+        renderables = [console.render_str(item) if isinstance(item, str) else item for item in build()]
+        cached = (key, Segments(list(console.render(Group(*renderables)))))
+        _dashboard_sections[name] = cached
+    console.print(cached[1])
+
+def _position_section(profile, snapshot):
+    """Profile, current verse and next verse"""
+    book, chapter, verse = snapshot.book, snapshot.chapter, snapshot.verse
+    lines = [
+        f"\n[bold green]Profile:[/bold green] {escape(profile)}",
+        f"[bold green]Current Position:[/bold green] {book} {chapter}:{verse}",
+    ]
     
     # Display verse content
-    console.print("\n[bold yellow]Current Verse:[/bold yellow]")
-    verse_text = tracker.get_verse_content(book, chapter, verse)
-    console.print(f"{book} {chapter}:{verse} - {verse_text}")
+    lines.append("\n[bold yellow]Current Verse:[/bold yellow]")
+    lines.append(f"{book} {chapter}:{verse} - {snapshot.verse_text}")
     
     # Display next verse
-    next_book, next_chapter, next_verse = tracker.get_next_verse()
-    console.print(f"\n[bold cyan]Next Verse:[/bold cyan] {next_book} {next_chapter}:{next_verse}")
+    next_book, next_chapter, next_verse = snapshot.next_position
+    lines.append(f"\n[bold cyan]Next Verse:[/bold cyan] {next_book} {next_chapter}:{next_verse}")
     
     # Generate JW.org link for compatibility
     formatted_book = next_book.lower().replace(' ', '-')
     if formatted_book[0].isdigit():
         formatted_book = formatted_book.replace(' ', '-', 1)
     jw_link = f"https://www.jw.org/en/library/bible/nwt/books/{formatted_book}/{next_chapter}/"
-    console.print(f"[link={jw_link}]Continue reading on JW.org[/link]")
-    
-    # Show completion percentages
-    percentages = tracker.get_progress_percentages()
-    console.print("\n[bold magenta]Completion Progress:[/bold magenta]")
-    
+    lines.append(f"[link={jw_link}]Continue reading on JW.org[/link]")
+    return lines
+
+def _progress_section(percentages):
+    """Completion progress bars"""
     # Create progress bars
     table = Table(show_header=True, header_style="bold")
     table.add_column("Metric")
@@ -80,62 +127,170 @@ def display_dashboard():
         f"[bold]{percentages['bible']:.1f}%[/bold]"
     )
     
-    console.print(table)
+    return ["\n[bold magenta]Completion Progress:[/bold magenta]", table]
+
+def _estimates_section(estimates):
+    """Estimated days to finish the book and the Bible"""
+    return [
+        "\n[bold green]Estimated Completion Times:[/bold green]",
+        f"Current Book: [bold]{estimates['book']}[/bold] days",
+        f"Entire Bible: [bold]{estimates['bible']}[/bold] days",
+    ]
+
+def _completed_books_section(completed_books):
+    """Table of completed books, four to a row"""
+    if not completed_books:
+        return []
     
-    # Display estimated completion times
-    estimates = tracker.get_completion_estimates()
-    console.print("\n[bold green]Estimated Completion Times:[/bold green]")
-    console.print(f"Current Book: [bold]{estimates['book']}[/bold] days")
-    console.print(f"Entire Bible: [bold]{estimates['bible']}[/bold] days")
+    # Create a table for completed books (4 books per row)
+    book_table = Table(show_header=False, box=box.SIMPLE)
     
-    # Display completed chapters for current book
-    display_chapter_grid(book)
+    # Create columns based on the number of books
+    cols = min(4, len(completed_books))
+    for _ in range(cols):
+        book_table.add_column("", justify="left")
     
-    # Display completed books
-    completed_books = tracker.get_completed_books()
-    if completed_books:
-        console.print("\n[bold blue]Completed Books:[/bold blue]")
-        
-        # Create a table for completed books (4 books per row)
-        book_table = Table(show_header=False, box=box.SIMPLE)
-        
-        # Create columns based on the number of books
-        cols = min(4, len(completed_books))
-        for _ in range(cols):
-            book_table.add_column("", justify="left")
-        
-        # Fill the table with books
-        rows = []
-        row = []
-        for i, book in enumerate(completed_books):
-            row.append(f"✓ {book}")
-            if (i + 1) % cols == 0:
-                rows.append(row)
-                row = []
-        
-        # Add any remaining books
-        if row:
-            while len(row) < cols:
-                row.append("")
+    # Fill the table with books
+    rows = []
+    row = []
+    for i, book in enumerate(completed_books):
+        row.append(f"✓ {book}")
+        if (i + 1) % cols == 0:
             rows.append(row)
-        
-        # Add rows to the table
-        for row in rows:
-            book_table.add_row(*row)
-        
-        console.print(book_table)
+            row = []
+    
+    # Add any remaining books
+    if row:
+        while len(row) < cols:
+            row.append("")
+        rows.append(row)
+    
+    # Add rows to the table
+    for row in rows:
+        book_table.add_row(*row)
+    
+    return ["\n[bold blue]Completed Books:[/bold blue]", book_table]
+
+def _commands_section():
+    """The command keys"""
+    return [
+        "\n[bold]Commands:[/bold]",
+        "  [cyan]u[/cyan] - Update reading progress",
+        "  [cyan]r[/cyan] - Go to a different book/chapter/verse",
+        "  [cyan]e[/cyan] - Export Bible",
+        "  [cyan]b[/cyan] - Read Bible books",
+        "  [cyan]f[/cyan] - Search the Bible",
+        "  [cyan]s[/cyan] - View statistics",
+        "  [cyan]p[/cyan] - Switch or create a profile",
+        "  [cyan]v[/cyan] - View version information",
+        "  [cyan]x[/cyan] - Reset reading progress",
+        "  [cyan]q[/cyan] - Quit",
+    ]
+
+def display_dashboard():
+    """
+    Display the main dashboard.
+    
+    The data is read again only when the database or profile changed since
+    the last render, and each section is drawn again only when what it
+    shows changed, so redrawing after a screen that wrote nothing is cheap.
+    """
+    global last_render_connections
+    connections_before = tracker.get_connection_count()
+    trace_start = querytrace.mark()
+    
+    clear_screen()
+    _print_section("header", (), lambda: [Panel.fit("[bold blue]Bible Study Tracker v2.0[/bold blue]", box=box.DOUBLE)])
+    snapshot = _current_snapshot()
+    profile = tracker.get_current_profile()
+    
+    _print_section(
+        "position",
+        (profile, snapshot.book, snapshot.chapter, snapshot.verse, snapshot.verse_text, snapshot.next_position),
+        lambda: _position_section(profile, snapshot)
+    )
+    _print_section("progress", dict(snapshot.percentages), lambda: _progress_section(snapshot.percentages))
+    _print_section("estimates", dict(snapshot.estimates), lambda: _estimates_section(snapshot.estimates))
+    
+    # Completed chapters of the current book
+    _print_section(
+        "chapters",
+        (snapshot.book, dict(snapshot.chapters)),
+        lambda: _chapter_grid_section(snapshot.book, snapshot.chapters)
+    )
+    _print_section("completed_books", snapshot.completed_books,
+                   lambda: _completed_books_section(snapshot.completed_books))
+    _print_section("commands", (), _commands_section)
+    
+    last_render_connections = tracker.get_connection_count() - connections_before
+    if querytrace.ENABLED:
+        display_query_summary(trace_start, last_render_connections)
+
+def display_query_summary(trace_start, connections_opened=None):
+    """Show the queries recorded since a trace mark, slowest call sites first"""
+    records = querytrace.records_since(trace_start)
+    total_ms = sum(record.duration for record in records) * 1000
+    summary = f"{len(records)} queries, {total_ms:.2f} ms, {sum(record.rows for record in records)} rows"
+    if connections_opened is not None:
+        summary += f", {connections_opened} connections opened"
+    console.print(f"\n[dim]Query trace: {summary}[/dim]")
+    
+    table = Table(box=box.SIMPLE, header_style="dim", style="dim")
+    table.add_column("Call site", style="dim")
+    table.add_column("Queries", justify="right", style="dim")
+    table.add_column("ms", justify="right", style="dim")
+    table.add_column("Rows", justify="right", style="dim")
+    for site in querytrace.summarize(records)[:TRACE_SUMMARY_SITES]:
+        table.add_row(escape(site["call_site"]), str(site["queries"]), f"{site['total_ms']:.2f}", str(site["rows"]))
+    console.print(table)
+
+def choose_profile():
+    """Switch to another profile, or create a new one."""
+    clear_screen()
+    console.print(Panel.fit("[bold blue]Profiles[/bold blue]", box=box.DOUBLE))
+    
+    current = tracker.get_current_profile()
+    profiles = tracker.get_profiles()
+    console.print()
+    for number, name in enumerate(profiles, 1):
+        marker = " [green](current)[/green]" if name.lower() == current.lower() else ""
+        console.print(f"  [cyan]{number}[/cyan] - {escape(name)}{marker}")
+    
+    choice = console.input("\n[bold]Enter profile number or name (a new name creates a profile, Enter to keep current):[/bold] ").strip()
+    if not choice:
+        return
     
-    # Show commands
-    console.print("\n[bold]Commands:[/bold]")
-    console.print("  [cyan]u[/cyan] - Update reading progress")
-    console.print("  [cyan]r[/cyan] - Go to a different book/chapter/verse")
-    console.print("  [cyan]e[/cyan] - Export Bible to JSON")
-    console.print("  [cyan]b[/cyan] - Read Bible books")
-    console.print("  [cyan]s[/cyan] - View statistics")
-    console.print("  [cyan]v[/cyan] - View version information")
-    console.print("  [cyan]x[/cyan] - Reset reading progress")
+    if choice.isdigit() and 1 <= int(choice) <= len(profiles):
+        name = profiles[int(choice) - 1]
+    else:
+        name = next((profile for profile in profiles if profile.lower() == choice.lower()), None)
+        if name is None:
+            confirm = console.input(f"[bold]Create profile '{escape(choice)}'? (y/n):[/bold] ").strip().lower()
+            if confirm not in ('y', 'yes'):
+                return
+            if not tracker.create_profile(choice):
+                console.print("\n[bold red]Error creating profile[/bold red]")
+                console.input("\nPress Enter to return to the dashboard...")
+                return
+            name = choice
+    
+    tracker.use_profile(name)
+    console.print(f"\n[bold green]✓ Now using profile {escape(tracker.get_current_profile())}[/bold green]")
+    console.input("\nPress Enter to return to the dashboard...")
 
-    console.print("  [cyan]q[/cyan] - Quit")
+def select_startup_profile():
+    """Check the profile chosen before startup, or ask for one when there are several."""
+    if tracker.profile_selected():
+        try:
+            tracker.use_profile(tracker.get_current_profile())
+            return
+        except ValueError as e:
+            console.print(f"[red]{escape(str(e))}[/red]")
+            tracker.use_profile(None)
+            console.input("Press Enter to continue...")
+    
+    if len(tracker.get_profiles()) > 1:
+        choose_profile()
 
 def display_version_info():
     """Display version information."""
@@ -154,15 +309,11 @@ def display_version_info():
     
     console.input("\nPress Enter to return to the dashboard...")
 
-def display_chapter_grid(book):
-    """Display a grid of chapters showing which ones are completed."""
-    console.print(f"\n[bold cyan]Chapter Completion in {book}:[/bold cyan]")
-    
-    # Get chapters with completion status
-    chapters = tracker.get_book_chapters(book)
+def _chapter_grid_section(book, chapters):
+    """Heading and grid of chapters, completed ones ticked"""
+    heading = f"\n[bold cyan]Chapter Completion in {book}:[/bold cyan]"
     if not chapters:
-        console.print("[yellow]No chapter data found for this book.[/yellow]")
-        return
+        return [heading, "[yellow]No chapter data found for this book.[/yellow]"]
     
     # Create a visual chapter grid
     chapter_grid = Table.grid(padding=1)
@@ -192,7 +343,15 @@ def display_chapter_grid(book):
     for row_data in rows:
         chapter_grid.add_row(*row_data)
     
-    console.print(chapter_grid)
+    return [heading, chapter_grid]
+
+def display_chapter_grid(book, chapters=None):
+    """Display a grid of chapters showing which ones are completed."""
+    # Get chapters with completion status
+    if chapters is None:
+        chapters = tracker.get_book_chapters(book)
+    for item in _chapter_grid_section(book, chapters):
+        console.print(item)
 
 def update_reading_progress():
     """Handle updating reading progress."""
@@ -302,30 +461,17 @@ def jump_to_position():
         new_book = current_book
     else:
         # Find closest match
-        match_found = False
-        for book in all_books:
-            if book.lower() == new_book.lower():
-                new_book = book
-                match_found = True
-                break
-        
-        if not match_found:
-            # Try partial match
-            matches = [book for book in all_books if new_book.lower() in book.lower()]
-            if matches:
-                new_book = matches[0]
-                console.print(f"[yellow]Using closest match: {new_book}[/yellow]")
-            else:
-                console.print(f"[red]Book '{new_book}' not found. Using current book.[/red]")
-                new_book = current_book
+        match = tracker.find_book(new_book)
+        if not match:
+            console.print(f"[red]Book '{new_book}' not found. Using current book.[/red]")
+            new_book = current_book
+        else:
+            if match.lower() != new_book.lower():
+                console.print(f"[yellow]Using closest match: {match}[/yellow]")
+            new_book = match
     
     # Get book info
-    import db  # Local import to avoid circular import
-    book_id = db.get_book_id(new_book)
-    for book in db.BIBLE_BOOKS:
-        if book["id"] == book_id:
-            total_chapters = book["chapters"]
-            break
+    total_chapters = tracker.get_chapter_count(new_book)
     
     console.print(f"[cyan]{new_book} has {total_chapters} chapters[/cyan]")
     
@@ -340,7 +486,7 @@ def jump_to_position():
         new_chapter = 1
     
     # Get verse count for this chapter
-    total_verses = db.get_total_verses(book_id, new_chapter)
+    total_verses = tracker.get_verse_count(new_book, new_chapter)
     
     console.print(f"[cyan]{new_book} {new_chapter} has {total_verses} verses[/cyan]")
     
@@ -364,30 +510,56 @@ def jump_to_position():
     # Wait for user to press Enter
     console.input("\nPress Enter to return to the dashboard...")
 
+def _choose_export_format():
+    """Ask for an export format and whether to gzip it"""
+    format_choice = console.input(
+        "\n[bold]Choose format ([n]ested JSON, [f]lat JSON, [l]ine-delimited JSON or [c]sv):[/bold] "
+    ).strip().lower()
+    if format_choice.startswith("n"):
+        format_type = "nested"
+    elif format_choice.startswith("l"):
+        format_type = "ndjson"
+    elif format_choice.startswith("c"):
+        format_type = "csv"
+    else:
+        format_type = "flat"
+    
+    compress = console.input("\n[bold]Compress with gzip? (y/n):[/bold] ").strip().lower() == "y"
+    return format_type, compress
+
+def _export_with_progress(export, *args) -> bool:
+    """Run an export function while showing a progress bar"""
+    from rich.progress import Progress  # Deferred to keep startup fast
+    
+    with Progress(console=console, transient=True) as progress:
+        task = progress.add_task("Exporting...", total=None)
+        
+        def report(written, total):
+            progress.update(task, completed=written, total=total)
+        
+        return export(*args, progress=report)
+
 def export_bible_menu():
-    """Menu for exporting Bible content to JSON."""
+    """Menu for exporting Bible content to JSON, NDJSON or CSV."""
     clear_screen()
-    console.print(Panel.fit("[bold blue]Export Bible to JSON[/bold blue]", box=box.SIMPLE))
+    console.print(Panel.fit("[bold blue]Export Bible[/bold blue]", box=box.SIMPLE))
     
     console.print("\n[bold]Export Options:[/bold]")
     console.print("1. Export all books")
     console.print("2. Export a specific book")
-    console.print("3. Cancel")
+    console.print("3. Export all books, one file per book")
+    console.print("4. Cancel")
     
-    choice = console.input("\n[bold]Choose an option (1-3):[/bold] ").strip()
+    choice = console.input("\n[bold]Choose an option (1-4):[/bold] ").strip()
     
     if choice == "1":
-        format_choice = console.input("\n[bold]Choose format ([n]ested or [f]lat):[/bold] ").strip().lower()
-        format_type = "nested" if format_choice.startswith("n") else "flat"
+        format_type, compress = _choose_export_format()
         
-        filename = console.input("\n[bold]Enter output filename (default: bible_export.json):[/bold] ").strip()
-        if not filename:
-            filename = "bible_export.json"
+        default = tracker.export_filename("bible_export", format_type, compress)
+        filename = console.input(f"\n[bold]Enter output filename (default: {default}):[/bold] ").strip()
+        filename = tracker.export_filename(filename, format_type, compress) if filename else default
         
-        if not filename.endswith(".json"):
-            filename += ".json"
-        
-        success = tracker.export_bible(filename, format_type)
+        success = _export_with_progress(tracker.export_bible, filename, format_type, None)
         if success:
             console.print(f"[bold green]✓ Bible data exported to {filename}[/bold green]")
         else:
@@ -397,42 +569,42 @@ def export_bible_menu():
         book_name = console.input("\n[bold]Enter the name of the book to export:[/bold] ").strip()
         
         # Find closest match
-        all_books = tracker.get_all_books()
-        match_found = False
-        for book in all_books:
-            if book.lower() == book_name.lower():
-                book_name = book
-                match_found = True
-                break
-        
-        if not match_found:
-            # Try partial match
-            matches = [book for book in all_books if book_name.lower() in book.lower()]
-            if matches:
-                book_name = matches[0]
-                console.print(f"[yellow]Using closest match: {book_name}[/yellow]")
-            else:
-                console.print(f"[red]Book '{book_name}' not found.[/red]")
-                console.input("\nPress Enter to return to the dashboard...")
-                return
+        match = tracker.find_book(book_name)
+        if not match:
+            console.print(f"[red]Book '{book_name}' not found.[/red]")
+            console.input("\nPress Enter to return to the dashboard...")
+            return
         
-        format_choice = console.input("\n[bold]Choose format ([n]ested or [f]lat):[/bold] ").strip().lower()
-        format_type = "nested" if format_choice.startswith("n") else "flat"
+        if match.lower() != book_name.lower():
+            console.print(f"[yellow]Using closest match: {match}[/yellow]")
+        book_name = match
         
-        filename = console.input(f"\n[bold]Enter output filename (default: {book_name.lower()}_export.json):[/bold] ").strip()
-        if not filename:
-            filename = f"{book_name.lower()}_export.json"
+        format_type, compress = _choose_export_format()
         
-        if not filename.endswith(".json"):
-            filename += ".json"
+        default = tracker.export_filename(f"{book_name.lower()}_export", format_type, compress)
+        filename = console.input(f"\n[bold]Enter output filename (default: {default}):[/bold] ").strip()
+        filename = tracker.export_filename(filename, format_type, compress) if filename else default
         
-        success = tracker.export_bible(filename, format_type, book_name)
+        success = _export_with_progress(tracker.export_bible, filename, format_type, book_name)
         if success:
             console.print(f"[bold green]✓ Book {book_name} exported to {filename}[/bold green]")
         else:
             console.print("[red]Error exporting book data.[/red]")
     
-    elif choice != "3":
+    elif choice == "3":
+        format_type, compress = _choose_export_format()
+        
+        directory = console.input("\n[bold]Enter output directory (default: bible_export):[/bold] ").strip()
+        if not directory:
+            directory = "bible_export"
+        
+        success = _export_with_progress(tracker.export_bible_by_book, directory, format_type, compress)
+        if success:
+            console.print(f"[bold green]✓ Bible data exported to {directory}/[/bold green]")
+        else:
+            console.print("[red]Error exporting Bible data.[/red]")
+    
+    elif choice != "4":
         console.print("[red]Invalid choice.[/red]")
     
     # Wait for user to press Enter
@@ -489,10 +661,7 @@ def read_bible_book():
                 selected_book = all_books[book_idx]
         except ValueError:
             # Try to match by name
-            for book in all_books:
-                if book_choice.lower() in book.lower():
-                    selected_book = book
-                    break
+            selected_book = tracker.find_book(book_choice)
         
         if not selected_book:
             console.print("[red]Invalid book selection.[/red]")
@@ -500,12 +669,7 @@ def read_bible_book():
             continue  # Go back to book selection
         
         # Get book info
-        import db  # Local import to avoid circular import
-        book_id = db.get_book_id(selected_book)
-        for book in db.BIBLE_BOOKS:
-            if book["id"] == book_id:
-                total_chapters = book["chapters"]
-                break
+        total_chapters = tracker.get_chapter_count(selected_book)
         
         # Select chapter
         console.print(f"\n[bold]{selected_book} has {total_chapters} chapters.[/bold]")
@@ -533,6 +697,9 @@ def read_bible_book():
         # Display the chapter
         chapter_loop = True
         while chapter_loop:
+            # Load the neighbouring chapters while this one is being read
+            tracker.prefetch_adjacent_chapters(selected_book, chapter)
+            
             clear_screen()
             console.print(Panel.fit(f"[bold blue]{selected_book} Chapter {chapter}[/bold blue]", box=box.DOUBLE))
             
@@ -601,12 +768,116 @@ def read_bible_book():
                 console.print("[red]Invalid choice.[/red]")
                 console.input("\nPress Enter to continue...")
 
+# Markers used to find highlighted words in search snippets
+SEARCH_HIGHLIGHT = ("\x02", "\x03")
+
+def _search_snippet(snippet):
+    """Turn a search snippet into rich markup with highlighted matches"""
+    start, end = SEARCH_HIGHLIGHT
+    return escape(snippet).replace(start, "[bold yellow]").replace(end, "[/bold yellow]")
+
+def search_bible():
+    """Search the text of the Bible."""
+    while True:
+        clear_screen()
+        console.print(Panel.fit("[bold blue]Search Bible[/bold blue]", box=box.SIMPLE))
+        
+        console.print("\n[bold]Search tips:[/bold]")
+        console.print("  [cyan]love one another[/cyan]   - verses with every word")
+        console.print("  [cyan]faith OR hope[/cyan]      - verses with either word")
+        console.print("  [cyan]love NOT hate[/cyan]      - leave out verses with a word")
+        console.print('  [cyan]"in the beginning"[/cyan] - an exact phrase')
+        console.print("  [cyan]bless*[/cyan]             - words starting with bless")
+        
+        query = console.input("\n[bold]Enter search (or q to quit):[/bold] ").strip()
+        if not query or query.lower() == 'q':
+            return
+        
+        book = None
+        chapter = None
+        book_choice = console.input("[bold]Limit to a book (press Enter for all books):[/bold] ").strip()
+        if book_choice:
+            book = tracker.find_book(book_choice)
+            if not book:
+                console.print(f"[red]Book '{book_choice}' not found.[/red]")
+                console.input("\nPress Enter to try again...")
+                continue
+            
+            chapter_choice = console.input(f"[bold]Limit to a chapter of {book} (press Enter for all chapters):[/bold] ").strip()
+            if chapter_choice:
+                try:
+                    chapter = int(chapter_choice)
+                except ValueError:
+                    console.print("[red]Invalid chapter number.[/red]")
+                    console.input("\nPress Enter to try again...")
+                    continue
+        
+        offset = 0
+        total = tracker.count_search_results(query, book, chapter)
+        while True:
+            results = tracker.search_verses(query, book, chapter, offset=offset, highlight=SEARCH_HIGHLIGHT)
+            
+            clear_screen()
+            scope = ""
+            if book:
+                scope = f" in {book} {chapter}" if chapter else f" in {book}"
+            console.print(Panel.fit(f"[bold blue]Search: {escape(query)}{scope}[/bold blue]", box=box.SIMPLE))
+            
+            if not results:
+                console.print("\n[yellow]No verses found.[/yellow]")
+                console.input("\nPress Enter to search again...")
+                break
+            
+            results_table = Table(box=box.SIMPLE)
+            results_table.add_column("#", justify="right", style="dim")
+            results_table.add_column("Reference", style="cyan", no_wrap=True)
+            results_table.add_column("Verse")
+            for i, result in enumerate(results, offset + 1):
+                results_table.add_row(
+                    str(i),
+                    f"{result.book} {result.chapter}:{result.verse}",
+                    _search_snippet(result.snippet)
+                )
+            console.print(results_table)
+            console.print(f"Showing {offset + 1}-{offset + len(results)} of {total} verses")
+            
+            console.print("\n[bold]Options:[/bold]")
+            if offset + len(results) < total:
+                console.print("  [cyan]n[/cyan] - Next results")
+            if offset > 0:
+                console.print("  [cyan]p[/cyan] - Previous results")
+            console.print("  [cyan]#[/cyan] - Enter a result number to set it as your reading position")
+            console.print("  [cyan]s[/cyan] - New search")
+            console.print("  [cyan]q[/cyan] - Back to main menu")
+            
+            choice = console.input("\n[bold]Choose an option:[/bold] ").strip().lower()
+            
+            if choice == 'n' and offset + len(results) < total:
+                offset += len(results)
+            elif choice == 'p' and offset > 0:
+                offset = max(0, offset - len(results))
+            elif choice == 's':
+                break
+            elif choice == 'q':
+                return
+            elif choice.isdigit() and offset < int(choice) <= offset + len(results):
+                result = results[int(choice) - offset - 1]
+                success = tracker.update_reading_position(result.book, result.chapter, result.verse)
+                if success:
+                    console.print(f"[green]✓ Set {result.book} {result.chapter}:{result.verse} as current reading position.[/green]")
+                else:
+                    console.print("[red]Error updating reading position.[/red]")
+                console.input("\nPress Enter to continue...")
+            else:
+                console.print("[red]Invalid choice.[/red]")
+                console.input("\nPress Enter to continue...")
+
 def reset_reading_progress():
     """Reset all reading progress while keeping downloaded books."""
     clear_screen()
     console.print(Panel.fit("[bold red]Reset Reading Progress[/bold red]", box=box.DOUBLE))
     
-    console.print("\n[bold yellow]Warning:[/bold yellow] This will reset all your reading progress and history.")
+    console.print(f"\n[bold yellow]Warning:[/bold yellow] This will reset all reading progress and history of profile {escape(tracker.get_current_profile())}.")
     console.print("You will be returned to Genesis 1:1.")
     
     confirm = console.input("\n[bold]Are you sure you want to reset your progress? (y/n):[/bold] ").strip().lower()
@@ -624,6 +895,7 @@ def reset_reading_progress():
 
 def view_statistics():
     """Display detailed reading statistics."""
+    trace_start = querytrace.mark()
     clear_screen()
     console.print(Panel.fit("[bold blue]Reading Statistics[/bold blue]", box=box.SIMPLE))
     
@@ -696,5 +968,8 @@ def view_statistics():
     else:
         console.print("\n[yellow]No reading history recorded yet.[/yellow]")
     
+    if querytrace.ENABLED:
+        display_query_summary(trace_start)
+    
     # Wait for user to press Enter
     console.input("\nPress Enter to return to the dashboard...")
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Verse coverage bitmap
+
+Tracks which distinct verses have been read as one bit per global verse
+ordinal (about 4 KB for the whole Bible), so coverage counts and
+percentages are bit arithmetic instead of scans over reading history.
+"""
+
+from typing import Iterator, Optional
+import canon
+
+# Bytes needed for one bit per verse
+BITMAP_SIZE = (canon.TOTAL_VERSES + 7) // 8
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count("1")
+
+class Coverage:
+    """Set of verse ordinals that have been read"""
+    
+    __slots__ = ("bits",)
+    
+    def __init__(self, data: bytes = None):
+        if data is not None and len(data) != BITMAP_SIZE:
+            raise ValueError(f"Coverage bitmap must be {BITMAP_SIZE} bytes, got {len(data)}")
+        self.bits = bytearray(data) if data is not None else bytearray(BITMAP_SIZE)
+    
+    def to_bytes(self) -> bytes:
+        """Get the bitmap for storage"""
+        return bytes(self.bits)
+    
+    def _as_int(self) -> int:
+        """Get the bitmap as an integer with bit N set for verse ordinal N"""
+        return int.from_bytes(self.bits, "little")
+    
+    def add(self, ordinal: int):
+        """Mark a verse as read"""
+        self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+    
+    def add_range(self, start: int, end: int):
+        """Mark verses start..end (inclusive) as read"""
+        for ordinal in range(start, end + 1):
+            self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+    
+    def __contains__(self, ordinal: int) -> bool:
+        return bool(self.bits[ordinal >> 3] & (1 << (ordinal & 7)))
+    
+    def count(self, start: int = 0, end: int = None) -> int:
+        """Count the distinct verses read between two ordinals (inclusive)"""
+        if end is None:
+            end = canon.TOTAL_VERSES - 1
+        if end < start:
+            return 0
+        
+        mask = (1 << (end - start + 1)) - 1
+        return _popcount((self._as_int() >> start) & mask)
+    
+    def first_unread(self, start: int = 0, end: int = None) -> Optional[int]:
+        """Get the first unread verse ordinal between two ordinals (inclusive)"""
+        if end is None:
+            end = canon.TOTAL_VERSES - 1
+        if end < start:
+            return None
+        
+        mask = (1 << (end - start + 1)) - 1
+        unread = ~(self._as_int() >> start) & mask
+        if not unread:
+            return None
+        return start + (unread & -unread).bit_length() - 1
+    
+    def unread(self, start: int = 0, end: int = None) -> Iterator[int]:
+        """Iterate over the unread verse ordinals between two ordinals (inclusive)"""
+        if end is None:
+            end = canon.TOTAL_VERSES - 1
+        
+        for ordinal in range(start, end + 1):
+            if not self.bits[ordinal >> 3] & (1 << (ordinal & 7)):
+                yield ordinal
+    
+    def chapter_percentage(self, book_id: int, chapter: int) -> float:
+        """Percentage of a chapter's verses that have been read"""
+        start = canon.ordinal(book_id, chapter, 1)
+        total = canon.verse_count(book_id, chapter)
+        return self.count(start, start + total - 1) / total * 100
+    
+    def book_percentage(self, book_id: int) -> float:
+        """Percentage of a book's verses that have been read"""
+        start = canon.BOOK_OFFSETS[book_id]
+        total = canon.book_verse_count(book_id)
+        return self.count(start, start + total - 1) / total * 100
+    
+    def bible_percentage(self) -> float:
+        """Percentage of all verses in the Bible that have been read"""
+        return self.count() / canon.TOTAL_VERSES * 100
+    
+    def __or__(self, other: "Coverage") -> "Coverage":
+        return Coverage((self._as_int() | other._as_int()).to_bytes(BITMAP_SIZE, "little"))
+    
+    def __and__(self, other: "Coverage") -> "Coverage":
+        return Coverage((self._as_int() & other._as_int()).to_bytes(BITMAP_SIZE, "little"))
+    
+    def __sub__(self, other: "Coverage") -> "Coverage":
+        return Coverage((self._as_int() & ~other._as_int()).to_bytes(BITMAP_SIZE, "little"))
+    
+    def __len__(self):
+        return self.count()
+    
+    def __eq__(self, other):
+        if not isinstance(other, Coverage):
+            return NotImplemented
+        return self.bits == other.bits
+    
+    def __repr__(self):
+        return f"Coverage({self.count()} of {canon.TOTAL_VERSES} verses)"
+
+def from_positions(rows) -> Coverage:
+    """
+    Build coverage from (book_id, chapter, verse) rows.
+    
+    Rows that are not real verses (such as a verse past the end of its
+    chapter) are ignored.
+    """
+    coverage = Coverage()
+    for book_id, chapter, verse in rows:
+        try:
+            coverage.add(canon.ordinal(book_id, chapter, verse))
+        except ValueError:
+            continue
+    return coverage
@@ -0,0 +1,437 @@
+"""
+Pure-Python inverted index over verse text
+
+Fallback search engine for SQLite builds without FTS5. Each word maps to
+a sorted array of postings, where a posting packs a verse ordinal and
+the word's position in that verse into one integer:
+
+    posting = ordinal << POSITION_BITS | position
+
+so a phrase is found by shifting each word's postings back by its place
+in the phrase and intersecting. The index is cached to disk next to the
+database and reused while the verse text is unchanged. The cache holds
+only JSON and raw integer arrays, so reading it never runs code.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import canon
+import db
+import migrations
+from search import QueryItem, SearchResult, Term, SNIPPET_WORDS, WORD_PATTERN, normalize_word, tokenize
+
+# Bits of each posting that hold the word position within the verse
+POSITION_BITS = 10
+MAX_POSITION = (1 << POSITION_BITS) - 1
+
+# Bump when the cached file layout changes
+INDEX_FORMAT = 2
+
+MAGIC = b"BSTINDX\0"
+
+# magic, format, byte order (1 = little endian), length of the JSON
+# metadata (checksum, words and their postings sizes) that follows;
+# then the verse lengths and every word's postings, in that order
+_HEADER = struct.Struct("<8sIII")
+
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 0
+
+# Cache file written next to the database
+INDEX_SUFFIX = ".search-index"
+
+# BM25 parameters, the same defaults FTS5 uses
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Word and phrase lookups kept per index before the cache is cleared
+TERM_CACHE_SIZE = 256
+
+# Unsigned 32-bit array type code
+_POSTING_TYPE = "I" if array("I").itemsize == 4 else "L"
+
+class VerseIndex:
+    """Inverted index from words to positional postings of verse ordinals"""
+    
+    __slots__ = ("postings", "vocabulary", "lengths", "average_length", "checksum", "_cache")
+    
+    def __init__(self, postings: Dict[str, bytes], lengths: bytes, checksum: str):
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.lengths = memoryview(lengths).cast("H")
+        indexed = [length for length in self.lengths if length]
+        self.average_length = sum(indexed) / len(indexed) if indexed else 1.0
+        self.checksum = checksum
+        self._cache = {}
+    
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, int, int, str]], checksum: str = "") -> "VerseIndex":
+        """
+        Build an index from (book_id, chapter, verse, text) rows.
+        
+        Rows that are not real verses are skipped, and words past
+        MAX_POSITION in a verse are not indexed.
+        """
+        postings = {}
+        lengths = array("H", bytes(2 * canon.TOTAL_VERSES))
+        
+        for book_id, chapter, verse, text in rows:
+            try:
+                ordinal = canon.ordinal(book_id, chapter, verse)
+            except ValueError:
+                continue
+            
+            words = tokenize(text)[:MAX_POSITION + 1]
+            lengths[ordinal] = len(words)
+            base = ordinal << POSITION_BITS
+            for position, word in enumerate(words):
+                entries = postings.get(word)
+                if entries is None:
+                    entries = postings[word] = array(_POSTING_TYPE)
+                entries.append(base | position)
+        
+        # Rows may arrive in any order; postings must be sorted
+        packed = {}
+        for word, entries in postings.items():
+            packed[word] = array(_POSTING_TYPE, sorted(entries)).tobytes()
+        return cls(packed, lengths.tobytes(), checksum)
+    
+    def _postings(self, word: str):
+        """Get the postings of a word as a read-only integer sequence"""
+        data = self.postings.get(word)
+        if data is None:
+            return ()
+        return memoryview(data).cast(_POSTING_TYPE)
+    
+    def _words_with_prefix(self, prefix: str) -> List[str]:
+        """Get every indexed word that starts with a prefix"""
+        words = []
+        for i in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            if not self.vocabulary[i].startswith(prefix):
+                break
+            words.append(self.vocabulary[i])
+        return words
+    
+    def _word_postings(self, word: str, prefix: bool) -> Set[int]:
+        """Get the postings of a word, or of every word with the prefix"""
+        if not prefix:
+            return set(self._postings(word))
+        
+        found = set()
+        for match in self._words_with_prefix(word):
+            found.update(self._postings(match))
+        return found
+    
+    def term_frequencies(self, term: Term) -> Counter:
+        """
+        Find the verses containing a word or phrase.
+        
+        Returns:
+            Counter of verse ordinal to number of occurrences
+        """
+        if term in self._cache:
+            return self._cache[term]
+        
+        last = len(term.words) - 1
+        starts = None
+        for i, word in enumerate(term.words):
+            postings = self._word_postings(word, term.prefix and i == last)
+            # Shift each word back to where the phrase would start
+            shifted = {posting - i for posting in postings} if i else postings
+            starts = shifted if starts is None else starts & shifted
+            if not starts:
+                break
+        
+        frequencies = Counter(posting >> POSITION_BITS for posting in starts or ())
+        if len(self._cache) >= TERM_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[term] = frequencies
+        return frequencies
+    
+    def _idf(self, matches: int) -> float:
+        """Inverse document frequency, clamped positive like FTS5's bm25"""
+        total = len(self.lengths)
+        return max(math.log((total - matches + 0.5) / (matches + 0.5)), 1e-6)
+    
+    def evaluate(self, items: List[QueryItem]) -> Dict[int, float]:
+        """
+        Find the verses matching a parsed query and score them with BM25.
+        
+        NOT binds tightest, then AND, then OR, matching FTS5.
+        
+        Returns:
+            Dict of verse ordinal to score, higher is better
+        """
+        matched = set()
+        scored_terms = []
+        
+        group = None
+        operator = "AND"
+        for item in items + ["OR"]:
+            if isinstance(item, str):
+                if item == "OR":
+                    matched |= group or set()
+                    group = None
+                    operator = "AND"
+                else:
+                    operator = item
+                continue
+            
+            frequencies = self.term_frequencies(item)
+            if group is None:
+                group = set(frequencies)
+            elif operator == "NOT":
+                group -= frequencies.keys()
+            else:
+                group &= frequencies.keys()
+            
+            if operator != "NOT":
+                scored_terms.append(frequencies)
+        
+        scores = dict.fromkeys(matched, 0.0)
+        for frequencies in scored_terms:
+            idf = self._idf(len(frequencies))
+            for ordinal in matched.intersection(frequencies):
+                frequency = frequencies[ordinal]
+                length_ratio = self.lengths[ordinal] / self.average_length
+                scores[ordinal] += idf * frequency * (BM25_K1 + 1) / (
+                    frequency + BM25_K1 * (1 - BM25_B + BM25_B * length_ratio)
+                )
+        return scores
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the index for the disk cache"""
+        words = list(self.postings)
+        metadata = json.dumps({
+            "checksum": self.checksum,
+            "words": words,
+            "sizes": [len(self.postings[word]) for word in words],
+        }, ensure_ascii=False).encode("utf-8")
+        return b"".join([
+            _HEADER.pack(MAGIC, INDEX_FORMAT, _BYTE_ORDER, len(metadata)),
+            metadata,
+            self.lengths.tobytes(),
+            *(self.postings[word] for word in words),
+        ])
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["VerseIndex"]:
+        """Load a serialized index, or None if it is damaged or was written in another format"""
+        try:
+            magic, index_format, byte_order, metadata_size = _HEADER.unpack_from(data)
+            if magic != MAGIC or index_format != INDEX_FORMAT or byte_order != _BYTE_ORDER:
+                return None
+            offset = _HEADER.size + metadata_size
+            metadata = json.loads(data[_HEADER.size:offset].decode("utf-8"))
+            words, sizes = metadata["words"], metadata["sizes"]
+            checksum = str(metadata["checksum"])
+        except (struct.error, ValueError, KeyError, TypeError):
+            return None
+        
+        lengths_size = 2 * canon.TOTAL_VERSES
+        if len(words) != len(sizes) or len(data) != offset + lengths_size + sum(sizes):
+            return None
+        lengths = data[offset:offset + lengths_size]
+        offset += lengths_size
+        
+        postings = {}
+        for word, size in zip(words, sizes):
+            if size % array(_POSTING_TYPE).itemsize:
+                return None
+            postings[word] = data[offset:offset + size]
+            offset += size
+        return cls(postings, lengths, checksum)
+
+def _verse_rows(cursor):
+    """All verses as (book_id, chapter, verse, text) rows, in table order"""
+    cursor.execute("SELECT book_id, chapter_number, verse_number, verse_text FROM verses ORDER BY id")
+    return cursor
+
+def corpus_checksum(cursor) -> str:
+    """Hash the full verse text so a cached index can be matched to its corpus"""
+    digest = hashlib.blake2b(digest_size=16)
+    for book_id, chapter, verse, text in _verse_rows(cursor):
+        digest.update(f"{book_id}:{chapter}:{verse} {text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def cache_path() -> str:
+    """Path of the index cache file for the current database"""
+    return db.DB_PATH + INDEX_SUFFIX
+
+# The loaded index and the (db path, corpus_id, revision) it belongs to
+_loaded = None
+_loaded_key = None
+
+def _read_cache(path: str) -> Tuple[Optional[tuple], Optional[VerseIndex]]:
+    """Read the cache file as (corpus state key, index)"""
+    try:
+        with open(path, "rb") as f:
+            # The key is a line of JSON ahead of the index
+            key = tuple(json.loads(f.readline().decode("utf-8")))
+            data = f.read()
+    except (OSError, ValueError, TypeError):
+        return None, None
+    return key, VerseIndex.from_bytes(data)
+
+def _write_cache(path: str, key: tuple, index: VerseIndex):
+    """Write the cache file atomically, ignoring read-only locations"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(json.dumps(list(key)).encode("utf-8") + b"\n")
+            f.write(index.to_bytes())
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+def get_index(rebuild: bool = False) -> VerseIndex:
+    """
+    Get the index for the current database.
+    
+    Uses the copy in memory or on disk while the corpus revision is
+    unchanged. After a change the full text is checksummed, and the index
+    is only rebuilt if the checksum differs.
+    """
+    global _loaded, _loaded_key
+    
+    cursor = db.get_connection().cursor()
+    key = (db.DB_PATH,) + tuple(migrations.get_corpus_state(cursor))
+    if not rebuild and _loaded is not None and _loaded_key == key:
+        return _loaded
+    
+    path = cache_path()
+    index = None
+    if not rebuild:
+        cached_key, index = _read_cache(path)
+        if index is not None and cached_key != key[1:]:
+            if index.checksum != corpus_checksum(cursor):
+                index = None
+            else:
+                # Same text under a new revision; refresh the stored key
+                _write_cache(path, key[1:], index)
+    
+    if index is None:
+        checksum = corpus_checksum(cursor)
+        index = VerseIndex.build(_verse_rows(cursor), checksum)
+        _write_cache(path, key[1:], index)
+    
+    _loaded, _loaded_key = index, key
+    return index
+
+def _ordinal_range(book: Optional[str], chapter: Optional[int]) -> Tuple[int, int]:
+    """Get the inclusive ordinal range covered by book/chapter filters"""
+    book_id = canon.get_book_id(book) if book else None
+    if book and not book_id:
+        return (0, -1)
+    if not book_id:
+        return (0, canon.TOTAL_VERSES - 1)
+    
+    if chapter:
+        if not 1 <= chapter <= canon.chapter_count(book_id):
+            return (0, -1)
+        start = canon.ordinal(book_id, chapter, 1)
+        return (start, start + canon.verse_count(book_id, chapter) - 1)
+    
+    start = canon.BOOK_OFFSETS[book_id]
+    return (start, start + canon.book_verse_count(book_id) - 1)
+
+def _matches(items, book, chapter) -> Dict[int, float]:
+    """Scores of the verses matching a query within the filters"""
+    scores = get_index().evaluate(items)
+    if book:
+        first, last = _ordinal_range(book, chapter)
+        scores = {ordinal: score for ordinal, score in scores.items() if first <= ordinal <= last}
+    return scores
+
+def _highlighted(words: List[str], terms: List[Term]) -> List[bool]:
+    """Flag the words of a verse that are part of a match for any term"""
+    flags = [False] * len(words)
+    for term in terms:
+        size = len(term.words)
+        for i in range(len(words) - size + 1):
+            if words[i:i + size - 1] != list(term.words[:-1]):
+                continue
+            last = words[i + size - 1]
+            if last == term.words[-1] or (term.prefix and last.startswith(term.words[-1])):
+                flags[i:i + size] = [True] * size
+    return flags
+
+def make_snippet(text: str, terms: List[Term], highlight: Tuple[str, str]) -> str:
+    """
+    Cut a window of SNIPPET_WORDS words around the first match and mark
+    the matches, in the style of FTS5's snippet().
+    """
+    spans = [match.span() for match in WORD_PATTERN.finditer(text)]
+    flags = _highlighted([normalize_word(text[start:end]) for start, end in spans], terms)
+    
+    first = 0
+    if len(spans) > SNIPPET_WORDS and True in flags:
+        first = max(0, min(flags.index(True) - SNIPPET_WORDS // 4, len(spans) - SNIPPET_WORDS))
+    last = min(len(spans), first + SNIPPET_WORDS) - 1
+    
+    start = spans[first][0] if first else 0
+    end = spans[last][1] if last < len(spans) - 1 else len(text)
+    
+    parts = ["…"] if start else []
+    position = start
+    i = first
+    while i <= last:
+        if not flags[i]:
+            i += 1
+            continue
+        
+        # Consecutive matched words, such as a phrase, share one highlight
+        run_end = i
+        while run_end < last and flags[run_end + 1]:
+            run_end += 1
+        parts.append(text[position:spans[i][0]])
+        parts.append(highlight[0] + text[spans[i][0]:spans[run_end][1]] + highlight[1])
+        position = spans[run_end][1]
+        i = run_end + 1
+    parts.append(text[position:end])
+    if end < len(text):
+        parts.append("…")
+    return "".join(parts)
+
+def search(items: List[QueryItem], book: str = None, chapter: int = None, limit: int = 20,
+           offset: int = 0, highlight: Tuple[str, str] = ("[", "]")) -> List[SearchResult]:
+    """Search a parsed query, returning results in the same form as the FTS5 engine"""
+    scores = _matches(items, book, chapter)
+    ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda entry: (-entry[1], entry[0]))[offset:]
+    
+    # Highlight every term that is not excluded with NOT
+    terms = [
+        item for previous, item in zip([None] + items, items)
+        if isinstance(item, Term) and previous != "NOT"
+    ]
+    
+    cursor = db.get_connection().cursor()
+    results = []
+    for ordinal, score in ranked:
+        book_id, chapter_number, verse_number = canon.position(ordinal)
+        cursor.execute(
+            "SELECT verse_text FROM verses WHERE book_id = ? AND chapter_number = ? AND verse_number = ?",
+            (book_id, chapter_number, verse_number)
+        )
+        row = cursor.fetchone()
+        text = row[0] if row else ""
+        results.append(SearchResult(
+            canon.get_book_name(book_id), chapter_number, verse_number, text,
+            make_snippet(text, terms, highlight), score
+        ))
+    return results
+
+def count(items: List[QueryItem], book: str = None, chapter: int = None) -> int:
+    """Count the verses matching a parsed query"""
+    return len(_matches(items, book, chapter))